@@ -1,48 +1,88 @@
+import asyncio
 import subprocess
-import tempfile
-import os
-import json
+import re
+import time
+import wave
 
-def convert_audio_ffmpeg(input_bytes: bytes, input_format: str, output_format: str = "wav", sample_width: int = 2, channels: int = 1, frame_rate: int = 16000) -> bytes:
+# "  Duration: 00:01:02.50, start: ..." in ffmpeg's stderr banner; "N/A" for unseekable inputs
+FFMPEG_DURATION = re.compile(r"Duration:\s*(\d+):(\d{2}):(\d{2}(?:\.\d+)?)")
+
+def parse_ffmpeg_duration(stderr: str):
+    """Input duration in seconds from ffmpeg's stderr, or None if it is not reported."""
+    match = FFMPEG_DURATION.search(stderr or "")
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def wav_duration(path: str) -> float:
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+def is_whisper_wav(path: str, frame_rate: int = 16000) -> bool:
+    """True if path is already an uncompressed 16 kHz mono s16 WAV that whisper.cpp can read as-is."""
+    try:
+        with wave.open(path, "rb") as wf:
+            return (wf.getframerate() == frame_rate and wf.getnchannels() == 1
+                    and wf.getsampwidth() == 2 and wf.getcomptype() == "NONE")
+    except (wave.Error, EOFError, OSError):
+        return False
+
+def prepare_audio(in_path: str, out_path: str, frame_rate: int = 16000, timings: dict = None):
     """
-    Convert audio bytes to the desired format and parameters using ffmpeg.
-    Default: 16-bit WAV, mono, 16kHz.
+    Get an upload ready for whisper.cpp in at most one ffmpeg run.
+
+    A WAV that is already 16 kHz mono s16 is used in place and its duration read from the
+    header. Anything else (m4a, mp4, webm, ogg, mp3, flac, other WAVs) is decoded once,
+    straight from the saved file to out_path, and the duration is parsed from the same
+    ffmpeg process's stderr (or read from the output header when the input does not report
+    one). Returns (path to transcribe, duration in seconds). If timings is given, the seconds
+    spent on the header check ("probe") and on ffmpeg ("ffmpeg") are stored in it.
     """
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{input_format}') as in_file:
-        in_file.write(input_bytes)
-        in_file.flush()
-        in_path = in_file.name
-    out_path = in_path + f'.converted.{output_format}'
-    cmd = [
-        'ffmpeg', '-y', '-i', in_path,
-        '-ar', str(frame_rate), '-ac', str(channels), '-sample_fmt', 's16',
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    if is_whisper_wav(in_path, frame_rate):
+        duration = wav_duration(in_path)
+        timings["probe"] = time.perf_counter() - started
+        return in_path, duration
+    timings["probe"] = time.perf_counter() - started
+    started = time.perf_counter()
+    result = subprocess.run(_prepare_cmd(in_path, out_path, frame_rate), check=True, capture_output=True, text=True, errors="replace")
+    duration = parse_ffmpeg_duration(result.stderr)
+    if duration is None:
+        duration = wav_duration(out_path)
+    timings["ffmpeg"] = time.perf_counter() - started
+    return out_path, duration
+
+def _prepare_cmd(in_path: str, out_path: str, frame_rate: int):
+    return [
+        'ffmpeg', '-y', '-hide_banner', '-nostdin', '-i', in_path,
+        '-vn', '-ar', str(frame_rate), '-ac', '1', '-c:a', 'pcm_s16le', '-f', 'wav',
         out_path
     ]
-    try:
-        subprocess.run(cmd, check=True, capture_output=True)
-        with open(out_path, 'rb') as f:
-            out_bytes = f.read()
-    finally:
-        os.remove(in_path)
-        if os.path.exists(out_path):
-            os.remove(out_path)
-    return out_bytes
-
-def get_audio_duration_ffprobe(input_bytes: bytes, input_format: str) -> float:
+
+async def prepare_audio_async(in_path: str, out_path: str, frame_rate: int = 16000, timings: dict = None):
     """
-    Get audio duration in seconds using ffprobe.
+    prepare_audio for request handlers: ffmpeg runs as an asyncio subprocess and WAV header
+    reads happen in a worker thread, so the event loop keeps serving other requests while
+    a file converts. Raises subprocess.CalledProcessError like prepare_audio.
     """
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{input_format}') as in_file:
-        in_file.write(input_bytes)
-        in_file.flush()
-        in_path = in_file.name
-    cmd = [
-        'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1', in_path
-    ]
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        duration = float(result.stdout.strip())
-    finally:
-        os.remove(in_path)
-    return duration
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
+    if await asyncio.to_thread(is_whisper_wav, in_path, frame_rate):
+        duration = await asyncio.to_thread(wav_duration, in_path)
+        timings["probe"] = time.perf_counter() - started
+        return in_path, duration
+    timings["probe"] = time.perf_counter() - started
+    started = time.perf_counter()
+    cmd = _prepare_cmd(in_path, out_path, frame_rate)
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+    _, stderr = await proc.communicate()
+    stderr = stderr.decode("utf-8", errors="replace")
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+    duration = parse_ffmpeg_duration(stderr)
+    if duration is None:
+        duration = await asyncio.to_thread(wav_duration, out_path)
+    timings["ffmpeg"] = time.perf_counter() - started
+    return out_path, duration
@@ -0,0 +1,324 @@
+"""
+End-to-end benchmark of upload -> ffmpeg -> whisper -> Ollama polishing, reproducible without
+whisper.cpp, a GPU or an Ollama install.
+
+    python benchmarks/bench_e2e.py --uploads 40 --concurrency 8 --workers 2 \\
+        --whisper-latency 0.5 --whisper-rtf 0.05 --ollama-latency 1.0 --format mixed
+    python benchmarks/bench_e2e.py --uploads 0 --index-sizes 1000,10000,100000
+
+Everything runs in a temporary directory with its own config.yaml. main:app and webui:app are
+started in this process (uvicorn in background threads) against two stand-ins:
+  - a fake whisper executable (whisper.exe_path) that sleeps --whisper-latency plus
+    --whisper-rtf seconds per second of audio, then writes the .txt/.json whisper.cpp would;
+  - a mock Ollama HTTP server answering /api/chat (streaming or not) after --ollama-latency.
+ffmpeg is real and must be on PATH: uploads are synthetic 44.1 kHz stereo WAVs, or M4As
+encoded from them, so every job pays for a conversion. Each upload has distinct bytes, so
+deduplication never skips work, and the LLM cache is disabled.
+
+Reported: accept latency, end-to-end latency (upload until the job is done), percentiles of
+every per-job stage timing from the metadata (upload_receive, ffmpeg, whisper, llm, ...),
+throughput, and peak RSS of this process and of its children (ffmpeg, fake whisper).
+Then, for each --index-sizes N, the metadata directory is filled up to N synthetic
+transcriptions and the web UI's index page, first list page and a search are timed.
+"""
+import io
+import os
+import sys
+import json
+import time
+import wave
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAKE_WHISPER = """#!{python}
+import sys, json, time, wave
+args = sys.argv[1:]
+wav_path, out_prefix = args[args.index("-f") + 1], args[args.index("-of") + 1]
+try:
+    with wave.open(wav_path, "rb") as wf:
+        seconds = wf.getnframes() / float(wf.getframerate())
+except Exception:
+    seconds = 0.0
+time.sleep({latency} + {rtf} * seconds)
+segments = [{{"offsets": {{"from": i * 1000, "to": (i + 1) * 1000}}, "text": " benchmark segment %d" % i}} for i in range(max(1, int(seconds)))]
+with open(out_prefix + ".txt", "w") as f:
+    f.write("".join(seg["text"] + "\\n" for seg in segments))
+if "-oj" in args:
+    with open(out_prefix + ".json", "w") as f:
+        json.dump({{"transcription": segments}}, f)
+"""
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, seconds):
+    if not seconds:
+        return
+    ms = [v * 1000 for v in seconds]
+    print(f"{label:>18}: n={len(ms)} p50={percentile(ms, 50):.1f}ms p90={percentile(ms, 90):.1f}ms "
+          f"p99={percentile(ms, 99):.1f}ms max={max(ms):.1f}ms")
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        time.sleep(self.latency)
+        content = json.dumps({"markdown": "# Benchmark\n\nPolished transcript.", "title": "Benchmark",
+                              "file_name": "benchmark.md", "text": "Polished chunk."})
+        if not body.get("stream"):
+            data = json.dumps({"message": {"content": content}, "done": True}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        lines = [json.dumps({"message": {"content": content[i:i + 16]}, "done": False}) + "\n" for i in range(0, len(content), 16)]
+        data = ("".join(lines) + json.dumps({"message": {"content": ""}, "done": True}) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_ollama(latency: float):
+    handler = type("Handler", (MockOllamaHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_config(directory: str, whisper_path: str, ollama_port: int, workers: int, queue_size: int):
+    config = f"""upload_dir: "uploads"
+transcriptions_dir: "transcriptions"
+markdowns_dir: "markdowns"
+whisper:
+  exe_path: "{whisper_path}"
+  model_path: "{os.path.join(directory, 'model.bin')}"
+  extra_args: ""
+ollama:
+  host: "http://127.0.0.1"
+  port: {ollama_port}
+  model: "benchmark"
+queue:
+  workers: {workers}
+  max_size: {queue_size}
+llm_cache:
+  enabled: false
+logging:
+  file: "server.log"
+  level: "WARNING"
+"""
+    with open(os.path.join(directory, "config.yaml"), "w") as f:
+        f.write(config)
+    open(os.path.join(directory, "model.bin"), "w").close()
+
+
+def synthetic_wav(seconds: float, seed: int) -> bytes:
+    rate, channels = 44100, 2
+    rng = random.Random(seed)
+    frame = bytes(rng.randrange(256) for _ in range(4 * 441))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(frame * int(seconds * 100))
+    return buf.getvalue()
+
+
+def synthetic_m4a(wav: bytes, directory: str, seed: int) -> bytes:
+    wav_path = os.path.join(directory, f"synthetic-{seed}.wav")
+    m4a_path = os.path.join(directory, f"synthetic-{seed}.m4a")
+    with open(wav_path, "wb") as f:
+        f.write(wav)
+    subprocess.run(["ffmpeg", "-y", "-hide_banner", "-nostdin", "-loglevel", "error", "-i", wav_path,
+                    "-c:a", "aac", "-b:a", "64k", "-f", "mp4", m4a_path], check=True)
+    with open(m4a_path, "rb") as f:
+        data = f.read()
+    os.remove(wav_path)
+    os.remove(m4a_path)
+    return data
+
+
+def start_app(app, port: int):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Server on port {port} did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_uploads(url: str, bodies, concurrency: int):
+    """Upload every (filename, body) and follow its job to the end. Returns per-upload results."""
+
+    def one(item):
+        filename, body = item
+        session = requests.Session()
+        started = time.perf_counter()
+        response = session.post(f"{url}/upload-audio/stream", params={"filename": filename}, data=body, timeout=3600)
+        accepted = time.perf_counter() - started
+        if response.status_code != 200:
+            return {"filename": filename, "status_code": response.status_code, "accept": accepted}
+        job_id = response.json()["transcription_id"]
+        version, stage = -1, None
+        while stage not in ("done", "error"):
+            snapshot = session.get(f"{url}/jobs/{job_id}", params={"wait": 30, "version": version}, timeout=60).json()
+            version, stage = snapshot.get("version", version), snapshot.get("stage")
+        return {"filename": filename, "status_code": 200, "id": job_id, "stage": stage, "accept": accepted,
+                "end_to_end": time.perf_counter() - started}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(pool.map(one, bodies))
+
+
+def fill_index(webui, target: int, rng: random.Random):
+    """Add synthetic metadata files until there are target transcriptions, then rebuild the index."""
+    existing = sum(1 for name in os.listdir(webui.TRANSCRIPTIONS_DIR) if name.endswith(".json") and not name.endswith(".segments.json"))
+    words = "budget meeting roadmap customer release deadline hiring review migration latency".split()
+    for i in range(existing, target):
+        meta = {"datetime": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00Z", "source": "bench",
+                "original_filename": f"synthetic-{i}.wav", "audio_length_sec": 60 + i % 600, "status": "success",
+                "markdown_title": f"Synthetic {i}", "transcription_text": " ".join(rng.choice(words) for _ in range(50))}
+        with open(os.path.join(webui.TRANSCRIPTIONS_DIR, f"synthetic-{i}.json"), "w") as jf:
+            json.dump(meta, jf)
+    return webui.meta_index.rebuild(webui.TRANSCRIPTIONS_DIR, webui.MARKDOWNS_DIR)
+
+
+def time_requests(session, url: str, repeat: int, **params):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        session.get(url, params=params, timeout=120).raise_for_status()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with a fake whisper and a mock Ollama")
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="Uploads in flight at once")
+    parser.add_argument("--workers", type=int, default=2, help="queue.workers of the server")
+    parser.add_argument("--seconds", type=float, default=30, help="Length of each synthetic recording")
+    parser.add_argument("--format", choices=("wav", "m4a", "mixed"), default="wav")
+    parser.add_argument("--whisper-latency", type=float, default=0.5, help="Fixed seconds per fake whisper run")
+    parser.add_argument("--whisper-rtf", type=float, default=0.02, help="Extra fake whisper seconds per audio second")
+    parser.add_argument("--ollama-latency", type=float, default=1.0, help="Seconds before the mock Ollama answers")
+    parser.add_argument("--index-sizes", default="1000,10000,100000", help="Comma-separated; empty to skip")
+    parser.add_argument("--repeat", type=int, default=20, help="Requests per web UI timing")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary directory")
+    args = parser.parse_args()
+    if shutil.which("ffmpeg") is None:
+        sys.exit("ffmpeg must be on PATH")
+
+    tmp = tempfile.mkdtemp(prefix="bench-e2e-")
+    whisper_path = os.path.join(tmp, "fake-whisper")
+    with open(whisper_path, "w") as f:
+        f.write(FAKE_WHISPER.format(python=sys.executable, latency=args.whisper_latency, rtf=args.whisper_rtf))
+    os.chmod(whisper_path, 0o755)
+    ollama = start_mock_ollama(args.ollama_latency)
+    write_config(tmp, whisper_path, ollama.server_address[1], args.workers, max(100, args.uploads))
+    # main and webui read config.yaml, static/ and their data directories relative to the working directory
+    os.symlink(os.path.join(REPO_DIR, "static"), os.path.join(tmp, "static"))
+    os.chdir(tmp)
+    sys.path.insert(0, REPO_DIR)
+    started = time.perf_counter()
+    import main
+    import webui
+    print(f"imported main+webui in {time.perf_counter() - started:.2f}s, work dir {tmp}")
+    api_port, ui_port = free_port(), free_port()
+    servers = [start_app(main.app, api_port), start_app(webui.app, ui_port)]
+    api_url, ui_url = f"http://127.0.0.1:{api_port}", f"http://127.0.0.1:{ui_port}"
+
+    try:
+        if args.uploads:
+            bodies = []
+            for i in range(args.uploads):
+                wav = synthetic_wav(args.seconds, int(time.time()) * 1000 + i)
+                if args.format == "m4a" or (args.format == "mixed" and i % 2):
+                    bodies.append((f"bench-{i}.m4a", synthetic_m4a(wav, tmp, i)))
+                else:
+                    bodies.append((f"bench-{i}.wav", wav))
+            print(f"{args.uploads} uploads of {args.seconds:.0f}s ({args.format}), {args.concurrency} at once, "
+                  f"{args.workers} workers, whisper {args.whisper_latency}s+{args.whisper_rtf}x, ollama {args.ollama_latency}s")
+            started = time.perf_counter()
+            results = run_uploads(api_url, bodies, args.concurrency)
+            elapsed = time.perf_counter() - started
+            done = [r for r in results if r.get("stage") == "done"]
+            report("accept", [r["accept"] for r in results])
+            report("end_to_end", [r["end_to_end"] for r in done])
+            stages = {}
+            audio_sec = 0.0
+            for r in done:
+                with open(os.path.join(main.TRANSCRIPTIONS_DIR, r["id"] + ".json")) as jf:
+                    meta = json.load(jf)
+                audio_sec += meta.get("audio_length_sec") or 0
+                for stage, seconds in (meta.get("stage_timings") or {}).items():
+                    stages.setdefault(stage, []).append(seconds)
+            for stage in sorted(stages):
+                report(stage, stages[stage])
+            failed = [r for r in results if r.get("stage") != "done"]
+            print(f"throughput: {len(done)}/{len(results)} done in {elapsed:.1f}s = {len(done) / elapsed * 60:.1f} files/min, "
+                  f"{audio_sec / elapsed:.1f} audio-sec/sec")
+            if failed:
+                print(f"failed: {[(r['filename'], r.get('status_code'), r.get('stage')) for r in failed]}")
+        self_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        children_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        print(f"peak RSS: server process {self_mb:.1f} MB, largest child (ffmpeg/whisper) {children_mb:.1f} MB")
+
+        session = requests.Session()
+        rng = random.Random(42)
+        for size in [int(s) for s in args.index_sizes.split(",") if s.strip()]:
+            started = time.perf_counter()
+            indexed = fill_index(webui, size, rng)
+            print(f"index of {indexed} transcriptions built in {time.perf_counter() - started:.1f}s")
+            report(f"GET / @{size}", time_requests(session, f"{ui_url}/", args.repeat))
+            report(f"list page @{size}", time_requests(session, f"{ui_url}/api/transcriptions", args.repeat, limit=50))
+            report(f"search @{size}", time_requests(session, f"{ui_url}/api/search", args.repeat, q="roadmap"))
+    finally:
+        for server, thread in servers:
+            server.should_exit = True
+            thread.join(timeout=10)
+        ollama.shutdown()
+        os.chdir(REPO_DIR)
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+    failed_uploads = args.uploads and any(r.get("stage") != "done" for r in results)
+    if failed_uploads:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
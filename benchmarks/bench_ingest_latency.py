@@ -0,0 +1,103 @@
+"""
+Measure how responsive the API server stays while uploads are being converted.
+
+Start the backend first (python main.py --backend), then:
+
+    python benchmarks/bench_ingest_latency.py --url http://localhost:8000 --uploads 10 --seconds 600
+
+Each upload is a synthetic 44.1 kHz stereo WAV, so the server has to run ffmpeg on it, and
+every upload gets different bytes so deduplication does not skip the work. While the uploads
+are in flight, GET /healthz is probed continuously; its p50/p99 latency is compared with an
+idle baseline. The uploads create real transcription jobs; delete them afterwards.
+"""
+import io
+import sys
+import time
+import wave
+import argparse
+import threading
+import statistics
+import requests
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def synthetic_wav(seconds: float, seed: int) -> bytes:
+    rate, channels = 44100, 2
+    frame = bytes([(seed * 7 + i) % 256 for i in range(4)])
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(seed.to_bytes(8, "little") + frame * int(rate * seconds))
+    return buf.getvalue()
+
+
+def probe(url: str, until: threading.Event, latencies: list):
+    session = requests.Session()
+    while not until.is_set():
+        started = time.perf_counter()
+        session.get(f"{url}/healthz", timeout=60).raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+
+def report(label, latencies):
+    ms = [v * 1000 for v in latencies]
+    print(f"{label:>16}: n={len(ms)} p50={percentile(ms, 50):.1f}ms p99={percentile(ms, 99):.1f}ms max={max(ms):.1f}ms")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Probe /healthz latency during concurrent upload conversions")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--uploads", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=600, help="Length of each synthetic recording")
+    parser.add_argument("--baseline", type=float, default=3.0, help="Seconds of idle probing first")
+    args = parser.parse_args()
+    url = args.url.rstrip("/")
+
+    stop = threading.Event()
+    baseline = []
+    prober = threading.Thread(target=probe, args=(url, stop, baseline))
+    prober.start()
+    time.sleep(args.baseline)
+    stop.set()
+    prober.join()
+    report("idle", baseline)
+
+    bodies = [synthetic_wav(args.seconds, int(time.time() * 1000) + i) for i in range(args.uploads)]
+    accept = []
+    statuses = []
+
+    def upload(i):
+        started = time.perf_counter()
+        response = requests.post(f"{url}/upload-audio/stream", params={"filename": f"bench-ingest-{i}.wav"}, data=bodies[i], timeout=3600)
+        accept.append(time.perf_counter() - started)
+        statuses.append(response.status_code)
+
+    stop = threading.Event()
+    loaded = []
+    prober = threading.Thread(target=probe, args=(url, stop, loaded))
+    prober.start()
+    started = time.perf_counter()
+    uploaders = [threading.Thread(target=upload, args=(i,)) for i in range(args.uploads)]
+    for t in uploaders:
+        t.start()
+    for t in uploaders:
+        t.join()
+    stop.set()
+    prober.join()
+    report(f"{args.uploads} conversions", loaded)
+    print(f"uploads: {statuses.count(200)}/{len(statuses)} accepted in {time.perf_counter() - started:.2f}s, "
+          f"accept latency mean={statistics.mean(accept):.2f}s max={max(accept):.2f}s")
+    if statuses.count(200) != len(statuses):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
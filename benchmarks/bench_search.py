@@ -0,0 +1,61 @@
+"""
+Measure full-text search latency of the transcription index at a given corpus size.
+
+    python benchmarks/bench_search.py --docs 100000
+
+Writes synthetic transcript metadata to a temp directory and indexes it with
+MetadataIndex.rebuild (the same path as `python main.py --rebuild-index`).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metadata_index import MetadataIndex
+
+WORDS = ("budget meeting quarter roadmap customer release deadline hiring design review "
+         "migration database latency invoice contract marketing launch feedback sprint "
+         "planning retro onboarding security incident outage vendor pricing forecast").split()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark full-text search")
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=300, help="Words per synthetic transcript")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.docs):
+            # Rare made-up tokens make some queries selective and others broad
+            text = " ".join(rng.choice(WORDS) for _ in range(args.words)) + f" token{i % 997}"
+            meta = {"datetime": f"2025-01-01T00:00:{i % 60:02d}Z", "markdown_title": f"Doc {i}",
+                    "status": "success", "transcription_text": text}
+            with open(os.path.join(tmp, f"doc{i}.json"), "w") as jf:
+                json.dump(meta, jf)
+        index = MetadataIndex(os.path.join(tmp, "index.db"))
+        started = time.perf_counter()
+        index.rebuild(tmp)
+        print(f"rebuilt index of {args.docs} docs in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        index.index_text("doc0.json", "Doc 0", "incremental update")
+        print(f"incremental update: {(time.perf_counter() - started) * 1000:.1f}ms")
+        queries = [rng.choice(WORDS) for _ in range(args.queries // 2)] + \
+                  [f"token{rng.randrange(997)}" for _ in range(args.queries // 2)] + ["budg", "roadmap relea"]
+        timings = []
+        for q in queries:
+            started = time.perf_counter()
+            index.search(q, 20)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        print(f"search: n={len(timings)} mean={statistics.mean(timings):.1f}ms "
+              f"p50={timings[len(timings) // 2]:.1f}ms p95={timings[int(len(timings) * 0.95)]:.1f}ms max={timings[-1]:.1f}ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,136 @@
+"""
+Measure cold-start time of the API server and the web UI, and the per-request cost of reading
+configuration, so regressions in import-time work show up.
+
+    python benchmarks/bench_startup.py --runs 10 --requests 2000
+
+Cold start: each of main and webui is imported --runs times, each time in a fresh interpreter in a
+temporary directory with its own config.yaml. Reported are the median and best import time, and
+which heavy optional modules (requests, httpx, markdown2, ollama_client) the import pulled in.
+
+Per request, in this process: a settings lookup against a full yaml parse of config.yaml (what
+every OllamaClient construction and web UI config loader used to cost), get_client(), and
+GET /healthz and /api/ollama/stats through the ASGI apps. Finally config.yaml is edited and the
+time until get_client() hands out a client with the new model is reported (hot reload).
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("requests", "httpx", "markdown2", "ollama_client", "yaml")
+
+CONFIG = """\
+upload_dir: "uploads"
+transcriptions_dir: "transcriptions"
+markdowns_dir: "markdowns"
+whisper:
+  exe_path: "/bin/true"
+  model_path: "model.bin"
+ollama:
+  host: "http://127.0.0.1"
+  port: 9
+  model: "{model}"
+llm_cache:
+  enabled: false
+logging:
+  file: "server.log"
+  level: "WARNING"
+"""
+
+IMPORT_PROBE = """\
+import sys, time, json
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"sec": time.perf_counter() - started, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def cold_start(module: str, directory: str, runs: int, show: bool = True):
+    times, loaded = [], set()
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             cwd=directory, env=env, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        times.append(result["sec"])
+        loaded.update(result["loaded"])
+    if show:
+        print(f"cold start {module:6s} median {statistics.median(times) * 1000:7.1f} ms  best {min(times) * 1000:7.1f} ms  "
+              f"loaded: {', '.join(sorted(loaded)) or '-'}")
+
+
+def per_call(label: str, fn, n: int):
+    fn()
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    print(f"{label:32s} {(time.perf_counter() - started) / n * 1e6:9.1f} us")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark cold start and per-request config overhead")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per cold-start timing")
+    parser.add_argument("--requests", type=int, default=2000, help="Calls per per-request timing")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary directory")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-startup-")
+    with open(os.path.join(tmp, "config.yaml"), "w") as f:
+        f.write(CONFIG.format(model="before"))
+    open(os.path.join(tmp, "model.bin"), "w").close()
+    # webui mounts static/ relative to the working directory
+    os.symlink(os.path.join(REPO_DIR, "static"), os.path.join(tmp, "static"))
+    try:
+        # The first import also creates the data directories; time the steady state
+        cold_start("main", tmp, 1, show=False)
+        for module in ("main", "webui"):
+            cold_start(module, tmp, args.runs)
+
+        os.chdir(tmp)
+        sys.path.insert(0, REPO_DIR)
+        import yaml
+        import main
+        import webui
+        from fastapi.testclient import TestClient
+        from ollama_client import get_client
+
+        def parse_config():
+            with open("config.yaml") as f:
+                return yaml.safe_load(f)
+
+        n = args.requests
+        per_call("yaml parse of config.yaml", parse_config, max(1, n // 10))
+        per_call("settings.section('ollama')", lambda: main.settings.section("ollama"), n)
+        per_call("get_client()", get_client, n)
+        api, ui = TestClient(main.app), TestClient(webui.app)
+        per_call("GET /healthz (api)", lambda: api.get("/healthz"), max(1, n // 10))
+        per_call("GET /api/ollama/stats (ui)", lambda: ui.get("/api/ollama/stats"), max(1, n // 10))
+
+        with open("config.yaml", "w") as f:
+            f.write(CONFIG.format(model="after"))
+        started = time.perf_counter()
+        while get_client().model != "after":
+            if time.perf_counter() - started > 10:
+                print("hot reload: config change not picked up within 10s")
+                break
+            time.sleep(0.01)
+        else:
+            print(f"hot reload: new ollama.model in use after {time.perf_counter() - started:.2f}s "
+                  f"(check interval {main.settings.check_interval}s)")
+    finally:
+        os.chdir(REPO_DIR)
+        if args.keep:
+            print(f"kept {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_cli()
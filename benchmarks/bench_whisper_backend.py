@@ -0,0 +1,72 @@
+"""
+Compare the one-shot whisper-cli backend with the model-resident whisper-server pool on short clips.
+
+Run from the repository root (it reads config.yaml like the server does):
+
+    python benchmarks/bench_whisper_backend.py clip1.wav clip2.wav --repeat 5
+
+Clips must already be 16 kHz mono WAV.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def remove_outputs(name):
+    """Delete everything a run wrote for name: <name>.txt and .segments.json (in any compression) and scratch."""
+    for fname in os.listdir(main.TRANSCRIPTIONS_DIR):
+        if fname.startswith(name + "."):
+            os.remove(os.path.join(main.TRANSCRIPTIONS_DIR, fname))
+
+
+def run(label, clips, repeat):
+    timings = []
+    for i in range(repeat):
+        for clip in clips:
+            name = f"bench-{label}-{i}-{os.path.splitext(os.path.basename(clip))[0]}"
+            started = time.perf_counter()
+            transcript = main.transcribe_with_whisper(clip, name, threads=main.WHISPER_THREADS)
+            timings.append(time.perf_counter() - started)
+            if transcript.startswith("("):
+                print(f"[{label}] {clip}: {transcript}")
+            remove_outputs(name)
+    print(f"{label:>7}: n={len(timings)} mean={statistics.mean(timings):.3f}s "
+          f"p50={percentile(timings, 50):.3f}s p95={percentile(timings, 95):.3f}s")
+    return timings
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark whisper.cpp cli vs server backends")
+    parser.add_argument("clips", nargs="+", help="Short 16 kHz mono WAV clips")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    main.whisper_pool = None
+    cli = run("cli", args.clips, args.repeat)
+
+    main.settings.data["whisper"] = dict(main.settings.section("whisper"), backend="server")
+    pool = main.build_whisper_pool()
+    started = time.perf_counter()
+    pool.start()
+    print(f"server pool start-up (model load): {time.perf_counter() - started:.3f}s")
+    main.whisper_pool = pool
+    try:
+        server = run("server", args.clips, args.repeat)
+    finally:
+        pool.stop()
+    print(f"speedup (mean): {statistics.mean(cli) / statistics.mean(server):.2f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,119 @@
+import os
+import time
+import shutil
+import tarfile
+import zipfile
+import hashlib
+
+# Files picked up from directories and archives; anything else is skipped
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".mp4", ".aac", ".ogg", ".oga", ".opus", ".webm", ".flac", ".wma", ".mkv", ".mov", ".amr", ".3gp")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def is_audio_name(name: str) -> bool:
+    base = os.path.basename(name)
+    # macOS resource forks (__MACOSX/._name) and other hidden files are not recordings
+    if not base or base.startswith(".") or "__MACOSX" in name.split("/"):
+        return False
+    return base.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def is_archive_name(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def copy_and_hash(src, dest_path: str, chunk_size: int = 1024 * 1024):
+    """Copy a binary file object to dest_path in chunks. Returns (bytes copied, sha256 hex digest)."""
+    size = 0
+    digest = hashlib.sha256()
+    with open(dest_path, "wb") as dest:
+        for chunk in iter(lambda: src.read(chunk_size), b""):
+            dest.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024):
+    """(size, sha256 hex digest) of a file on disk, read in chunks."""
+    size = 0
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def copy_file(src_path: str, dest_path: str):
+    shutil.copyfile(src_path, dest_path)
+
+
+def extract_archive(archive_path: str, new_path, chunk_size: int = 1024 * 1024):
+    """
+    Copy every audio member of a zip or tar archive to a fresh path from new_path(), one
+    member at a time, without unpacking the archive as a whole. Member paths are never used on
+    disk, so names like ../../x cannot escape. Returns [(file name, path, size, sha256)].
+    """
+    extracted = []
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not is_audio_name(info.filename):
+                    continue
+                dest = new_path()
+                with zf.open(info) as src:
+                    size, content_hash = copy_and_hash(src, dest, chunk_size)
+                extracted.append((os.path.basename(info.filename), dest, size, content_hash))
+        return extracted
+    # Streaming mode ("r|*") reads the tar, compressed or not, front to back exactly once
+    with tarfile.open(archive_path, "r|*") as tf:
+        for member in tf:
+            if not member.isfile() or not is_audio_name(member.name):
+                continue
+            dest = new_path()
+            size, content_hash = copy_and_hash(tf.extractfile(member), dest, chunk_size)
+            extracted.append((os.path.basename(member.name), dest, size, content_hash))
+    return extracted
+
+
+def find_audio_files(directory: str) -> list:
+    """Audio files and archives under directory, recursively, in a stable order."""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if is_audio_name(path) or (is_archive_name(name) and not name.startswith(".")):
+                found.append(path)
+    return found
+
+
+class IngestStats:
+    """Counters of a bulk ingest run and its throughput."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.files = 0
+        self.submitted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.transcribed = 0
+        self.audio_sec = 0.0
+        self.bytes = 0
+
+    def summary(self) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            "files": self.files,
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "transcribed": self.transcribed,
+            "audio_hours": round(self.audio_sec / 3600, 3),
+            "elapsed_sec": round(elapsed, 1),
+            "files_per_min": round(self.transcribed / elapsed * 60, 2),
+            # Hours of audio transcribed per hour of wall time (the real-time factor, inverted)
+            "audio_hours_per_hour": round(self.audio_sec / elapsed, 2),
+            "mb_per_sec": round(self.bytes / elapsed / 1e6, 2),
+        }
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+from meta_store import atomic_write_text
+
+# Stages recorded for a job; the last three end it
+JOURNAL_STAGES = ("converting", "queued", "transcribed", "done", "error", "abandoned")
+FINISHED_STAGES = ("done", "error", "abandoned")
+
+
+class JobJournal:
+    """
+    Append-only JSON-lines log of each job's last completed stage, fsynced on every record,
+    so a restart knows which jobs were in flight and how far they got. Fields given to
+    record() accumulate per job (the queued record carries the job dict for resubmission).
+    Finished jobs are dropped by compact(), which the server runs at startup.
+
+    Every open journal holds a shared flock on the file it appends to, and compact() only
+    replaces the file while it holds the lock exclusively, so it never swaps the file out from
+    under another process (whose later records would go to the unlinked copy).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = self._load()
+        self._file = self._open()
+
+    def _open(self):
+        while True:
+            f = open(self.path, "a", encoding="utf-8")
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+            # A compaction may have replaced the file while we waited for the lock; use the new one
+            if os.path.exists(self.path) and os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino:
+                return f
+            f.close()
+
+    def compact(self) -> bool:
+        """
+        Rewrite the file with just the unfinished jobs so it does not grow without bound.
+        Skipped, returning False, while another process has the journal open.
+        """
+        with self._lock:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # A failed conversion may have released the shared lock; take it back
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_SH)
+                logging.info(f"{self.path} is open in another process; not compacting it")
+                return False
+            # Re-read under the exclusive lock: the other process may have appended before it closed
+            self._state = self._load()
+            atomic_write_text(self.path, "".join(json.dumps(entry) + "\n" for entry in self._state.values()))
+            # Closing drops the lock on the old file; processes waiting on it reopen the new one
+            self._file.close()
+            self._file = self._open()
+            return True
+
+    def _load(self) -> dict:
+        state = {}
+        if not os.path.exists(self.path):
+            return state
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A record torn by a crash mid-append; everything before it is intact
+                    logging.warning(f"Skipping unreadable job journal line in {self.path}")
+                    continue
+                job_id = entry.get("id")
+                if entry.get("stage") in FINISHED_STAGES:
+                    state.pop(job_id, None)
+                elif job_id:
+                    state[job_id] = dict(state.get(job_id, {}), **entry)
+        return state
+
+    def record(self, job_id: str, stage: str, **fields):
+        entry = dict(fields, id=job_id, stage=stage, at=round(time.time(), 3))
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if stage in FINISHED_STAGES:
+                self._state.pop(job_id, None)
+            else:
+                self._state[job_id] = dict(self._state.get(job_id, {}), **entry)
+
+    def stage(self, job_id: str):
+        """Last recorded stage of an unfinished job, or None."""
+        with self._lock:
+            entry = self._state.get(job_id)
+            return entry["stage"] if entry else None
+
+    def unfinished(self) -> list:
+        """Merged records of jobs without a finishing record, oldest first."""
+        with self._lock:
+            return sorted((dict(entry) for entry in self._state.values()), key=lambda entry: entry.get("at", 0))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
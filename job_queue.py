@@ -0,0 +1,201 @@
+import os
+import json
+import math
+import heapq
+import time
+import queue
+import logging
+import itertools
+import threading
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    Bounded priority queue of transcription jobs drained by a fixed pool of worker threads.
+    Lower priority values run first; equal priorities run in FIFO order.
+    Pending jobs are spooled to spool_dir as JSON so they survive a restart.
+    """
+
+    def __init__(self, handler, workers: int = 1, max_size: int = 100, spool_dir: str = None):
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.max_size = max(1, int(max_size))
+        self.spool_dir = spool_dir
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._restored = False
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def restore(self):
+        """
+        Load jobs spooled by a previous run without starting the workers, so the caller can
+        reconcile them (see discard()) before anything runs. start() does this if it was not done.
+        """
+        with self._lock:
+            if self._restored:
+                return
+            self._restored = True
+        self._restore_spool()
+
+    def start(self):
+        if self._threads:
+            return
+        self.restore()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, args=(i,), name=f"transcribe-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def retry_after(self) -> int:
+        with self._lock:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self) -> int:
+        # A queue slot frees up roughly every (average job run time / workers) seconds
+        done = self._completed + self._failed
+        avg_run = self._run_total / done if done else 30.0
+        return max(1, math.ceil(avg_run / self.workers))
+
+    def check_capacity(self):
+        """
+        Raise QueueFullError if a new job would be rejected, so callers can refuse
+        work before doing any conversion.
+        """
+        with self._lock:
+            if self._queue.qsize() >= self.max_size:
+                self._rejected += 1
+                raise QueueFullError(self._retry_after_locked())
+
+    def submit(self, job: dict, priority: int = 0) -> int:
+        """
+        Enqueue a job dict (must contain "id"). Returns its position in the queue.
+        Raises QueueFullError when max_size jobs are already waiting.
+        """
+        with self._lock:
+            if self._queue.qsize() >= self.max_size:
+                self._rejected += 1
+                raise QueueFullError(self._retry_after_locked())
+            seq = next(self._seq)
+            entry = {"job": job, "priority": priority, "seq": seq, "enqueued_at": time.time()}
+            entry["spool_path"] = self._spool(entry)
+            self._queue.put((priority, seq, entry))
+            return self._queue.qsize()
+
+    def position(self, job_id: str):
+        """1-based position of a waiting job in run order, or None if it is not waiting."""
+        waiting = self.waiting_ids()
+        return waiting.index(job_id) + 1 if job_id in waiting else None
+
+    def discard(self, job_id: str):
+        """Remove a waiting job and its spool file. Returns its job dict, or None if it is not waiting."""
+        with self._queue.mutex:
+            for item in self._queue.queue:
+                if item[2]["job"].get("id") == job_id:
+                    self._queue.queue.remove(item)
+                    heapq.heapify(self._queue.queue)
+                    # Never handed to a worker, so task_done() will not be called for it
+                    self._queue.unfinished_tasks -= 1
+                    break
+            else:
+                return None
+        spool_path = item[2].get("spool_path")
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
+        return item[2]["job"]
+
+    def waiting_ids(self) -> list:
+        with self._queue.mutex:
+            return [item[2]["job"].get("id") for item in sorted(self._queue.queue, key=lambda item: item[:2])]
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._completed + self._failed
+            return {
+                "depth": self._queue.qsize(),
+                "max_size": self.max_size,
+                "workers": self.workers,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "wait_sec_avg": round(self._wait_total / done, 3) if done else 0.0,
+                "wait_sec_max": round(self._wait_max, 3),
+                "run_sec_avg": round(self._run_total / done, 3) if done else 0.0,
+            }
+
+    def _spool(self, entry: dict):
+        if not self.spool_dir:
+            return None
+        # Enqueue time in the name keeps spool files sorted in submission order across restarts
+        path = os.path.join(self.spool_dir, f"{int(entry['enqueued_at'] * 1e6):020d}-{entry['job']['id']}.json")
+        with open(path, "w") as f:
+            json.dump({k: v for k, v in entry.items() if k != "spool_path"}, f)
+        return path
+
+    def _restore_spool(self):
+        if not self.spool_dir:
+            return
+        restored = 0
+        for fname in sorted(os.listdir(self.spool_dir)):
+            if not fname.endswith(".json"):
+                continue
+            path = os.path.join(self.spool_dir, fname)
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+            except Exception:
+                logging.exception(f"Dropping unreadable spooled job {path}")
+                os.remove(path)
+                continue
+            # Re-number so restored jobs keep their order ahead of new submissions
+            seq = next(self._seq)
+            entry["spool_path"] = path
+            self._queue.put((entry.get("priority", 0), seq, entry))
+            restored += 1
+        if restored:
+            logging.info(f"Restored {restored} spooled transcription jobs")
+
+    def _worker(self, index: int):
+        while True:
+            _, _, entry = self._queue.get()
+            waited = time.time() - entry["enqueued_at"]
+            with self._lock:
+                self._running += 1
+                self._wait_max = max(self._wait_max, waited)
+            started = time.time()
+            ok = True
+            try:
+                self.handler(entry["job"])
+            except Exception:
+                ok = False
+                logging.exception(f"Job {entry['job'].get('id')} failed in worker {index}")
+            finally:
+                elapsed = time.time() - started
+                with self._lock:
+                    self._running -= 1
+                    self._wait_total += waited
+                    self._run_total += elapsed
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                spool_path = entry.get("spool_path")
+                if spool_path and os.path.exists(spool_path):
+                    os.remove(spool_path)
+                self._queue.task_done()
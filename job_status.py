@@ -0,0 +1,169 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+# Stages a job moves through; "done" and "error" are terminal
+STAGES = ("converting", "queued", "transcribing", "polishing", "done", "error")
+TERMINAL_STAGES = ("done", "error")
+
+
+class JobTracker:
+    """
+    In-memory status of upload jobs for /jobs/{id}: current stage, progress, per-stage
+    timings and a version number that increases on every change. Worker threads update it;
+    async request handlers wait for changes without holding a thread (long-poll and SSE), and
+    registered webhooks are POSTed the final status. The most recent `keep` finished jobs are
+    remembered; older ones are answered from their metadata JSON by the caller.
+    """
+
+    def __init__(self, keep: int = 1000, webhook_retries: int = 3, webhook_timeout: float = 10.0):
+        self.keep = keep
+        self.webhook_retries = webhook_retries
+        self.webhook_timeout = webhook_timeout
+        self._jobs = OrderedDict()
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def _touch_locked(self, job_id: str) -> dict:
+        job = self._jobs.get(job_id)
+        if job is None:
+            now = time.time()
+            job = {"id": job_id, "stage": None, "progress": None, "timings": {}, "created_at": now,
+                   "updated_at": now, "error": None, "markdown_file": None, "webhooks": [], "version": 0,
+                   "_stage_started": now}
+            self._jobs[job_id] = job
+        return job
+
+    def _notify_locked(self, job_id: str):
+        for loop, event in self._waiters.get(job_id, []):
+            loop.call_soon_threadsafe(event.set)
+
+    def update(self, job_id: str, stage: str = None, progress=None, **fields):
+        """Record a stage change and/or progress ((done, total) or None) for a job, creating it if unknown."""
+        webhooks = None
+        with self._lock:
+            job = self._touch_locked(job_id)
+            now = time.time()
+            if stage and stage != job["stage"]:
+                if job["stage"]:
+                    job["timings"][job["stage"]] = round(now - job["_stage_started"], 3)
+                job["stage"] = stage
+                job["_stage_started"] = now
+                job["progress"] = None
+            if progress is not None:
+                job["progress"] = {"done": progress[0], "total": progress[1]}
+            job.update(fields)
+            job["updated_at"] = now
+            job["version"] += 1
+            if stage in TERMINAL_STAGES:
+                job["timings"]["total"] = round(now - job["created_at"], 3)
+                webhooks = list(job["webhooks"])
+                self._jobs.move_to_end(job_id)
+                self._trim_locked()
+            self._notify_locked(job_id)
+            snapshot = self._snapshot_locked(job)
+        if webhooks:
+            threading.Thread(target=self._deliver, args=(webhooks, snapshot), name="job-webhook", daemon=True).start()
+
+    def track(self, job_id: str, stage: str, **fields):
+        """
+        Start tracking a job at stage unless it is already known: jobs restored from the spool,
+        or jobs known only from their metadata, which may already be finished.
+        """
+        with self._lock:
+            if job_id in self._jobs:
+                return
+            job = self._touch_locked(job_id)
+            job["stage"] = stage
+            job.update(fields)
+            job["version"] += 1
+            if stage in TERMINAL_STAGES:
+                self._trim_locked()
+            self._notify_locked(job_id)
+
+    def finish(self, job_id: str, status: str, error: str = None, markdown_file: str = None):
+        self.update(job_id, stage="done" if status == "success" else "error", error=error, markdown_file=markdown_file)
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._notify_locked(job_id)
+
+    def add_webhook(self, job_id: str, url: str) -> bool:
+        """Register a callback URL; if the job already finished it is called right away. False if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            if url not in job["webhooks"]:
+                job["webhooks"].append(url)
+            finished = job["stage"] in TERMINAL_STAGES
+            snapshot = self._snapshot_locked(job)
+        if finished:
+            threading.Thread(target=self._deliver, args=([url], snapshot), name="job-webhook", daemon=True).start()
+        return True
+
+    def _trim_locked(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["stage"] in TERMINAL_STAGES]
+        for job_id in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _snapshot_locked(job: dict) -> dict:
+        snapshot = {k: v for k, v in job.items() if not k.startswith("_") and k != "webhooks"}
+        snapshot["timings"] = dict(job["timings"])
+        if job["stage"] not in TERMINAL_STAGES:
+            # Time spent so far in the current stage
+            snapshot["timings"][job["stage"]] = round(time.time() - job["_stage_started"], 3)
+        snapshot["status"] = {"done": "success", "error": "error"}.get(job["stage"], "processing")
+        return snapshot
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._snapshot_locked(job) if job else None
+
+    async def wait(self, job_id: str, after_version: int, timeout: float):
+        """
+        Wait until the job's version is greater than after_version (or it finishes, or is
+        forgotten), at most timeout seconds. Returns the current snapshot, or None if unknown.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            event = asyncio.Event()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job["version"] > after_version or job["stage"] in TERMINAL_STAGES:
+                    return self._snapshot_locked(job) if job else None
+                waiter = (loop, event)
+                self._waiters.setdefault(job_id, []).append(waiter)
+            try:
+                await asyncio.wait_for(event.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                return self.get(job_id)
+            finally:
+                with self._lock:
+                    waiters = self._waiters.get(job_id, [])
+                    if waiter in waiters:
+                        waiters.remove(waiter)
+                    if not waiters:
+                        self._waiters.pop(job_id, None)
+
+    def _deliver(self, urls, snapshot: dict):
+        # Imported on first delivery: most processes never register a webhook
+        import requests
+        for url in urls:
+            for attempt in range(self.webhook_retries + 1):
+                try:
+                    response = requests.post(url, json=snapshot, timeout=self.webhook_timeout)
+                    if response.status_code < 500:
+                        break
+                except requests.RequestException as e:
+                    logging.warning(f"Webhook {url} for job {snapshot['id']} failed: {e}")
+                if attempt < self.webhook_retries:
+                    time.sleep(2 ** attempt)
+            else:
+                logging.error(f"Giving up on webhook {url} for job {snapshot['id']}")
@@ -0,0 +1,171 @@
+import queue
+import logging
+import threading
+import subprocess
+
+# Live audio is kept and transcribed as 16 kHz mono s16 PCM
+LIVE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+
+
+def ms_to_bytes(ms: int, rate: int = LIVE_RATE) -> int:
+    return int(ms * rate / 1000) * BYTES_PER_SAMPLE
+
+
+def bytes_to_ms(size: int, rate: int = LIVE_RATE) -> int:
+    return size // BYTES_PER_SAMPLE * 1000 // rate
+
+
+class PassthroughDecoder:
+    """Input that is already 16 kHz mono s16le PCM."""
+
+    def __init__(self):
+        self._odd = b""
+
+    def feed(self, data: bytes) -> bytes:
+        # Keep whole samples only; a chunk may end in the middle of one
+        data = self._odd + data
+        cut = len(data) - len(data) % BYTES_PER_SAMPLE
+        self._odd = data[cut:]
+        return data[:cut]
+
+    def close(self) -> bytes:
+        return b""
+
+
+class FfmpegDecoder:
+    """
+    Decode a live stream (Ogg/WebM Opus, or PCM at another rate or channel count) to 16 kHz
+    mono s16le with one long-running ffmpeg process. Bytes are written to its stdin as they
+    arrive; a reader thread collects whatever PCM ffmpeg has produced so far.
+    """
+
+    def __init__(self, input_args=()):
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", *input_args, "-i", "pipe:0",
+               "-f", "s16le", "-ac", "1", "-ar", str(LIVE_RATE), "pipe:1"]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._out = queue.Queue()
+        self._odd = b""
+        self._reader = threading.Thread(target=self._read_loop, name="live-ffmpeg-reader", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        while True:
+            chunk = self.proc.stdout.read1(65536)
+            if not chunk:
+                break
+            self._out.put(chunk)
+
+    def _drain(self) -> bytes:
+        chunks = [self._odd]
+        while True:
+            try:
+                chunks.append(self._out.get_nowait())
+            except queue.Empty:
+                break
+        data = b"".join(chunks)
+        cut = len(data) - len(data) % BYTES_PER_SAMPLE
+        self._odd = data[cut:]
+        return data[:cut]
+
+    def feed(self, data: bytes) -> bytes:
+        """Write encoded bytes; returns the PCM decoded so far (possibly empty). Blocks on a full pipe."""
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+        return self._drain()
+
+    def close(self) -> bytes:
+        """End the input and return the rest of the decoded PCM."""
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._reader.join(timeout=30)
+        self.proc.wait(timeout=30)
+        return self._drain()
+
+
+def make_decoder(fmt: str, sample_rate: int = LIVE_RATE, channels: int = 1):
+    """Decoder for a /ws/transcribe stream: fmt is "pcm" (s16le) or "opus" (Ogg or WebM container)."""
+    if fmt == "pcm":
+        if sample_rate == LIVE_RATE and channels == 1:
+            return PassthroughDecoder()
+        return FfmpegDecoder(["-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels)])
+    if fmt == "opus":
+        # ffmpeg probes the container (Ogg from opus-recorder, WebM from MediaRecorder) itself
+        return FfmpegDecoder()
+    raise ValueError(f"Unsupported live audio format: {fmt}")
+
+
+class LiveTranscriber:
+    """
+    Sliding-window incremental transcription of a growing PCM stream.
+
+    Audio that is not yet final is kept in a window starting at the last commit point. Each
+    step transcribes the whole window with transcribe_window(pcm) -> [(start_ms, end_ms, text)]
+    (relative to the window). Lines that end at least guard_sec before the end of the window
+    and are followed by another line are final: they are committed and the window start moves
+    past them. The rest is reported as a partial hypothesis and transcribed again with more
+    context on the next step. A window that grows past window_sec is committed regardless, so
+    each step transcribes at most about window_sec of audio.
+    """
+
+    def __init__(self, transcribe_window, step_sec: float = 1.0, window_sec: float = 15.0, guard_sec: float = 0.5):
+        self.transcribe_window = transcribe_window
+        self.step_bytes = ms_to_bytes(int(step_sec * 1000))
+        self.window_ms = int(window_sec * 1000)
+        self.guard_ms = int(guard_sec * 1000)
+        self.finals = []
+        self.total_bytes = 0
+        self._pending = bytearray()
+        self._offset_ms = 0
+        self._unprocessed = 0
+        self._lock = threading.Lock()
+
+    def feed(self, pcm: bytes):
+        with self._lock:
+            self._pending += pcm
+            self._unprocessed += len(pcm)
+            self.total_bytes += len(pcm)
+
+    def ready(self) -> bool:
+        """True once step_sec of new audio has arrived since the last step."""
+        with self._lock:
+            return self._unprocessed >= self.step_bytes
+
+    def step(self, final: bool = False):
+        """
+        Transcribe the current window. Returns (new final lines, partial line or None), with
+        absolute (start_ms, end_ms, text) times. final=True commits everything left.
+        """
+        with self._lock:
+            window = bytes(self._pending)
+            offset_ms = self._offset_ms
+            self._unprocessed = 0
+        if not window:
+            return [], None
+        window_ms = bytes_to_ms(len(window))
+        lines = [line for line in self.transcribe_window(window) if line[2].strip()]
+        if final:
+            commit, cut_ms = lines, window_ms
+        else:
+            commit = [line for line in lines[:-1] if line[1] <= window_ms - self.guard_ms]
+            cut_ms = commit[-1][1] if commit else 0
+            if not commit and window_ms >= self.window_ms:
+                # Window full without a safe boundary: commit what there is (nothing, for silence)
+                commit, cut_ms = (lines[:-1], lines[-2][1]) if len(lines) > 1 else (lines, window_ms)
+        rest = lines[len(commit):]
+        committed = [(start + offset_ms, end + offset_ms, text) for start, end, text in commit]
+        with self._lock:
+            del self._pending[:ms_to_bytes(cut_ms)]
+            self._offset_ms += bytes_to_ms(ms_to_bytes(cut_ms))
+            self.finals.extend(committed)
+        partial = None
+        if rest and not final:
+            partial = (rest[0][0] + offset_ms, rest[-1][1] + offset_ms, "".join(text for _, _, text in rest))
+        if committed:
+            logging.debug(f"Live transcription committed {len(committed)} lines up to {self._offset_ms} ms")
+        return committed, partial
+
+    def duration_sec(self) -> float:
+        return self.total_bytes / BYTES_PER_SAMPLE / LIVE_RATE
@@ -0,0 +1,110 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+# Only these fields of a polishing result are stored; timings and flags belong to the run
+CACHED_FIELDS = ("markdown", "title", "file_name")
+
+
+def result_key(transcript_text: str, prompt: str, model: str, format_schema, variant: str = "") -> str:
+    """
+    Key of one polishing result. Any change to the transcript, prompt, model or JSON schema
+    (or variant, e.g. the chunking settings of a chunked run) is a different key.
+    """
+    schema = json.dumps(format_schema, sort_keys=True)
+    return hashlib.sha256(f"{transcript_text}\0{prompt}\0{model}\0{schema}\0{variant}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent cache of markdown polishing results in SQLite, keyed by result_key(), so a
+    repeat /generate_md or a re-processed transcript skips the Ollama generation. Entries are
+    evicted least recently used first beyond max_entries or max_bytes (zero disables a limit).
+    The API server and the web UI can share one database file.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 0, max_bytes: int = 0):
+        self.db_path = db_path
+        self.max_entries = int(max_entries or 0)
+        self.max_bytes = int(max_bytes or 0)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self._db.commit()
+
+    def _bump(self, name: str, amount: int = 1):
+        self._db.execute(
+            "INSERT INTO counters(name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + ?",
+            (name, amount, amount))
+
+    def get(self, key: str):
+        """Stored result dict for key, or None on a miss."""
+        with self._lock:
+            row = self._db.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._db.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._bump("hits" if row else "misses")
+            self._db.commit()
+        return json.loads(row[0]) if row else None
+
+    def bypass(self):
+        """Count a request that skipped the cache on purpose (refresh)."""
+        with self._lock:
+            self._bump("bypasses")
+            self._db.commit()
+
+    def put(self, key: str, result: dict):
+        data = json.dumps({k: result.get(k, "") for k in CACHED_FIELDS}, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results(key, result, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), now, now))
+            evicted = self._evict_locked()
+            self._db.commit()
+        if evicted:
+            logging.info(f"Evicted {evicted} cached LLM results")
+
+    def _evict_locked(self) -> int:
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        evicted = 0
+        if not ((self.max_entries and count > self.max_entries) or (self.max_bytes and total > self.max_bytes)):
+            return 0
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+            if not ((self.max_entries and count > self.max_entries) or (self.max_bytes and total > self.max_bytes)):
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        self._bump("evictions", evicted)
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": hits,
+            "misses": misses,
+            "bypasses": counters.get("bypasses", 0),
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "evictions": counters.get("evictions", 0),
+        }
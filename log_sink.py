@@ -0,0 +1,103 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+
+class BufferedLogWriter:
+    """
+    Writes log records for the whole process from one background thread. Request handlers
+    and workers only put records on a queue (logging.handlers.QueueHandler); the writer
+    collects formatted lines and appends them every flush_interval seconds, once buffer_size
+    bytes are pending, on WARNING and above, and at exit, instead of writing per line. Each
+    batch of whole lines is one O_APPEND write, so processes sharing the file (API server,
+    web UI, --compact) never split each other's lines.
+    """
+
+    def __init__(self, filename: str, flush_interval: float = 1.0, buffer_size: int = 64 * 1024, max_queue: int = 10000):
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.queue = queue.Queue(max_queue)
+        self.formatter = logging.Formatter(LOG_FORMAT)
+        self._fd = os.open(filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._pending = []
+        self._pending_bytes = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        data = "".join(self._pending).encode("utf-8", errors="replace")
+        self._pending, self._pending_bytes = [], 0
+        try:
+            while data:
+                data = data[os.write(self._fd, data):]
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush()
+                continue
+            if record is None:
+                break
+            try:
+                line = self.formatter.format(record) + "\n"
+                self._pending.append(line)
+                self._pending_bytes += len(line)
+                if record.levelno >= logging.WARNING or self._pending_bytes >= self.buffer_size:
+                    self._flush()
+            except Exception:
+                pass
+        self._flush()
+        os.close(self._fd)
+
+    def stop(self):
+        self.queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops a record instead of blocking the caller when the writer falls behind."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def setup_logging(filename: str = "server.log", level=logging.INFO, flush_interval: float = 1.0, buffer_size: int = 64 * 1024) -> BufferedLogWriter:
+    """Route the root logger to a BufferedLogWriter on filename; repeated calls reuse it."""
+    with _writers_lock:
+        writer = _writers.get(filename)
+        if writer is None:
+            writer = _writers[filename] = BufferedLogWriter(filename, flush_interval=flush_interval, buffer_size=buffer_size)
+            root = logging.getLogger()
+            root.addHandler(DroppingQueueHandler(writer.queue))
+            root.setLevel(level)
+            # One line per HTTP call to Ollama is noise at INFO; failures still get through
+            logging.getLogger("httpx").setLevel(logging.WARNING)
+            atexit.register(writer.stop)
+        return writer
+
+
+def setup_logging_from_config(log_cfg: dict) -> BufferedLogWriter:
+    """setup_logging with the file, level, flush_interval and buffer_size of config.yaml's logging section."""
+    return setup_logging(log_cfg.get("file", "server.log"),
+                         level=getattr(logging, str(log_cfg.get("level", "INFO")).upper(), logging.INFO),
+                         flush_interval=float(log_cfg.get("flush_interval", 1.0)),
+                         buffer_size=int(log_cfg.get("buffer_size", 64 * 1024)))
@@ -0,0 +1,148 @@
+import os
+import wave
+import array
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Energy is measured over 20 ms frames when looking for a quiet split point
+FRAME_MS = 20
+# Lines from neighbouring segments may disagree on timing by this much without being duplicates
+OVERLAP_TOLERANCE_MS = 200
+
+
+def _quietest_frame(wf: wave.Wave_read, start: int, end: int) -> int:
+    """
+    Return the frame index in [start, end) at the start of the lowest-energy FRAME_MS window.
+    Expects 16-bit mono PCM.
+    """
+    rate = wf.getframerate()
+    step = max(1, rate * FRAME_MS // 1000)
+    wf.setpos(start)
+    samples = array.array("h")
+    samples.frombytes(wf.readframes(end - start))
+    best_pos, best_energy = start, None
+    for offset in range(0, max(1, len(samples) - step + 1), step):
+        energy = sum(s * s for s in samples[offset:offset + step])
+        if best_energy is None or energy < best_energy:
+            best_pos, best_energy = start + offset, energy
+    return best_pos
+
+
+def can_split(wav_path: str) -> bool:
+    """True if wav_path is a 16-bit mono WAV that plan_segments can cut."""
+    try:
+        with wave.open(wav_path, "rb") as wf:
+            return wf.getsampwidth() == 2 and wf.getnchannels() == 1
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def plan_segments(wav_path: str, segment_sec: float, overlap_sec: float, search_sec: float = 2.0):
+    """
+    Split a 16 kHz mono s16 WAV into windows of about segment_sec seconds that overlap by overlap_sec.
+    Each cut is moved to the quietest frame within +/- search_sec of the nominal boundary so
+    words are rarely split. Returns a list of (start_frame, end_frame) pairs.
+    """
+    with wave.open(wav_path, "rb") as wf:
+        rate = wf.getframerate()
+        total = wf.getnframes()
+        seg = int(segment_sec * rate)
+        overlap = int(overlap_sec * rate)
+        # Keep the search window well inside a segment so cuts always move forward
+        search = min(int(search_sec * rate), seg // 4)
+        if total <= seg + overlap:
+            return [(0, total)]
+        cuts = []
+        nominal = seg
+        while nominal < total - overlap:
+            lo, hi = max(0, nominal - search), min(total, nominal + search)
+            cuts.append(_quietest_frame(wf, lo, hi) if search else nominal)
+            nominal = cuts[-1] + seg
+    segments = []
+    start = 0
+    for cut in cuts:
+        # Each segment runs past its cut by the overlap; the next one starts at the cut
+        segments.append((start, min(total, cut + overlap)))
+        start = cut
+    segments.append((start, total))
+    return segments
+
+
+def write_segment(wav_path: str, start: int, end: int, out_path: str):
+    with wave.open(wav_path, "rb") as src:
+        params = src.getparams()
+        src.setpos(start)
+        frames = src.readframes(end - start)
+    with wave.open(out_path, "wb") as dst:
+        dst.setparams(params)
+        dst.writeframes(frames)
+
+
+def stitch_segments(results, bounds, rate: int):
+    """
+    Merge per-segment whisper output into one timeline.
+
+    results[i] is a list of (start_ms, end_ms, text) relative to segment i, bounds[i] its
+    (start_frame, end_frame). Offsets are shifted to absolute time and overlap is deduplicated
+    by cutting at the middle of each overlap: a line is kept by whichever segment its
+    midpoint falls in. Because the two segments time the same speech slightly differently,
+    a line that still overlaps the previous segment's last kept line, or repeats its text,
+    is dropped as well.
+    """
+    stitched = []
+    for i, (lines, (start, end)) in enumerate(zip(results, bounds)):
+        offset_ms = start * 1000 // rate
+        lower = 0 if i == 0 else (bounds[i][0] + bounds[i - 1][1]) * 500 // rate
+        upper = None if i == len(bounds) - 1 else (bounds[i + 1][0] + end) * 500 // rate
+        # Last line kept from the previous segment, the only one this segment can duplicate
+        boundary = stitched[-1] if stitched else None
+        for line_start, line_end, text in lines:
+            abs_start, abs_end = line_start + offset_ms, line_end + offset_ms
+            mid = (abs_start + abs_end) // 2
+            if mid < lower or (upper is not None and mid >= upper):
+                continue
+            if boundary and (abs_start < boundary[1] - OVERLAP_TOLERANCE_MS or (
+                    abs_start < boundary[1] + 5 * OVERLAP_TOLERANCE_MS
+                    and text.strip().lower() == boundary[2].strip().lower())):
+                continue
+            stitched.append((abs_start, abs_end, text))
+    return stitched
+
+
+def transcribe_long_audio(wav_path: str, work_name: str, transcribe_segment, segment_sec: float, overlap_sec: float, workers: int, on_progress=None):
+    """
+    Transcribe a long WAV by splitting it into overlapping segments and running them in parallel.
+
+    transcribe_segment(segment_path, segment_name) must return a list of (start_ms, end_ms, text)
+    relative to the segment. Each call drives its own whisper.cpp process, so the thread pool
+    here only waits on subprocesses. on_progress(done, total) is called after each segment.
+    Returns the stitched list of (start_ms, end_ms, text).
+    """
+    bounds = plan_segments(wav_path, segment_sec, overlap_sec)
+    with wave.open(wav_path, "rb") as wf:
+        rate = wf.getframerate()
+    total = len(bounds)
+    results = [None] * total
+    done = 0
+    if on_progress:
+        on_progress(0, total)
+    seg_dir = os.path.dirname(wav_path)
+
+    def run_one(index):
+        seg_path = os.path.join(seg_dir, f"{work_name}.seg{index:04d}.wav")
+        write_segment(wav_path, bounds[index][0], bounds[index][1], seg_path)
+        try:
+            return transcribe_segment(seg_path, f"{work_name}.seg{index:04d}")
+        finally:
+            os.remove(seg_path)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_one, i): i for i in range(total)}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+    logging.info(f"Transcribed {work_name} in {total} segments")
+    return stitch_segments(results, bounds, rate)
@@ -0,0 +1,130 @@
+import re
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Sentence ends: ., !, ? or an ellipsis, followed by whitespace
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+# Characters of the merged markdown shown to the model when it picks the title and file name
+TITLE_EXCERPT_CHARS = 4000
+
+
+def _units(text: str):
+    """Split text into sentences, keeping a paragraph break after the last sentence of each paragraph."""
+    units = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        sentences = [s for s in SENTENCE_END.split(paragraph.strip()) if s]
+        if not sentences:
+            continue
+        sentences[-1] += "\n\n"
+        units.extend(s if s.endswith("\n\n") else s + " " for s in sentences)
+    return units
+
+
+def _hard_split(unit: str, limit: int):
+    # A "sentence" longer than a chunk (e.g. unpunctuated whisper output) is cut at whitespace
+    pieces = []
+    while len(unit) > limit:
+        cut = unit.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        pieces.append(unit[:cut] + " ")
+        unit = unit[cut:].lstrip()
+    if unit:
+        pieces.append(unit)
+    return pieces
+
+
+def split_transcript(text: str, chunk_chars: int, overlap_chars: int):
+    """
+    Split text into chunks of at most about chunk_chars characters on sentence or paragraph
+    boundaries. Returns a list of {"text", "context"} dicts, where context is the last
+    overlap_chars (or fewer) characters of whole sentences before the chunk, given to the
+    model for continuity but not polished again.
+    """
+    units = []
+    for unit in _units(text):
+        units.extend(_hard_split(unit, chunk_chars) if len(unit) > chunk_chars else [unit])
+    chunks, current, size = [], [], 0
+    for unit in units:
+        if current and size + len(unit) > chunk_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit)
+    if current:
+        chunks.append(current)
+    result = []
+    for i, chunk in enumerate(chunks):
+        context = []
+        if i > 0 and overlap_chars > 0:
+            used = 0
+            for unit in reversed(chunks[i - 1]):
+                if used + len(unit) > overlap_chars:
+                    break
+                context.insert(0, unit)
+                used += len(unit)
+        result.append({"text": "".join(chunk).strip(), "context": "".join(context).strip()})
+    return result
+
+
+def needs_chunking(text: str, chunking_cfg: dict) -> bool:
+    if not chunking_cfg.get("enabled", True):
+        return False
+    return len(text or "") > int(chunking_cfg.get("min_chars", chunking_cfg.get("chunk_chars", 12000)))
+
+
+def polish_long_transcript(text: str, client, on_chunk=None) -> dict:
+    """
+    Map-reduce polishing for transcripts too long for one generation.
+
+    Map: each chunk from split_transcript is polished on its own, up to chunking.workers at a
+    time (the client's max_in_flight still caps requests to Ollama). Reduce: the chunk markdown
+    is joined in order, then one short pass over the merged document's headings and opening
+    picks the title and file name. on_chunk(index, total, seconds) is called as chunks finish.
+
+    Returns {"markdown", "title", "file_name", "chunks", "merge_sec"}, where chunks lists
+    {"index", "chars", "sec"} per chunk. Raises if any chunk fails.
+    """
+    cfg = client.chunking
+    chunks = split_transcript(text, int(cfg.get("chunk_chars", 12000)), int(cfg.get("overlap_chars", 500)))
+    total = len(chunks)
+    markdowns = [None] * total
+    timings = [None] * total
+
+    def run_one(index):
+        started = time.monotonic()
+        markdown = client.polish_chunk(chunks[index]["text"], chunks[index]["context"])
+        return markdown, time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=max(1, int(cfg.get("workers", 2)))) as pool:
+        futures = {pool.submit(run_one, i): i for i in range(total)}
+        for future in as_completed(futures):
+            index = futures[future]
+            markdowns[index], elapsed = future.result()
+            timings[index] = {"index": index, "chars": len(chunks[index]["text"]), "sec": round(elapsed, 3)}
+            if on_chunk:
+                on_chunk(index, total, elapsed)
+    merged = "\n\n".join(md.strip() for md in markdowns if md and md.strip())
+    started = time.monotonic()
+    headings = "\n".join(line for line in merged.splitlines() if line.startswith("#"))
+    naming = client.title_markdown((headings + "\n\n" + merged)[:TITLE_EXCERPT_CHARS])
+    merge_sec = time.monotonic() - started
+    logging.info(f"Polished transcript in {total} chunks")
+    return {
+        "markdown": merged,
+        "title": naming.get("title", ""),
+        "file_name": naming.get("file_name", ""),
+        "chunks": timings,
+        "merge_sec": round(merge_sec, 3),
+    }
+
+
+def record_chunk_timings(meta: dict, llm_result: dict):
+    """Move chunk timings from a polishing result into the metadata; clear stale ones otherwise."""
+    if isinstance(llm_result, dict) and "chunks" in llm_result:
+        meta["markdown_chunks"] = llm_result.pop("chunks")
+        meta["markdown_merge_sec"] = llm_result.pop("merge_sec", None)
+    else:
+        meta.pop("markdown_chunks", None)
+        meta.pop("markdown_merge_sec", None)
@@ -1,186 +1,1407 @@
 import os
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request, BackgroundTasks
-from fastapi.responses import JSONResponse
-import yaml
-import io
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
+from typing import List
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
 import subprocess
 import logging
 from datetime import datetime
 import json
-from audio_utils import convert_audio_ffmpeg, get_audio_duration_ffprobe
+from audio_utils import prepare_audio, prepare_audio_async
+from job_queue import JobQueue, QueueFullError
+from job_status import JobTracker, TERMINAL_STAGES
+from whisper_server import WhisperServer, WhisperServerPool
+from long_audio import can_split, transcribe_long_audio
+from vad import MAX_FLOOR_DB, trim_silence, remap_segments
+from live_transcribe import LiveTranscriber, make_decoder, LIVE_RATE
+from long_transcript import needs_chunking, polish_long_transcript, record_chunk_timings
+from upload_cache import UploadCache, cache_key
+from llm_cache import LLMCache
+from metadata_index import MetadataIndex
+from metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE, JOBS_TOTAL, UPLOADS_TOTAL, Gauge, record_stage, stage_timer
+from log_sink import setup_logging_from_config
+from meta_store import atomic_write_json, job_lock, merge_meta, update_meta, reserve_name, release_name
+import storage
+from storage import shard_path, write_text, transcript_text
+from job_journal import JobJournal
+from settings import get_settings
+from bulk_ingest import IngestStats, is_archive_name, is_audio_name, extract_archive, find_audio_files, hash_file, copy_file
+from subtitles import (TRANSCRIPT_FORMATS, segments_path, save_segments, load_segments, segments_from_whisper_json,
+                       segments_from_verbose_json, render_transcript, read_transcript)
 import sys
 import argparse
+import resource
+import hashlib
+import tempfile
+import copy
+import itertools
+import uuid
+import time
+import wave
+import threading
+import fcntl
+import asyncio
+import re
 
-# Load configuration from config.yaml
-with open("config.yaml", "r") as f:
-    config = yaml.safe_load(f)
+# config.yaml, parsed once and re-parsed when the file changes. Only the values read into
+# module globals below need a restart: directories, upload_chunk_size, logging, queue, whisper
+# threads/backend and server pool, cache and llm_cache locations, jobs.keep/webhook_retries/journal_path.
+# Everything else is read through settings when used and applies to the next job or request.
+settings = get_settings("config.yaml")
 
-UPLOAD_DIR = config.get("upload_dir", "uploads")
+UPLOAD_DIR = settings.get("upload_dir", "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-TRANSCRIPTIONS_DIR = config.get("transcriptions_dir", "transcriptions")
+TRANSCRIPTIONS_DIR = settings.get("transcriptions_dir", "transcriptions")
 os.makedirs(TRANSCRIPTIONS_DIR, exist_ok=True)
+MARKDOWNS_DIR = settings.get("markdowns_dir", "markdowns")
+os.makedirs(MARKDOWNS_DIR, exist_ok=True)
+# Uploads are streamed to disk in chunks of this size, bounding per-request memory
+UPLOAD_CHUNK_SIZE = int(settings.get("upload_chunk_size", 1024 * 1024))
 
-# Setup logging
-logging.basicConfig(
-    filename="server.log",
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s"
-)
+# Setup logging: records go through a queue to one buffered writer thread
+setup_logging_from_config(settings.section("logging"))
 
 app = FastAPI()
 
-def convert_audio(input_bytes: bytes, input_format: str, output_format: str = "wav", sample_width: int = 2, channels: int = 1, frame_rate: int = 16000) -> bytes:
-    return convert_audio_ffmpeg(input_bytes, input_format, output_format, sample_width, channels, frame_rate)
+# Transcription worker pool: each worker runs one whisper.cpp process at a time,
+# pinned to an equal share of the cores through whisper's -t option
+queue_cfg = settings.section("queue")
+QUEUE_WORKERS = max(1, int(queue_cfg.get("workers", 1)))
+WHISPER_THREADS = int(settings.section("whisper").get("threads") or max(1, (os.cpu_count() or 1) // QUEUE_WORKERS))
+# List fields of every transcription, shared with the web UI
+meta_index = MetadataIndex(os.path.join(TRANSCRIPTIONS_DIR, "index.db"))
+# Content-addressed dedup of uploads; repeat uploads return the existing transcription
+cache_cfg = settings.section("cache")
+upload_cache = UploadCache(cache_cfg.get("db_path", os.path.join(UPLOAD_DIR, "cache.db"))) if cache_cfg.get("enabled", True) else None
+llm_cache_cfg = settings.section("llm_cache")
+llm_cache = LLMCache(
+    llm_cache_cfg.get("db_path", os.path.join(TRANSCRIPTIONS_DIR, "llm_cache.db")),
+    max_entries=llm_cache_cfg.get("max_entries", 1000),
+    max_bytes=llm_cache_cfg.get("max_bytes", 0),
+) if llm_cache_cfg.get("enabled", True) else None
+@settings.on_change
+def configure_storage(changed):
+    cfg = changed.section("storage")
+    storage.configure(cfg.get("compression", "none"), cfg.get("compression_level"), cfg.get("markdown_compression", "none"))
+
+configure_storage(settings)
+jobs_cfg = settings.section("jobs")
+jobs = JobTracker(keep=int(jobs_cfg.get("keep", 1000)), webhook_retries=int(jobs_cfg.get("webhook_retries", 3)))
+_journal = None
+_journal_lock = threading.Lock()
+
+def get_journal() -> JobJournal:
+    """
+    Last completed stage of every unfinished job, replayed at startup to resume interrupted work.
+    Opened on first use, so importing main (e.g. for --compact or a benchmark) leaves it alone.
+    """
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal(jobs_cfg.get("journal_path", os.path.join(TRANSCRIPTIONS_DIR, "journal.jsonl")))
+        return _journal
+
+def ingest_parallel() -> int:
+    """Conversions run at once by a batch upload or --ingest (transcription is bounded by queue.workers)."""
+    return max(1, int(settings.section("ingest").get("parallel", 2)))
+
+def job_max_attempts() -> int:
+    return max(1, int(settings.section("jobs").get("max_attempts", 3)))
+
+def evict_originals() -> int:
+    """Apply the cache.max_bytes / cache.max_age_days retention to archived originals."""
+    cfg = settings.section("cache")
+    return upload_cache.evict_originals(int(cfg.get("max_bytes", 0)), float(cfg.get("max_age_days", 0)))
+
+def convert_audio(input_bytes: bytes, input_format: str, frame_rate: int = 16000) -> bytes:
+    """Audio bytes in any format ffmpeg reads as the WAV whisper.cpp expects, via prepare_audio."""
+    with tempfile.TemporaryDirectory() as tmp:
+        in_path = os.path.join(tmp, "input." + input_format)
+        with open(in_path, "wb") as f:
+            f.write(input_bytes)
+        path, _ = prepare_audio(in_path, os.path.join(tmp, "output.wav"), frame_rate)
+        with open(path, "rb") as f:
+            return f.read()
 
 # Add whisper.cpp config loading
 def get_whisper_config():
-    whisper_cfg = config.get("whisper", {})
+    whisper_cfg = settings.section("whisper")
     exe_path = whisper_cfg.get("exe_path", "./whisper.cpp/main")
     model_path = whisper_cfg.get("model_path", "./models/ggml-base.en.bin")
     extra_args = whisper_cfg.get("extra_args", "")
     return exe_path, model_path, extra_args
 
-def transcribe_with_whisper(audio_path: str, transcript_name: str) -> str:
+def build_whisper_pool():
+    """
+    Build the pool of model-resident whisper.cpp servers when whisper.backend is "server".
+    Returns None for the default one-shot "cli" backend.
+    """
+    whisper_cfg = settings.section("whisper")
+    if whisper_cfg.get("backend", "cli") != "server":
+        return None
+    _, model_path, extra_args = get_whisper_config()
+    server_exe = whisper_cfg.get("server_exe_path", "~/whisper.cpp/build/bin/whisper-server")
+    base_port = int(whisper_cfg.get("server_base_port", 8910))
+    instances = int(whisper_cfg.get("server_instances") or QUEUE_WORKERS)
+    servers = [
+        WhisperServer(server_exe, model_path, port=base_port + i, threads=WHISPER_THREADS,
+                      extra_args=whisper_cfg.get("server_args", extra_args),
+                      startup_timeout=float(whisper_cfg.get("server_startup_timeout", 120)))
+        for i in range(instances)
+    ]
+    return WhisperServerPool(servers, health_interval=float(whisper_cfg.get("server_health_interval", 30)))
+
+whisper_pool = build_whisper_pool()
+
+def transcribe_with_whisper_server(audio_path: str, transcript_name: str) -> str:
+    transcript_path = os.path.join(TRANSCRIPTIONS_DIR, transcript_name)
+    logging.info(f"Sending {audio_path} to whisper server pool")
+    try:
+        result = json.loads(whisper_pool.transcribe(audio_path, response_format="verbose_json"))
+        segments = segments_from_verbose_json(result)
+        transcript = result.get("text") or render_transcript(segments, "txt")
+        # Keep the same .txt and .segments.json side files the one-shot CLI writes
+        write_text(transcript_path + ".txt", transcript)
+        save_segments(segments_path(transcript_path), segments)
+        return transcript
+    except Exception as e:
+        logging.exception(f"Transcription error: {e}")
+        return f"(Transcription error: {e})"
+
+def run_whisper_cli(audio_path: str, transcript_path: str, threads: int = None, output_flags=("-otxt",)):
+    """
+    Run one whisper-cli process writing the requested output formats to transcript_path.<ext>.
+    Raises subprocess.CalledProcessError on failure.
+    """
     exe_path, model_path, extra_args = get_whisper_config()
     exe_path = os.path.expanduser(exe_path)
     model_path = os.path.expanduser(model_path)
-    transcript_path = os.path.join(TRANSCRIPTIONS_DIR, transcript_name)
-    cmd = [exe_path, "-m", model_path, "-f", audio_path, "-otxt", "-of", transcript_path]
+    cmd = [exe_path, "-m", model_path, "-f", audio_path, *output_flags, "-of", transcript_path]
     if extra_args:
-        cmd += extra_args.split()
+        args = extra_args.split()
+        if "-oj" in output_flags:
+            # Segments need timestamps; -nt would leave only one untimed segment per 30 s window
+            args = [arg for arg in args if arg not in ("-nt", "--no-timestamps")]
+        cmd += args
+    if threads and "-t" not in cmd and "--threads" not in cmd:
+        cmd += ["-t", str(threads)]
     logging.info(f"Running whisper.cpp: {' '.join(cmd)}")
     try:
         result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-        logging.info(f"whisper.cpp stdout: {result.stdout}")
-        logging.info(f"whisper.cpp stderr: {result.stderr}")
-        txt_path = transcript_path + ".txt"
-        if os.path.exists(txt_path):
-            with open(txt_path, "r") as f:
-                return f.read()
+    except subprocess.CalledProcessError as e:
+        # Only the end of stderr: whisper.cpp prints its whole model load banner there
+        logging.error(f"whisper.cpp exited with {e.returncode}: {(e.stderr or '')[-2000:]}")
+        raise
+    # stdout repeats the whole transcript; log its size only
+    logging.debug(f"whisper.cpp wrote {len(result.stdout)} chars to stdout, {len(result.stderr)} to stderr")
+
+def transcribe_with_whisper(audio_path: str, transcript_name: str, threads: int = None) -> str:
+    if whisper_pool is not None:
+        return transcribe_with_whisper_server(audio_path, transcript_name)
+    transcript_path = os.path.join(TRANSCRIPTIONS_DIR, transcript_name)
+    # One run writes the text and the timed segments; whisper's own <name>.json would clash with
+    # the metadata file, so it writes under a scratch prefix and only the compact segments are kept
+    scratch_path = transcript_path + ".whisper"
+    try:
+        run_whisper_cli(audio_path, scratch_path, threads, output_flags=("-otxt", "-oj"))
+        if os.path.exists(scratch_path + ".json"):
+            with open(scratch_path + ".json", "r", encoding="utf-8", errors="replace") as f:
+                save_segments(segments_path(transcript_path), segments_from_whisper_json(json.load(f)))
+        if os.path.exists(scratch_path + ".txt"):
+            with open(scratch_path + ".txt", "r", encoding="utf-8", errors="replace") as f:
+                transcript = f.read()
+            write_text(transcript_path + ".txt", transcript)
+            return transcript
         else:
-            logging.error("No transcript file found at %s", txt_path)
+            logging.error("No transcript file found at %s", scratch_path + ".txt")
             return "(No transcript file found)"
     except Exception as e:
         logging.exception(f"Transcription error: {e}")
         return f"(Transcription error: {e})"
+    finally:
+        for scratch in (scratch_path + ".json", scratch_path + ".txt"):
+            if os.path.exists(scratch):
+                os.remove(scratch)
 
-@app.post("/upload-audio")
-async def upload_audio(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="No file uploaded.")
-    input_bytes = await file.read()
-    ext = os.path.splitext(file.filename)[1].lower()
-    input_format = ext.lstrip('.')
-    # Extract source from header
-    source = request.headers.get("source", "unknown") if request else "unknown"
-    # Get audio length from original file
-    audio_length_sec = round(get_audio_duration_ffprobe(input_bytes, input_format), 2)
-    file_size = len(input_bytes)
-    # Save original file (archive)
-    original_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(original_path, "wb") as buffer:
-        buffer.write(input_bytes)
-    # Convert to wav for whisper.cpp
-    if input_format == "m4a":
-        output_bytes = convert_audio(input_bytes, input_format="m4a", output_format="wav", sample_width=2, channels=1, frame_rate=16000)
-        save_name = os.path.splitext(file.filename)[0] + ".wav"
-    elif input_format == "mp4":
-        # Extract audio from mp4 video
-        output_bytes = convert_audio(input_bytes, input_format="mp4", output_format="wav", sample_width=2, channels=1, frame_rate=16000)
-        save_name = os.path.splitext(file.filename)[0] + ".wav"
+def transcribe_segment_with_whisper(audio_path: str, segment_name: str, threads: int = None):
+    """
+    Transcribe one segment and return its lines as (start_ms, end_ms, text), relative to the segment.
+    """
+    if whisper_pool is not None:
+        return segments_from_verbose_json(json.loads(whisper_pool.transcribe(audio_path, response_format="verbose_json")))
+    transcript_path = os.path.join(TRANSCRIPTIONS_DIR, segment_name)
+    try:
+        run_whisper_cli(audio_path, transcript_path, threads, output_flags=("-oj",))
+        with open(transcript_path + ".json", "r") as f:
+            result = json.load(f)
+    finally:
+        if os.path.exists(transcript_path + ".json"):
+            os.remove(transcript_path + ".json")
+    return segments_from_whisper_json(result)
+
+def transcribe_long_with_whisper(audio_path: str, transcript_name: str, meta: dict, json_path: str) -> str:
+    """
+    Long-audio mode: split into overlapping segments, transcribe them in parallel and stitch
+    the text back together. Segment progress is written into the metadata JSON and the
+    stitched, absolute-timestamped lines into <id>.segments.json.
+    """
+    long_audio_cfg = settings.section("long_audio")
+    workers = max(1, int(long_audio_cfg.get("workers", 4)))
+    threads = max(1, WHISPER_THREADS // workers)
+    def on_progress(done, total):
+        meta["segments_total"] = total
+        meta["segments_done"] = done
+        save_meta(json_path, meta)
+        jobs.update(transcript_name, progress=(done, total))
+    transcript_path = os.path.join(TRANSCRIPTIONS_DIR, transcript_name)
+    try:
+        lines = transcribe_long_audio(
+            audio_path, transcript_name,
+            lambda path, name: transcribe_segment_with_whisper(path, name, threads),
+            segment_sec=float(long_audio_cfg.get("segment_sec", 300)),
+            overlap_sec=float(long_audio_cfg.get("overlap_sec", 5)),
+            workers=workers,
+            on_progress=on_progress,
+        )
+    except Exception as e:
+        logging.exception(f"Transcription error: {e}")
+        return f"(Transcription error: {e})"
+    transcript = "".join(text for _, _, text in lines).strip() + "\n"
+    write_text(transcript_path + ".txt", transcript)
+    save_segments(segments_path(transcript_path), lines)
+    return transcript
+
+# Held while an upload's original is archived and while one is deleted, so a deletion never
+# races a new job of the same content that is about to use the file
+_originals_lock = threading.Lock()
+
+def converted_wav_path(transcript_name: str) -> str:
+    """Where a job's 16 kHz WAV is written; per job, since jobs of the same content can run at once."""
+    return os.path.join(UPLOAD_DIR, transcript_name + ".16k.wav")
+
+def original_in_use(path: str, job_id: str = None) -> bool:
+    """
+    Whether an unfinished job other than job_id still needs the archived original at path.
+    Originals are named by content hash, so every upload of the same audio shares one file.
+    """
+    return any(entry["id"] != job_id and path in (entry.get("original_path"), (entry.get("job") or {}).get("original_path"))
+               for entry in get_journal().unfinished())
+
+def release_original(meta: dict, key: str = None, job_id: str = None):
+    """Retention: delete a job's archived original once no job needs it any more."""
+    path = meta.get("original_path")
+    with _originals_lock:
+        if path and os.path.exists(path) and not original_in_use(path, job_id):
+            os.remove(path)
+    meta["original_path"] = None
+    if upload_cache is not None and key:
+        upload_cache.drop_original(key)
+
+def trim_to_speech(wav_path: str, timings: dict):
+    """
+    Voice activity detection before whisper: write just the speech of wav_path to a scratch WAV.
+    Returns the trim_silence summary, or None when VAD is off or would not remove enough.
+    """
+    vad_cfg = settings.section("vad")
+    if not vad_cfg.get("enabled") or not can_split(wav_path):
+        return None
+    try:
+        with stage_timer("vad", timings):
+            return trim_silence(wav_path, wav_path + ".speech.wav",
+                                threshold_db=float(vad_cfg.get("threshold_db", 12)),
+                                min_silence_sec=float(vad_cfg.get("min_silence_sec", 1.0)),
+                                pad_sec=float(vad_cfg.get("pad_sec", 0.25)),
+                                min_removed_sec=float(vad_cfg.get("min_removed_sec", 5)),
+                                max_floor_db=float(vad_cfg.get("max_floor_db", MAX_FLOOR_DB)))
+    except Exception as e:
+        # VAD only saves time; transcribe the whole recording instead
+        logging.error(f"Voice activity detection failed on {wav_path}: {e}")
+        return None
+
+class JobMeta(dict):
+    """A worker's copy of a job's metadata that remembers the version last read from or written to disk."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_disk = None
+
+def load_meta(json_path: str) -> JobMeta:
+    with open(json_path, "r") as jf:
+        meta = JobMeta(json.load(jf))
+    meta.on_disk = copy.deepcopy(dict(meta))
+    return meta
+
+def save_meta(json_path: str, meta: dict):
+    """
+    Write a job's metadata JSON and refresh its row in the list index. A JobMeta loaded from
+    or saved to disk before only writes back the fields the worker changed since, read-modify-
+    write under the job lock, so a markdown the web UI linked meanwhile is not lost; meta then
+    picks up those fields. Otherwise the file is replaced. Either way it is written atomically.
+    The time taken is added to meta["stage_timings"] (when present) and shows up in the next write.
+    """
+    with stage_timer("metadata_write", meta.get("stage_timings")):
+        on_disk = getattr(meta, "on_disk", None)
+        if on_disk is None:
+            with job_lock(json_path):
+                atomic_write_json(json_path, meta)
+            written = meta
+        else:
+            written = merge_meta(json_path, meta, on_disk)
+            for key in [key for key in meta if key not in written]:
+                del meta[key]
+            for key, value in written.items():
+                if key not in meta or (key in on_disk and meta[key] == on_disk[key]):
+                    meta[key] = value
+        if isinstance(meta, JobMeta):
+            meta.on_disk = copy.deepcopy(dict(written))
+        meta_index.upsert(os.path.basename(json_path), written)
+
+def run_transcription_job(job: dict):
+    """
+    Worker entry point: transcribe one queued job, then polish it into markdown.
+    All state is read back from the job's metadata JSON so spooled jobs can run after a restart;
+    a job whose transcription was journaled before the restart goes straight to polishing.
+    """
+    transcript_name = job["id"]
+    wav_path = job["wav_path"]
+    original_path = job["original_path"]
+    json_path = job["json_path"]
+    meta = load_meta(json_path)
+    if job.get("callback_url"):
+        # Spooled jobs restored after a restart bring their webhook along
+        jobs.update(transcript_name)
+        jobs.add_webhook(transcript_name, job["callback_url"])
+    timings = meta.setdefault("stage_timings", {})
+    if get_journal().stage(transcript_name) == "transcribed" and meta.get("status") == "success" and transcript_text(json_path, meta):
+        logging.info(f"Resuming {transcript_name} after its transcription")
+        transcript = transcript_text(json_path, meta)
     else:
-        output_bytes = input_bytes
-        save_name = file.filename
-    wav_path = os.path.join(UPLOAD_DIR, save_name)
-    with open(wav_path, "wb") as buffer:
-        buffer.write(output_bytes)
-    # Transcribe
-    transcript_name = os.path.splitext(file.filename)[0]
+        jobs.update(transcript_name, stage="transcribing")
+        if not os.path.exists(wav_path) and os.path.exists(original_path):
+            # The converted audio did not survive the restart; convert the archived original again
+            wav_path, _ = prepare_audio(original_path, wav_path)
+        speech = trim_to_speech(wav_path, timings)
+        audio_path = speech["path"] if speech else wav_path
+        if speech:
+            meta["vad"] = {key: speech[key] for key in ("audio_sec", "speech_sec", "removed_sec", "expected_speedup")}
+            meta["vad"]["regions"] = len(speech["regions"])
+            logging.info(f"VAD kept {speech['speech_sec']}s of {speech['audio_sec']}s of {transcript_name}")
+        try:
+            with stage_timer("whisper", timings):
+                # Recordings longer than long_audio.min_duration_sec are split and transcribed in parallel
+                long_audio_cfg = settings.section("long_audio")
+                if (long_audio_cfg.get("enabled") and (speech["speech_sec"] if speech else meta.get("audio_length_sec") or 0) >= float(long_audio_cfg.get("min_duration_sec", 600))
+                        and can_split(audio_path)):
+                    transcript = transcribe_long_with_whisper(audio_path, transcript_name, meta, json_path)
+                else:
+                    transcript = transcribe_with_whisper(audio_path, transcript_name, threads=WHISPER_THREADS)
+        finally:
+            if speech and os.path.exists(speech["path"]):
+                os.remove(speech["path"])
+        seg_path = segments_path(os.path.join(TRANSCRIPTIONS_DIR, transcript_name))
+        if speech and transcript and not transcript.startswith("(") and storage.stored_path(seg_path):
+            # Timestamps of the trimmed audio, moved back onto the original recording
+            save_segments(seg_path, remap_segments(load_segments(seg_path), speech["regions"], speech["rate"]))
+        if os.path.exists(wav_path) and wav_path != original_path:
+            os.remove(wav_path)
+        meta["status"] = "success" if transcript and not transcript.startswith("(") else "error"
+        meta["error"] = None if transcript and not transcript.startswith("(") else transcript
+        if upload_cache is not None and job.get("cache_key"):
+            upload_cache.mark_done(job["cache_key"], meta["status"])
+        if meta["status"] == "success" and settings.section("storage").get("originals", "keep") == "delete_after_transcription":
+            release_original(meta, job.get("cache_key"), transcript_name)
+        # The text itself is stored once, in <id>.txt
+        meta.pop("transcription_text", None)
+        # Save after transcription
+        save_meta(json_path, meta)
+        if meta["status"] == "success":
+            meta_index.index_text(os.path.basename(json_path), "", transcript)
+            get_journal().record(transcript_name, "transcribed")
+    polish_transcript(transcript_name, json_path, meta, transcript)
+    get_journal().record(transcript_name, "done" if meta["status"] == "success" else "error")
+    JOBS_TOTAL.inc(meta["status"])
+    logging.info(f"Job {transcript_name} {meta['status']}: stage_timings={json.dumps(timings, sort_keys=True)}")
+    jobs.finish(transcript_name, meta["status"], error=meta.get("error"), markdown_file=meta.get("markdown_file"))
+
+def polish_transcript(transcript_name: str, json_path: str, meta: dict, transcript: str):
+    """Polish a finished transcript into markdown with the LLM and link it from the metadata."""
+    # --- Automated LLM Markdown Polishing ---
+    try:
+        from ollama_client import get_client
+        if transcript and meta["status"] == "success":
+            jobs.update(transcript_name, stage="polishing")
+            client = get_client()
+            llm_key = client.result_key(transcript)
+            cached = llm_cache.get(llm_key) if llm_cache is not None else None
+            if cached is not None:
+                llm_result = cached
+            elif needs_chunking(transcript, client.chunking):
+                chunks_done = [0]
+                def on_chunk(index, total, sec):
+                    chunks_done[0] += 1
+                    jobs.update(transcript_name, progress=(chunks_done[0], total))
+                with stage_timer("llm", meta.get("stage_timings")):
+                    llm_result = polish_long_transcript(transcript, client, on_chunk=on_chunk)
+            else:
+                with stage_timer("llm", meta.get("stage_timings")):
+                    llm_result = client.generate_markdown(transcript)
+            failed = isinstance(llm_result, str) and llm_result.startswith("Error:")
+            # Parse if string
+            if isinstance(llm_result, str):
+                try:
+                    llm_result = json.loads(llm_result)
+                except Exception:
+                    llm_result = {"markdown": llm_result, "title": "", "file_name": ""}
+            if llm_cache is not None and cached is None and not failed and llm_result.get("markdown", "").strip():
+                llm_cache.put(llm_key, llm_result)
+            md_content = llm_result.get("markdown", "")
+            md_title = llm_result.get("title", "")
+            md_file_name = llm_result.get("file_name") or (transcript_name + ".md")
+            md_path = os.path.join(MARKDOWNS_DIR, md_file_name)
+            write_text(md_path, md_content, storage.markdown_compression())
+            meta["markdown_file"] = md_file_name
+            if md_title:
+                meta["markdown_title"] = md_title
+            record_chunk_timings(meta, llm_result)
+            if cached is not None:
+                meta["markdown_cached"] = True
+            save_meta(json_path, meta)
+            meta_index.index_text(os.path.basename(json_path), md_title, transcript, md_content)
+            logging.info(f"[LLM MARKDOWN] Saved {md_file_name} for {transcript_name}")
+    except Exception as e:
+        logging.error(f"[LLM ERROR] {transcript_name}: {e}")
+
+job_queue = JobQueue(
+    run_transcription_job,
+    workers=QUEUE_WORKERS,
+    max_size=queue_cfg.get("max_size", 100),
+    spool_dir=queue_cfg.get("spool_dir", os.path.join(TRANSCRIPTIONS_DIR, "queue")),
+)
+REGISTRY.register(Gauge("transcriber_queue_depth", "Jobs waiting for a transcription worker", lambda: job_queue.stats()["depth"]))
+REGISTRY.register(Gauge("transcriber_jobs_running", "Jobs being transcribed or polished", lambda: job_queue.stats()["running"]))
+
+_server_lock = None
+
+def acquire_server_lock() -> bool:
+    """
+    Claim the data directories for running jobs: an exclusive flock on
+    transcriptions/.server.lock, held until the process exits. False if a running server
+    (or --ingest) already holds it; that process owns the spool, journal and whisper pool.
+    """
+    global _server_lock
+    if _server_lock is None:
+        f = open(os.path.join(TRANSCRIPTIONS_DIR, ".server.lock"), "a")
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        _server_lock = f
+    return True
+
+@app.on_event("startup")
+def start_job_queue():
+    if not acquire_server_lock():
+        raise RuntimeError(f"Another server or --ingest is already running jobs on {TRANSCRIPTIONS_DIR}")
+    # Servers must be up before workers start pulling (possibly restored) jobs
+    if whisper_pool is not None:
+        whisper_pool.start()
+    # Name reservations left behind by uploads cut off by a crash (a live one lasts a conversion)
+    names_dir = os.path.join(TRANSCRIPTIONS_DIR, ".names")
+    os.makedirs(names_dir, exist_ok=True)
+    storage.remove_stale(names_dir, lambda name: True, 3600)
+    # Drop finished jobs from the journal; skipped while another process has it open
+    get_journal().compact()
+    # Spooled jobs are reconciled with the journal before any worker can pick them up
+    job_queue.restore()
+    recover_unfinished_jobs()
+    for job_id in job_queue.waiting_ids():
+        jobs.track(job_id, "queued")
+    job_queue.start()
+
+def give_up_job(job_id: str, job: dict):
+    """Mark a job that keeps failing across restarts as an error instead of retrying it again."""
+    max_attempts = job_max_attempts()
+    meta = update_meta(job["json_path"], lambda meta: meta.update(status="error", error=f"(Gave up after {max_attempts} attempts)"))
+    meta_index.upsert(os.path.basename(job["json_path"]), meta)
+    if upload_cache is not None and job.get("cache_key"):
+        upload_cache.mark_done(job["cache_key"], "error")
+    get_journal().record(job_id, "error")
+    logging.error(f"Job {job_id} gave up after {max_attempts} attempts")
+
+def recover_unfinished_jobs():
+    """
+    Startup pass over the job journal, run after the spool is restored and before the workers
+    start. Jobs that were queued or part-way through when the server stopped are submitted
+    again unless the spool already brought them back (they resume after transcription if that
+    had finished). Either way each restart counts as an attempt, up to jobs.max_attempts.
+    Uploads interrupted while converting are dropped, since their client never got an answer,
+    and their dedup claim is released so a retry is processed normally.
+    """
+    waiting = set(job_queue.waiting_ids())
+    max_attempts = job_max_attempts()
+    for entry in get_journal().unfinished():
+        job_id = entry["id"]
+        job = entry.get("job")
+        attempts = int(entry.get("attempts", 1)) + 1
+        if job_id in waiting:
+            if attempts <= max_attempts:
+                get_journal().record(job_id, entry["stage"], attempts=attempts)
+                logging.info(f"Resumed spooled job {job_id} from stage {entry['stage']} (attempt {attempts})")
+                continue
+            # A job that crashed the worker on every run must not come back from the spool forever
+            spooled = job_queue.discard(job_id)
+            job = job or spooled
+            if job and os.path.exists(job["json_path"]):
+                give_up_job(job_id, job)
+            else:
+                get_journal().record(job_id, "abandoned")
+            continue
+        if entry["stage"] == "converting" or not job or not os.path.exists(job["json_path"]):
+            if upload_cache is not None and entry.get("cache_key"):
+                upload_cache.forget(entry["cache_key"])
+            if entry.get("wav_path") and os.path.exists(entry["wav_path"]):
+                os.remove(entry["wav_path"])
+            get_journal().record(job_id, "abandoned")
+            logging.warning(f"Dropped job {job_id}, interrupted at stage {entry['stage']}")
+            continue
+        if attempts > max_attempts:
+            give_up_job(job_id, job)
+            continue
+        try:
+            job_queue.submit(job, priority=entry.get("priority", 0))
+        except QueueFullError:
+            # Stays in the journal for the next restart
+            logging.error(f"Queue full, could not resume job {job_id}")
+            continue
+        get_journal().record(job_id, entry["stage"], attempts=attempts)
+        logging.info(f"Resumed job {job_id} from stage {entry['stage']} (attempt {attempts})")
+
+@app.on_event("shutdown")
+def stop_whisper_pool():
+    if whisper_pool is not None:
+        whisper_pool.stop()
+
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+def job_from_meta(job_id: str):
+    """Status of a job the tracker no longer (or not yet) knows, from its metadata JSON."""
+    json_path = os.path.join(TRANSCRIPTIONS_DIR, os.path.basename(job_id) + ".json")
+    if not os.path.exists(json_path):
+        return None
+    with open(json_path, "r") as jf:
+        meta = json.load(jf)
+    status = meta.get("status")
+    # A processing job unknown to the tracker was restored from the spool and is waiting
+    stage = {"success": "done", "error": "error"}.get(status, "queued")
+    return {"id": job_id, "stage": stage, "status": status, "progress": None, "timings": {},
+            "error": meta.get("error"), "markdown_file": meta.get("markdown_file"), "version": 0}
+
+def track_from_meta(job_id: str) -> bool:
+    """Track a job this process does not know yet at the stage its metadata records. False if there is none."""
+    if jobs.get(job_id) is not None:
+        return True
+    snapshot = job_from_meta(job_id)
+    if snapshot is None:
+        return False
+    jobs.track(job_id, snapshot["stage"], error=snapshot["error"], markdown_file=snapshot["markdown_file"])
+    return True
+
+def with_queue_position(snapshot: dict) -> dict:
+    if snapshot["stage"] == "queued":
+        snapshot["queue_position"] = job_queue.position(snapshot["id"])
+    return snapshot
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, wait: float = 0, version: int = -1):
+    """
+    Stage (converting, queued, transcribing, polishing, done, error), progress, queue position
+    and per-stage timings of an upload job. Long-poll with ?wait=<seconds>&version=<last seen
+    version>: the reply comes as soon as the job changes, or after wait seconds (max 60).
+    """
+    snapshot = await jobs.wait(job_id, version, min(wait, 60.0)) if wait > 0 else jobs.get(job_id)
+    if snapshot is None:
+        snapshot = await asyncio.to_thread(job_from_meta, job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return JSONResponse(content=with_queue_position(snapshot))
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent "status" events on every change of the job, until it is done or failed."""
+    if jobs.get(job_id) is None and await asyncio.to_thread(job_from_meta, job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+
+    async def events():
+        version = -1
+        while True:
+            snapshot = await jobs.wait(job_id, version, 15.0)
+            if snapshot is None:
+                # Not tracked in this process: report the metadata status once and stop
+                snapshot = await asyncio.to_thread(job_from_meta, job_id)
+                if snapshot is not None:
+                    yield f"event: status\ndata: {json.dumps(with_queue_position(snapshot))}\n\n"
+                return
+            if snapshot["version"] == version:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            version = snapshot["version"]
+            yield f"event: status\ndata: {json.dumps(with_queue_position(snapshot))}\n\n"
+            if snapshot["stage"] in ("done", "error"):
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/jobs/{job_id}/webhook")
+async def job_webhook(job_id: str, request: Request):
+    """Register {"url": ...} to receive the final job status as a JSON POST."""
+    body = await request.json()
+    url = (body or {}).get("url", "")
+    if not url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="url must be an http(s) URL.")
+    if jobs.add_webhook(job_id, url):
+        return JSONResponse(content={"registered": True})
+    snapshot = await asyncio.to_thread(job_from_meta, job_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    # Finished before this process started; nothing will be sent, so return the status instead
+    return JSONResponse(status_code=409, content=dict(snapshot, registered=False))
+
+@app.get("/jobs/{job_id}/transcript")
+def job_transcript(job_id: str, format: str = "txt"):
+    """The finished transcript as txt, srt, vtt or json segments, rendered from one whisper run."""
+    if format not in TRANSCRIPT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(TRANSCRIPT_FORMATS)}.")
+    transcript_name = os.path.basename(job_id)
+    content = read_transcript(os.path.join(TRANSCRIPTIONS_DIR, transcript_name), format)
+    if content is None:
+        raise HTTPException(status_code=404, detail="No transcript in this format for this job.")
+    return Response(content=content, media_type=TRANSCRIPT_FORMATS[format],
+                    headers={"Content-Disposition": f'inline; filename="{transcript_name}.{format}"'})
+
+@app.get("/queue/stats")
+def queue_stats():
+    stats = job_queue.stats()
+    if whisper_pool is not None:
+        stats["whisper_servers"] = whisper_pool.stats()
+    return JSONResponse(content=stats)
+
+def process_peak_rss_mb() -> float:
+    """Highest RSS of this server process since it started (not of one upload); ru_maxrss is in KB on Linux."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+async def save_upload_streaming(chunks, dest_path: str, max_bytes: int = None):
+    """
+    Write an async iterator of byte chunks to dest_path, one chunk at a time.
+    Returns (bytes written, sha256 hex digest of the content). An upload larger than
+    max_bytes (default: the max_upload_bytes setting; 0 = no limit) is rejected with 413,
+    and dest_path is removed whenever the upload does not complete.
+    """
+    if max_bytes is None:
+        max_bytes = int(settings.get("max_upload_bytes", 0))
+    size = 0
+    digest = hashlib.sha256()
+
+    def write_chunk(chunk: bytes):
+        buffer.write(chunk)
+        digest.update(chunk)
+
+    # Disk writes and hashing run in a worker thread so a slow disk never stalls the event loop
+    buffer = await asyncio.to_thread(open, dest_path, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload is larger than {max_bytes} bytes.")
+            await asyncio.to_thread(write_chunk, chunk)
+    except BaseException:
+        # Client disconnects and cancellations included: never leave a partial upload behind
+        await asyncio.to_thread(buffer.close)
+        await asyncio.to_thread(os.remove, dest_path)
+        raise
+    await asyncio.to_thread(buffer.close)
+    return size, digest.hexdigest()
+
+async def iter_upload_file(file: UploadFile):
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+async def iter_request_body(request: Request):
+    # request.stream() yields whatever the server received; re-slice to a fixed chunk size
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        while len(pending) >= UPLOAD_CHUNK_SIZE:
+            yield pending[:UPLOAD_CHUNK_SIZE]
+            pending = pending[UPLOAD_CHUNK_SIZE:]
+    if pending:
+        yield pending
+
+def pick_transcript_name(filename: str, key: str) -> str:
+    """
+    Reserve a transcription id for an upload: the file name's stem, or stem-<key[:8]> (then -2,
+    -3, ...) when that is taken, so different content uploaded under an existing name, or two
+    uploads of the same name at once, never overwrite each other. The reservation holds until
+    release_name() is called, once the metadata JSON is written or the upload is dropped.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    suffixed = f"{stem}-{key[:8]}"
+    return reserve_name(TRANSCRIPTIONS_DIR, itertools.chain([stem, suffixed], (f"{suffixed}-{n}" for n in itertools.count(2))))
+
+def original_upload_path(name: str) -> str:
+    """Where an original named <content hash><ext> is archived: sharded by hash prefix unless disabled."""
+    if settings.section("storage").get("shard_uploads", True):
+        return shard_path(UPLOAD_DIR, name)
+    return os.path.join(UPLOAD_DIR, name)
+
+def claim_upload(incoming_path: str, filename: str, file_size: int, content_hash: str):
+    """
+    Blocking first half of process_upload: dedup lookup, queue capacity check and archiving
+    of the original. Returns (cache key, transcript name, original path, response), where
+    response is the reply for a cache hit and None when the upload should be processed.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    exe_path, model_path, extra_args = get_whisper_config()
+    key = cache_key(content_hash, model_path, extra_args)
+    transcript_name = pick_transcript_name(filename, key)
+    # Originals are archived under their content hash, so re-uploads never overwrite other files
+    original_path = original_upload_path(content_hash + ext)
+    if upload_cache is not None:
+        hit = upload_cache.claim(key, content_hash, transcript_name, original_path, file_size)
+        if hit and not os.path.exists(os.path.join(TRANSCRIPTIONS_DIR, hit["transcription_id"] + ".json")) \
+                and get_journal().stage(hit["transcription_id"]) is None:
+            # The transcription was deleted since (one still converting has no metadata yet); recompute it
+            upload_cache.forget(key)
+            hit = upload_cache.claim(key, content_hash, transcript_name, original_path, file_size)
+        if hit:
+            os.remove(incoming_path)
+            release_name(TRANSCRIPTIONS_DIR, transcript_name)
+            logging.info(f"Upload {filename} matches cached transcription {hit['transcription_id']}")
+            message = "Already transcribed." if hit["status"] == "success" else "Identical upload is already being transcribed."
+            return key, transcript_name, original_path, JSONResponse(content={"status": hit["status"], "message": message, "transcription_id": hit["transcription_id"], "cached": True})
+    try:
+        job_queue.check_capacity()
+    except QueueFullError as e:
+        os.remove(incoming_path)
+        release_name(TRANSCRIPTIONS_DIR, transcript_name)
+        if upload_cache is not None:
+            upload_cache.forget(key)
+        raise HTTPException(status_code=429, detail="Transcription queue is full, retry later.", headers={"Retry-After": str(e.retry_after)})
+    with _originals_lock:
+        # Journaled first, so the original counts as in use before it (re)appears on disk
+        get_journal().record(transcript_name, "converting", cache_key=key, wav_path=converted_wav_path(transcript_name), original_path=original_path)
+        os.replace(incoming_path, original_path)
+    return key, transcript_name, original_path, None
+
+def register_job(key: str, transcript_name: str, filename: str, original_path: str, wav_path: str, duration: float, file_size: int, content_hash: str, source: str, priority: int, callback_url: str = "", timings: dict = None):
+    """Blocking second half of process_upload: write the metadata and queue the transcription."""
     exe_path, model_path, extra_args = get_whisper_config()
+    audio_length_sec = round(duration, 2)
+    # Transcribe
+    peak_rss_mb = process_peak_rss_mb()
+    logging.info(f"Upload {filename}: {file_size} bytes, process peak RSS so far {peak_rss_mb} MB")
     meta = {
         "datetime": datetime.utcnow().isoformat() + "Z",
         "source": source,
-        "original_filename": file.filename,
+        "original_filename": filename,
+        "original_path": original_path,
+        "content_hash": content_hash,
         "audio_length_sec": audio_length_sec,
         "file_size": file_size,
+        "process_peak_rss_mb": peak_rss_mb,
         "whisper_model": model_path,
         "whisper_args": extra_args,
         "status": "processing",
         "error": None,
         "language": None,
-        "transcription_text": None
+        # Seconds per pipeline stage, filled in as the job runs (see metrics.py)
+        "stage_timings": timings if timings is not None else {},
     }
     # Save JSON metadata
     json_path = os.path.join(TRANSCRIPTIONS_DIR, transcript_name + ".json")
-    with open(json_path, "w") as jf:
-        json.dump(meta, jf, ensure_ascii=False, indent=2)
-    def background_transcribe():
-        transcript = transcribe_with_whisper(wav_path, transcript_name)
-        if os.path.exists(wav_path) and wav_path != original_path:
+    save_meta(json_path, meta)
+    release_name(TRANSCRIPTIONS_DIR, transcript_name)
+    job = {"id": transcript_name, "wav_path": wav_path, "original_path": original_path, "json_path": json_path, "cache_key": key}
+    if callback_url:
+        job["callback_url"] = callback_url
+        jobs.add_webhook(transcript_name, callback_url)
+    # Marked queued before submit, so a fast worker's "transcribing" is never overwritten
+    jobs.update(transcript_name, stage="queued")
+    get_journal().record(transcript_name, "queued", job=job, priority=priority, attempts=1)
+    try:
+        position = job_queue.submit(job, priority=priority)
+    except QueueFullError as e:
+        jobs.forget(transcript_name)
+        get_journal().record(transcript_name, "abandoned")
+        os.remove(json_path)
+        meta_index.delete(os.path.basename(json_path))
+        if wav_path != original_path and os.path.exists(wav_path):
             os.remove(wav_path)
-        meta["status"] = "success" if transcript and not transcript.startswith("(") else "error"
-        meta["error"] = None if transcript and not transcript.startswith("(") else transcript
-        meta["transcription_text"] = transcript
-        # Save after transcription
-        with open(json_path, "w") as jf:
-            json.dump(meta, jf, ensure_ascii=False, indent=2)
-        # --- Automated LLM Markdown Polishing ---
+        if upload_cache is not None:
+            upload_cache.forget(key)
+        raise HTTPException(status_code=429, detail="Transcription queue is full, retry later.", headers={"Retry-After": str(e.retry_after)})
+    if upload_cache is not None:
+        evict_originals()
+    return JSONResponse(content={"status": "processing", "message": "Transcription started. Check the web UI for results.", "transcription_id": transcript_name, "queue_position": position, "status_url": f"/jobs/{transcript_name}", "process_peak_rss_mb": peak_rss_mb})
+
+async def process_upload(incoming_path: str, filename: str, file_size: int, content_hash: str, source: str, priority: int = 0, callback_url: str = "", receive_sec: float = 0.0):
+    """
+    Deduplicate, convert, record metadata and schedule transcription for an upload already
+    streamed to incoming_path. ffmpeg reads the saved file directly, so the upload is
+    never held in memory. A repeat of content that is already transcribed (or in flight) with
+    the same whisper model/args returns the existing transcription id without any work.
+
+    Nothing here blocks the event loop: SQLite and file work run in worker threads and ffmpeg
+    is awaited as an asyncio subprocess, so other requests are served during conversions.
+    """
+    timings = {}
+    record_stage(timings, "upload_receive", receive_sec)
+    try:
+        key, transcript_name, original_path, cached = await asyncio.to_thread(claim_upload, incoming_path, filename, file_size, content_hash)
+    except HTTPException:
+        UPLOADS_TOTAL.inc("rejected")
+        raise
+    if cached is not None:
+        UPLOADS_TOTAL.inc("cached")
+        if callback_url:
+            # The matching job may have finished before this process started: track it from its
+            # metadata, so the webhook is delivered (right away if it is finished) instead of dropped
+            transcription_id = json.loads(cached.body)["transcription_id"]
+            if not (await asyncio.to_thread(track_from_meta, transcription_id) and jobs.add_webhook(transcription_id, callback_url)):
+                raise HTTPException(status_code=409, detail="The matching transcription was deleted; retry the upload.")
+        return cached
+    jobs.update(transcript_name, stage="converting")
+    # One ffmpeg pass: 16 kHz mono s16 WAV for whisper.cpp plus the duration (none if already in that format)
+    wav_out = converted_wav_path(transcript_name)
+    audio_timings = {}
+    try:
+        wav_path, duration = await prepare_audio_async(original_path, wav_out, timings=audio_timings)
+    except subprocess.CalledProcessError as e:
+        logging.error(f"ffmpeg could not decode {filename}: {e.stderr[-2000:]}")
+        UPLOADS_TOTAL.inc("invalid")
+        if upload_cache is not None:
+            await asyncio.to_thread(upload_cache.forget, key)
+        if os.path.exists(wav_out):
+            await asyncio.to_thread(os.remove, wav_out)
+        jobs.forget(transcript_name)
+        release_name(TRANSCRIPTIONS_DIR, transcript_name)
+        await asyncio.to_thread(get_journal().record, transcript_name, "abandoned")
+        raise HTTPException(status_code=400, detail="Could not decode audio file.")
+    for stage, seconds in audio_timings.items():
+        record_stage(timings, stage, seconds)
+    try:
+        response = await asyncio.to_thread(register_job, key, transcript_name, filename, original_path, wav_path, duration, file_size, content_hash, source, priority, callback_url, timings)
+    except HTTPException:
+        UPLOADS_TOTAL.inc("rejected")
+        raise
+    UPLOADS_TOTAL.inc("accepted")
+    return response
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: per-stage timing histograms, job/upload counters, queue depth, Ollama latency."""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/cache/stats")
+def cache_stats():
+    stats = dict(upload_cache.stats(), enabled=True) if upload_cache is not None else {"enabled": False}
+    if llm_cache is not None:
+        stats["llm"] = llm_cache.stats()
+    return JSONResponse(content=stats)
+
+def new_incoming_path() -> str:
+    return os.path.join(UPLOAD_DIR, f".incoming-{uuid.uuid4().hex}")
+
+@app.post("/upload-audio")
+async def upload_audio(request: Request, file: UploadFile = File(...), priority: int = 0, callback_url: str = ""):
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file uploaded.")
+    filename = os.path.basename(file.filename)
+    # Extract source from header
+    source = request.headers.get("source", "unknown") if request else "unknown"
+    # Save original file (archive), copying in fixed-size chunks
+    incoming_path = new_incoming_path()
+    started = time.perf_counter()
+    file_size, content_hash = await save_upload_streaming(iter_upload_file(file), incoming_path)
+    return await process_upload(incoming_path, filename, file_size, content_hash, source, priority, callback_url, time.perf_counter() - started)
+
+@app.post("/upload-audio/stream")
+async def upload_audio_stream(request: Request, filename: str = "", priority: int = 0, callback_url: str = ""):
+    """
+    Raw-body upload: the request body is the audio file itself and is streamed
+    to disk once, without multipart parsing or spooling.
+    """
+    filename = os.path.basename(filename or request.headers.get("x-filename", ""))
+    if not filename:
+        raise HTTPException(status_code=400, detail="Missing filename (query parameter or X-Filename header).")
+    source = request.headers.get("source", "unknown")
+    incoming_path = new_incoming_path()
+    started = time.perf_counter()
+    file_size, content_hash = await save_upload_streaming(iter_request_body(request), incoming_path)
+    if file_size == 0:
+        await asyncio.to_thread(os.remove, incoming_path)
+        raise HTTPException(status_code=400, detail="Empty request body.")
+    return await process_upload(incoming_path, filename, file_size, content_hash, source, priority, callback_url, time.perf_counter() - started)
+
+async def ingest_saved_file(incoming_path: str, filename: str, file_size: int, content_hash: str, source: str, priority: int = 0) -> dict:
+    """process_upload for one file of a batch: the outcome as a dict instead of a response or an exception."""
+    try:
+        response = await process_upload(incoming_path, filename, file_size, content_hash, source, priority)
+    except HTTPException as e:
+        if os.path.exists(incoming_path):
+            await asyncio.to_thread(os.remove, incoming_path)
+        return {"filename": filename, "status": "error", "status_code": e.status_code, "detail": e.detail}
+    return dict(json.loads(response.body), filename=filename)
+
+@app.post("/upload-audio/batch")
+async def upload_audio_batch(request: Request, files: List[UploadFile] = File(...), priority: int = 0):
+    """
+    Bulk upload: any number of audio files and/or zip/tar archives of them in one multipart
+    request. Each recording is deduplicated, converted (at most ingest.parallel at a time) and
+    queued like a single upload; the reply lists the outcome per recording. A full queue or an
+    undecodable file fails that recording only.
+    """
+    source = request.headers.get("source", "unknown")
+    saved = []
+    for file in files:
+        filename = os.path.basename(file.filename or "")
+        if not (is_audio_name(filename) or is_archive_name(filename)):
+            saved.append({"filename": filename, "status": "error", "status_code": 400, "detail": "Not an audio file or archive."})
+            continue
+        incoming_path = new_incoming_path()
         try:
-            from ollama_client import OllamaClient
-            import logging
-            logging.basicConfig(filename="server.log", level=logging.INFO)
-            if transcript and meta["status"] == "success":
-                client = OllamaClient()
-                llm_result = client.generate_markdown(transcript)
-                import json as _json
-                # Parse if string
-                if isinstance(llm_result, str):
-                    try:
-                        llm_result = _json.loads(llm_result)
-                    except Exception:
-                        llm_result = {"markdown": llm_result, "title": "", "file_name": ""}
-                md_content = llm_result.get("markdown", "")
-                md_title = llm_result.get("title", "")
-                md_file_name = llm_result.get("file_name") or (transcript_name + ".md")
-                md_path = os.path.join("markdowns", md_file_name)
-                with open(md_path, "w") as mf:
-                    mf.write(md_content)
-                meta["markdown_file"] = md_file_name
-                if md_title:
-                    meta["markdown_title"] = md_title
-                with open(json_path, "w") as jf:
-                    json.dump(meta, jf, ensure_ascii=False, indent=2)
-                logging.info(f"[LLM MARKDOWN] Saved {md_file_name} for {transcript_name}")
+            file_size, content_hash = await save_upload_streaming(iter_upload_file(file), incoming_path)
+        except HTTPException as e:
+            saved.append({"filename": filename, "status": "error", "status_code": e.status_code, "detail": e.detail})
+            continue
+        if not is_archive_name(filename):
+            saved.append((filename, incoming_path, file_size, content_hash))
+            continue
+        try:
+            members = await asyncio.to_thread(extract_archive, incoming_path, new_incoming_path, UPLOAD_CHUNK_SIZE)
         except Exception as e:
+            logging.error(f"Could not read archive {filename}: {e}")
+            saved.append({"filename": filename, "status": "error", "status_code": 400, "detail": "Could not read archive."})
+            continue
+        finally:
+            await asyncio.to_thread(os.remove, incoming_path)
+        saved.extend(members)
+    slots = asyncio.Semaphore(ingest_parallel())
+
+    async def ingest(item):
+        if isinstance(item, dict):
+            return item
+        filename, incoming_path, file_size, content_hash = item
+        async with slots:
+            return await ingest_saved_file(incoming_path, filename, file_size, content_hash, source, priority)
+
+    results = await asyncio.gather(*(ingest(item) for item in saved))
+    counts = {"accepted": 0, "cached": 0, "failed": 0}
+    for result in results:
+        if result["status"] == "error":
+            counts["failed"] += 1
+        elif result.get("cached"):
+            counts["cached"] += 1
+        else:
+            counts["accepted"] += 1
+    return JSONResponse(content=dict(counts, files=len(results), results=results))
+
+async def ingest_directory(directory: str, parallel: int = None, priority: int = 10, source: str = "ingest") -> dict:
+    """
+    --ingest: transcribe every recording under directory (archives included) in this process.
+    Only runs when no server is running on the same directories, since it restores the spool,
+    recovers the journal and starts the whisper pool itself; with a server up, upload the
+    files to /upload-audio/batch instead (RuntimeError). Files whose content was already
+    transcribed with the current model and arguments are skipped before anything is copied.
+    Up to `parallel` (default: ingest.parallel) files are hashed and converted at once and
+    transcription runs on the queue workers; when the queue is full the walk waits for room
+    instead of failing. Returns IngestStats.summary() once every submitted job has finished.
+    """
+    if not acquire_server_lock():
+        raise RuntimeError(f"A server is running on {TRANSCRIPTIONS_DIR}; upload the files to its /upload-audio/batch instead")
+    start_job_queue()
+    stats = IngestStats()
+    slots = asyncio.Semaphore(max(1, parallel or ingest_parallel()))
+    exe_path, model_path, extra_args = get_whisper_config()
+    submitted = []
+    converting = [0]
+
+    async def wait_for_room():
+        # Conversions in flight will each need a queue slot too
+        while job_queue.stats()["depth"] + converting[0] >= job_queue.max_size:
+            await asyncio.sleep(0.5)
+        converting[0] += 1
+
+    def fail(name: str, error):
+        stats.failed += 1
+        logging.error(f"Could not ingest {name}: {error}")
+        print(f"{name}: {error}", file=sys.stderr)
+
+    async def submit(filename: str, incoming_path: str, file_size: int, content_hash: str):
+        # Runs with a queue slot reserved by wait_for_room() and always gives it back
+        try:
+            stats.bytes += file_size
+            result = await ingest_saved_file(incoming_path, filename, file_size, content_hash, source, priority)
+        except Exception as e:
+            if os.path.exists(incoming_path):
+                await asyncio.to_thread(os.remove, incoming_path)
+            result = {"status": "error", "detail": str(e)}
+        finally:
+            converting[0] -= 1
+        if result["status"] == "error":
+            fail(filename, result["detail"])
+        elif result.get("cached"):
+            stats.skipped += 1
+        else:
+            stats.submitted += 1
+            submitted.append(result["transcription_id"])
+
+    async def copy_and_submit(path: str, file_size: int, content_hash: str):
+        await wait_for_room()
+        incoming_path = new_incoming_path()
+        try:
+            await asyncio.to_thread(copy_file, path, incoming_path)
+        except BaseException:
+            converting[0] -= 1
+            if os.path.exists(incoming_path):
+                await asyncio.to_thread(os.remove, incoming_path)
+            raise
+        await submit(os.path.basename(path), incoming_path, file_size, content_hash)
+
+    async def ingest_file(path: str):
+        async with slots:
+            if is_archive_name(path):
+                try:
+                    members = await asyncio.to_thread(extract_archive, path, new_incoming_path, UPLOAD_CHUNK_SIZE)
+                except Exception as e:
+                    stats.files += 1
+                    fail(path, e)
+                    return
+                stats.files += len(members)
+                for filename, incoming_path, file_size, content_hash in members:
+                    await wait_for_room()
+                    await submit(filename, incoming_path, file_size, content_hash)
+                return
+            stats.files += 1
+            # An unreadable file is counted as failed; the rest of the walk goes on
             try:
-                with open("server.log", "a") as logf:
-                    logf.write(f"[LLM ERROR] {transcript_name}: {e}\n")
-            except Exception:
+                file_size, content_hash = await asyncio.to_thread(hash_file, path, UPLOAD_CHUNK_SIZE)
+                hit = upload_cache.lookup(cache_key(content_hash, model_path, extra_args)) if upload_cache is not None else None
+                if hit and os.path.exists(os.path.join(TRANSCRIPTIONS_DIR, hit["transcription_id"] + ".json")):
+                    stats.skipped += 1
+                    return
+                await copy_and_submit(path, file_size, content_hash)
+            except Exception as e:
+                fail(path, e)
+
+    await asyncio.gather(*(ingest_file(path) for path in find_audio_files(directory)))
+    for job_id in submitted:
+        snapshot = jobs.get(job_id)
+        while snapshot is not None and snapshot["stage"] not in TERMINAL_STAGES:
+            snapshot = await jobs.wait(job_id, snapshot["version"], timeout=60)
+        with open(os.path.join(TRANSCRIPTIONS_DIR, job_id + ".json"), "r") as jf:
+            meta = json.load(jf)
+        if meta.get("status") == "success":
+            stats.transcribed += 1
+            stats.audio_sec += meta.get("audio_length_sec") or 0
+        else:
+            stats.failed += 1
+    stop_whisper_pool()
+    return stats.summary()
+
+# whisper.cpp output under a scratch prefix, long-audio segments, live windows and torn atomic writes
+TRANSCRIPTION_SCRATCH = re.compile(r"(\.whisper\.(txt|json)|\.seg\d{4}\.(wav|json)|\.window\.(wav|json)|^\..*\.tmp)$")
+
+def compact_storage(scratch_max_age_sec: float = 86400) -> dict:
+    """
+    --compact: bring existing data in line with the storage settings. For every finished job
+    (running ones are left alone) the transcript text moves out of the metadata JSON into
+    <id>.txt, transcripts, segments and markdown are rewritten in the configured compressions,
+    originals in the flat upload directory move into shards, and the originals retention
+    policy and cache limits are applied. Scratch files older than scratch_max_age_sec are
+    removed. Returns counts and the disk usage (without SQLite databases) before and after.
+    """
+    roots = (TRANSCRIPTIONS_DIR, MARKDOWNS_DIR, UPLOAD_DIR)
+    summary = {"bytes_before": sum(storage.dir_size(root) for root in roots), "transcriptions": 0, "texts_moved": 0,
+               "recompressed": 0, "originals_sharded": 0, "originals_released": 0, "originals_evicted": 0, "scratch_removed": 0}
+    storage_cfg = settings.section("storage")
+    release = storage_cfg.get("originals", "keep") == "delete_after_transcription"
+    shard = storage_cfg.get("shard_uploads", True)
+    active_wavs = set()
+    # Files of existing jobs, which a scratch pattern must never match (a job may be named "x.whisper")
+    job_files = set()
+    for fname in sorted(os.listdir(TRANSCRIPTIONS_DIR)):
+        json_path = os.path.join(TRANSCRIPTIONS_DIR, fname)
+        if not fname.endswith(".json") or fname.endswith(".segments.json") or not os.path.isfile(json_path):
+            continue
+        base = os.path.splitext(json_path)[0]
+        with job_lock(json_path):
+            try:
+                with open(json_path, "r") as jf:
+                    meta = json.load(jf)
+            except (OSError, ValueError) as e:
+                logging.error(f"Skipping unreadable metadata {json_path}: {e}")
+                continue
+            if not isinstance(meta, dict) or "status" not in meta:
+                # Not job metadata (e.g. whisper.cpp's own JSON left behind by a crash)
+                continue
+            name = fname[:-len(".json")]
+            job_files.update([fname, *storage.variants(name + ".txt"), *storage.variants(name + ".segments.json")])
+            if meta.get("status") not in ("success", "error"):
+                # Named by content hash before WAVs were per job
+                active_wavs.update([f"{name}.16k.wav", f"{meta.get('content_hash')}.16k.wav"])
+                continue
+            summary["transcriptions"] += 1
+            before = dict(meta)
+            if "transcription_text" in meta:
+                text = meta.pop("transcription_text") or ""
+                if meta.get("status") == "success" and text and not storage.stored_path(base + ".txt"):
+                    write_text(base + ".txt", text)
+                summary["texts_moved"] += 1
+            summary["recompressed"] += sum(storage.recompress(path) for path in (base + ".txt", segments_path(base)))
+            if meta.get("markdown_file"):
+                summary["recompressed"] += storage.recompress(os.path.join(MARKDOWNS_DIR, meta["markdown_file"]), storage.markdown_compression())
+            original = meta.get("original_path")
+            if original and original_in_use(original):
+                # Another upload of the same audio is still being transcribed from this file
                 pass
-    if background_tasks is not None:
-        background_tasks.add_task(background_transcribe)
-    return JSONResponse(content={"status": "processing", "message": "Transcription started. Check the web UI for results.", "transcription_id": transcript_name})
+            elif original and release and meta.get("status") == "success":
+                if os.path.exists(original):
+                    os.remove(original)
+                    summary["originals_released"] += 1
+                if upload_cache is not None:
+                    upload_cache.move_original(original, None)
+                meta["original_path"] = None
+            elif original and shard and os.path.dirname(os.path.abspath(original)) == os.path.abspath(UPLOAD_DIR):
+                # Several jobs (other models or arguments) can share one original; the first moves it
+                sharded = original_upload_path(os.path.basename(original))
+                if os.path.exists(original):
+                    os.replace(original, sharded)
+                    summary["originals_sharded"] += 1
+                    if upload_cache is not None:
+                        upload_cache.move_original(original, sharded)
+                if os.path.exists(sharded):
+                    meta["original_path"] = sharded
+            if meta != before:
+                atomic_write_json(json_path, meta)
+                meta_index.upsert(fname, meta)
+    if upload_cache is not None:
+        summary["originals_evicted"] = evict_originals()
+    summary["scratch_removed"] += storage.remove_stale(
+        UPLOAD_DIR, lambda name: name.startswith(".incoming-") or name.endswith((".speech.wav", ".window.wav"))
+        or TRANSCRIPTION_SCRATCH.search(name) is not None or (name.endswith(".16k.wav") and name not in active_wavs), scratch_max_age_sec)
+    summary["scratch_removed"] += storage.remove_stale(
+        TRANSCRIPTIONS_DIR, lambda name: name not in job_files and TRANSCRIPTION_SCRATCH.search(name) is not None, scratch_max_age_sec)
+    summary["scratch_removed"] += storage.remove_stale(
+        MARKDOWNS_DIR, lambda name: name.endswith(".partial.md") or (name.startswith(".") and name.endswith(".tmp")), scratch_max_age_sec)
+    summary["bytes_after"] = sum(storage.dir_size(root) for root in roots)
+    return summary
+
+def transcribe_live_window(session_name: str, pcm: bytes):
+    """
+    Transcribe one live window (raw 16 kHz mono s16 PCM) to (start_ms, end_ms, text) lines on an
+    idle server of the whisper pool; sessions wait for one when all are busy.
+    """
+    window_path = os.path.join(UPLOAD_DIR, f"{session_name}.window.wav")
+    with wave.open(window_path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(LIVE_RATE)
+        wf.writeframes(pcm)
+    try:
+        return transcribe_segment_with_whisper(window_path, f"{session_name}.window", threads=WHISPER_THREADS)
+    finally:
+        os.remove(window_path)
+
+def save_live_session(session_name: str, filename: str, audio_path: str, lines: list, source: str) -> str:
+    """
+    Store a finished live session like an uploaded file: the audio is archived under its
+    content hash, the final lines become the transcript (.txt and .segments.json) and the
+    metadata JSON is written and indexed. Markdown polishing runs in the background.
+    Returns the transcription id.
+    """
+    digest = hashlib.sha256()
+    with open(audio_path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+    original_path = original_upload_path(content_hash + ".wav")
+    os.replace(audio_path, original_path)
+    exe_path, model_path, extra_args = get_whisper_config()
+    transcript_name = pick_transcript_name(filename, content_hash)
+    transcript_path = os.path.join(TRANSCRIPTIONS_DIR, transcript_name)
+    transcript = "".join(text for _, _, text in lines).strip()
+    transcript = transcript + "\n" if transcript else ""
+    write_text(transcript_path + ".txt", transcript)
+    save_segments(segments_path(transcript_path), lines)
+    with wave.open(original_path, "rb") as wf:
+        duration = wf.getnframes() / float(wf.getframerate())
+    # Polished in the background; later saves merge with what the web UI changes meanwhile
+    meta = JobMeta({
+        "datetime": datetime.utcnow().isoformat() + "Z",
+        "source": source,
+        "original_filename": filename,
+        "original_path": original_path,
+        "content_hash": content_hash,
+        "audio_length_sec": round(duration, 2),
+        "file_size": os.path.getsize(original_path),
+        "whisper_model": model_path,
+        "whisper_args": extra_args,
+        "status": "success" if transcript else "error",
+        "error": None if transcript else "(No speech recognized)",
+        "language": None,
+    })
+    json_path = transcript_path + ".json"
+    save_meta(json_path, meta)
+    release_name(TRANSCRIPTIONS_DIR, transcript_name)
+    if transcript:
+        meta_index.index_text(os.path.basename(json_path), "", transcript)
+        threading.Thread(target=polish_transcript, args=(transcript_name, json_path, meta, transcript), daemon=True).start()
+    logging.info(f"Saved live session {transcript_name}: {meta['audio_length_sec']}s, {len(lines)} lines")
+    return transcript_name
+
+@app.websocket("/ws/transcribe")
+async def ws_transcribe(websocket: WebSocket, format: str = "pcm", sample_rate: int = LIVE_RATE, channels: int = 1, filename: str = ""):
+    """
+    Live transcription. The client sends binary messages with audio as it is recorded:
+    format=pcm (s16le at sample_rate/channels) or format=opus (Ogg or WebM), then a text
+    message {"type": "stop"}. The server replies with JSON messages:
+    {"type": "partial"|"final", "start_ms", "end_ms", "text"} while audio arrives, and
+    {"type": "done", "transcription_id"} once the session is saved as a normal transcription.
+    A client that disconnects without "stop" still gets its session saved.
+    """
+    await websocket.accept()
+    if whisper_pool is None:
+        # With the cli backend every step would start its own whisper-cli (and reload the model)
+        # outside the queue's worker limit; the server pool bounds live windows by its size
+        await websocket.send_json({"type": "error", "error": "Live transcription needs whisper.backend: server"})
+        await websocket.close(code=1011)
+        return
+    session_name = f"live-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    filename = os.path.basename(filename) or session_name + ".wav"
+    source = websocket.headers.get("source", "live")
+    try:
+        decoder = await asyncio.to_thread(make_decoder, format, sample_rate, channels)
+    except (ValueError, OSError) as e:
+        await websocket.send_json({"type": "error", "error": str(e)})
+        await websocket.close(code=1003)
+        return
+    audio_path = os.path.join(UPLOAD_DIR, f"{session_name}.16k.wav")
+    writer = await asyncio.to_thread(wave.open, audio_path, "wb")
+    writer.setnchannels(1)
+    writer.setsampwidth(2)
+    writer.setframerate(LIVE_RATE)
+    live_cfg = settings.section("live")
+    transcriber = LiveTranscriber(
+        lambda pcm: transcribe_live_window(session_name, pcm),
+        step_sec=float(live_cfg.get("step_sec", 1.0)),
+        window_sec=float(live_cfg.get("window_sec", 15.0)),
+        guard_sec=float(live_cfg.get("guard_sec", 0.5)),
+    )
+    max_sec = float(live_cfg.get("max_session_sec", 4 * 3600))
+    connected = True
+    step_task = None
+
+    async def send(message: dict):
+        nonlocal connected
+        if not connected:
+            return
+        try:
+            await websocket.send_json(message)
+        except Exception:
+            connected = False
+
+    async def run_step(final: bool = False):
+        # Whisper runs in a worker thread; at most one step is in flight per session
+        try:
+            finals, partial = await asyncio.to_thread(transcriber.step, final)
+        except Exception as e:
+            logging.exception(f"Live transcription step failed for {session_name}")
+            await send({"type": "error", "error": str(e)})
+            return
+        for start_ms, end_ms, text in finals:
+            await send({"type": "final", "start_ms": start_ms, "end_ms": end_ms, "text": text})
+        if partial:
+            await send({"type": "partial", "start_ms": partial[0], "end_ms": partial[1], "text": partial[2]})
+
+    async def feed(pcm: bytes):
+        if pcm:
+            await asyncio.to_thread(writer.writeframes, pcm)
+            transcriber.feed(pcm)
+
+    try:
+        while transcriber.duration_sec() < max_sec:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                await feed(await asyncio.to_thread(decoder.feed, message["bytes"]))
+                if transcriber.ready() and (step_task is None or step_task.done()):
+                    step_task = asyncio.create_task(run_step())
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    control = {}
+                if control.get("type") in ("stop", "end"):
+                    break
+    except WebSocketDisconnect:
+        connected = False
+    except OSError as e:
+        # ffmpeg exited (e.g. undecodable Opus stream); keep what was decoded so far
+        logging.error(f"Live decoder failed for {session_name}: {e}")
+        await send({"type": "error", "error": f"Audio decoding failed: {e}"})
+    try:
+        await feed(await asyncio.to_thread(decoder.close))
+    except OSError:
+        pass
+    if step_task is not None:
+        await step_task
+    await run_step(final=True)
+    await asyncio.to_thread(writer.close)
+    transcript_name = await asyncio.to_thread(save_live_session, session_name, filename, audio_path, transcriber.finals, source)
+    await send({"type": "done", "transcription_id": transcript_name, "audio_length_sec": round(transcriber.duration_sec(), 2)})
+    if connected:
+        await websocket.close()
 
 def run_backend():
     import uvicorn
-    with open("config.yaml", "r") as f:
-        config = yaml.safe_load(f)
-    backend_cfg = config.get("backend_server", {"host": "0.0.0.0", "port": 8000})
+    backend_cfg = settings.section("backend_server")
     uvicorn.run("main:app", host=backend_cfg.get("host", "0.0.0.0"), port=backend_cfg.get("port", 8000))
 
 def run_frontend():
     import uvicorn
-    with open("config.yaml", "r") as f:
-        config = yaml.safe_load(f)
-    frontend_cfg = config.get("frontend_server", {"host": "0.0.0.0", "port": 8001})
+    frontend_cfg = settings.section("frontend_server")
     uvicorn.run("webui:app", host=frontend_cfg.get("host", "0.0.0.0"), port=frontend_cfg.get("port", 8001))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Web Transcriber launcher")
     parser.add_argument("--backend", action="store_true", help="Run backend API server (main:app)")
     parser.add_argument("--frontend", action="store_true", help="Run frontend web UI (webui:app)")
+    parser.add_argument("--rebuild-index", action="store_true", help="Rebuild the transcription list and full-text search index from the JSON metadata and markdown files")
+    parser.add_argument("--compact", action="store_true", help="Move transcripts out of the metadata JSON, recompress, shard archived uploads, apply retention and remove stale scratch files")
+    parser.add_argument("--ingest", metavar="DIR", help="Transcribe every audio file and archive under DIR, skipping content already transcribed, then print throughput")
+    parser.add_argument("--parallel", type=int, help="Files hashed and converted at once by --ingest (default: ingest.parallel)")
+    parser.add_argument("--priority", type=int, default=10, help="Queue priority of --ingest jobs; higher runs later (default: 10)")
     args = parser.parse_args()
-    if args.backend:
+    if args.compact:
+        print(json.dumps(compact_storage(), indent=2))
+    elif args.ingest:
+        try:
+            summary = asyncio.run(ingest_directory(args.ingest, args.parallel, args.priority))
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(summary, indent=2))
+    elif args.rebuild_index:
+        print(f"Indexed {meta_index.rebuild(TRANSCRIPTIONS_DIR, MARKDOWNS_DIR)} transcriptions")
+    elif args.backend:
         run_backend()
     elif args.frontend:
         run_frontend()
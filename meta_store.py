@@ -0,0 +1,118 @@
+import os
+import json
+import fcntl
+import tempfile
+from contextlib import contextmanager
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """
+    Replace path with data so that readers see either the old or the new content, never a
+    truncated file: write a temporary file in the same directory, fsync it, then rename.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_text(path: str, text: str):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path: str, data):
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def lock_path(json_path: str) -> str:
+    # Kept beside the metadata in a hidden directory so the JSON listing is unaffected
+    return os.path.join(os.path.dirname(json_path) or ".", ".locks", os.path.basename(json_path) + ".lock")
+
+
+def reserve_name(directory: str, candidates, suffix: str = ".json") -> str:
+    """
+    Claim the first of candidates (names without suffix) that has no <name><suffix> in directory
+    and is not claimed by someone else. The claim is a marker file in directory/.names created
+    with O_EXCL, so two concurrent callers never get the same name; release it with release_name()
+    once <name><suffix> is written, or when the name is not used after all.
+    """
+    names_dir = os.path.join(directory, ".names")
+    os.makedirs(names_dir, exist_ok=True)
+    for name in candidates:
+        if os.path.exists(os.path.join(directory, name + suffix)):
+            continue
+        try:
+            with open(os.path.join(names_dir, name), "x"):
+                pass
+        except FileExistsError:
+            continue
+        # The previous holder writes its file before releasing the claim, so this sees it
+        if os.path.exists(os.path.join(directory, name + suffix)):
+            release_name(directory, name)
+            continue
+        return name
+    raise ValueError("No free name among the candidates")
+
+
+def release_name(directory: str, name: str):
+    try:
+        os.remove(os.path.join(directory, ".names", name))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def job_lock(json_path: str):
+    """
+    Exclusive per-job lock (flock on a side lock file) around a read-modify-write of a job's
+    metadata. Works between the API server, the web UI and worker threads, since every holder
+    opens its own file descriptor.
+    """
+    path = lock_path(json_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def update_meta(json_path: str, apply) -> dict:
+    """
+    Under the job lock, load the current metadata, call apply(meta) to change it in place and
+    write it back atomically. Returns the updated metadata. Use this from code that does not
+    own the job (the web UI), so changes made meanwhile by the worker are not overwritten.
+    """
+    with job_lock(json_path):
+        with open(json_path, "r") as f:
+            meta = json.load(f)
+        apply(meta)
+        atomic_write_json(json_path, meta)
+    return meta
+
+
+def merge_meta(json_path: str, meta: dict, seen: dict) -> dict:
+    """
+    Write back the fields of meta that differ from seen (the metadata as the caller last read
+    or wrote it), including removed ones, through update_meta. Fields another process changed
+    meanwhile are kept. Returns the merged metadata now on disk.
+    """
+    changed = [key for key in {**seen, **meta} if key not in meta or key not in seen or meta[key] != seen[key]]
+
+    def apply(current):
+        for key in changed:
+            if key in meta:
+                current[key] = meta[key]
+            else:
+                current.pop(key, None)
+
+    return update_meta(json_path, apply)
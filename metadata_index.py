@@ -0,0 +1,211 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from storage import read_text, stored_path, transcript_text
+
+# Summary fields the web UI list needs; full metadata stays in the per-job JSON files
+LIST_COLUMNS = ["fname", "datetime", "title", "markdown_file", "status", "duration", "source", "original_filename"]
+# Control characters cannot appear in indexed text, so they safely mark highlights in snippets
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+# Queries matching more documents than this are ordered by recency instead of bm25
+RANK_MAX_MATCHES = 2000
+
+
+def to_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word must match, quoted so FTS5 syntax in
+    user input is taken literally, and the last word also matches as a prefix.
+    """
+    terms = [t.replace('"', '""') for t in query.split()]
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def summary_row(fname: str, meta: dict) -> tuple:
+    return (
+        fname,
+        meta.get("datetime", "") or "",
+        meta.get("markdown_title", "") or "",
+        meta.get("markdown_file", "") or "",
+        meta.get("status", "") or "",
+        meta.get("audio_length_sec"),
+        meta.get("source", "") or "",
+        meta.get("original_filename", "") or "",
+    )
+
+
+class MetadataIndex:
+    """
+    SQLite index of the list fields of every transcription JSON, so the web UI can page
+    through transcriptions without opening each metadata file, plus an FTS5 full-text index
+    over transcript text, markdown title and markdown body. Both the API server and the
+    web UI write to it as metadata changes; WAL mode lets them share the file.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the index consistent on crash; NORMAL only risks the last commits on power loss
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        has_search = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search'").fetchone() is not None
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS transcriptions (
+                fname TEXT PRIMARY KEY,
+                datetime TEXT NOT NULL,
+                title TEXT NOT NULL,
+                markdown_file TEXT NOT NULL,
+                status TEXT NOT NULL,
+                duration REAL,
+                source TEXT NOT NULL,
+                original_filename TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS transcriptions_datetime ON transcriptions(datetime DESC, fname DESC);
+            CREATE INDEX IF NOT EXISTS transcriptions_status ON transcriptions(status, datetime DESC, fname DESC);
+            CREATE INDEX IF NOT EXISTS transcriptions_source ON transcriptions(source, datetime DESC, fname DESC);
+            CREATE TABLE IF NOT EXISTS search_ids (id INTEGER PRIMARY KEY, fname TEXT NOT NULL UNIQUE);
+            CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(
+                fname UNINDEXED, title, transcript, markdown, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        self._db.commit()
+        # An index created before full-text search existed has list rows but no text yet
+        self.needs_rebuild = not has_search and self.count() > 0
+
+    def upsert(self, fname: str, meta: dict):
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO transcriptions({', '.join(LIST_COLUMNS)}) VALUES ({', '.join('?' * len(LIST_COLUMNS))})",
+                summary_row(fname, meta))
+            self._db.commit()
+
+    def delete(self, fname: str):
+        with self._lock:
+            self._db.execute("DELETE FROM transcriptions WHERE fname = ?", (fname,))
+            row = self._db.execute("SELECT id FROM search_ids WHERE fname = ?", (fname,)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM search WHERE rowid = ?", row)
+                self._db.execute("DELETE FROM search_ids WHERE id = ?", row)
+            self._db.commit()
+
+    def index_text(self, fname: str, title: str, transcript: str, markdown: str = ""):
+        """Replace the full-text entry of one transcription."""
+        with self._lock:
+            # FTS5 can only delete efficiently by rowid, so each fname keeps a stable rowid in search_ids
+            row = self._db.execute("SELECT id FROM search_ids WHERE fname = ?", (fname,)).fetchone()
+            if row:
+                doc_id = row[0]
+                self._db.execute("DELETE FROM search WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = self._db.execute("INSERT INTO search_ids(fname) VALUES (?)", (fname,)).lastrowid
+            self._db.execute(
+                "INSERT INTO search(rowid, fname, title, transcript, markdown) VALUES (?, ?, ?, ?, ?)",
+                (doc_id, fname, title or "", transcript or "", markdown or ""))
+            self._db.commit()
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """
+        Matching transcriptions, best first. Each result has the list fields plus a snippet in
+        which matched terms are wrapped in SNIPPET_START/SNIPPET_END markers, for the caller to
+        escape and highlight.
+
+        bm25 ranking has to score every match, so a query matching more than RANK_MAX_MATCHES
+        documents (a very common word) is returned newest first instead, which FTS5 can stop
+        early on. Rowids are assigned in chronological order, so rowid order is recency.
+        """
+        match = to_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            matches = self._db.execute(
+                "SELECT COUNT(*) FROM (SELECT rowid FROM search WHERE search MATCH ? LIMIT ?)",
+                (match, RANK_MAX_MATCHES + 1)).fetchone()[0]
+            order = "rank" if matches <= RANK_MAX_MATCHES else "search.rowid DESC"
+            rows = self._db.execute(
+                f"SELECT {', '.join('t.' + c for c in LIST_COLUMNS)},"
+                f" snippet(search, -1, '{SNIPPET_START}', '{SNIPPET_END}', '...', 16)"
+                " FROM search JOIN transcriptions t ON t.fname = search.fname"
+                f" WHERE search MATCH ? ORDER BY {order} LIMIT ?",
+                (match, limit)).fetchall()
+        return [dict(zip(LIST_COLUMNS + ["snippet"], row)) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+
+    def list_after(self, after=None, limit: int = 50, status: str = None, source: str = None, since: str = None) -> list:
+        """
+        Keyset pagination, newest first: rows strictly older than after=(datetime, fname).
+        Optional filters on status, source and a minimum datetime (ISO string).
+        """
+        where, args = [], []
+        if after:
+            where.append("(datetime < ? OR (datetime = ? AND fname < ?))")
+            args += [after[0], after[0], after[1]]
+        if status:
+            where.append("status = ?")
+            args.append(status)
+        if source:
+            where.append("source = ?")
+            args.append(source)
+        if since:
+            where.append("datetime >= ?")
+            args.append(since)
+        sql = f"SELECT {', '.join(LIST_COLUMNS)} FROM transcriptions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY datetime DESC, fname DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [dict(zip(LIST_COLUMNS, row)) for row in rows]
+
+    def rebuild(self, transcriptions_dir: str, markdowns_dir: str = None) -> int:
+        """
+        Re-index every metadata JSON in transcriptions_dir from scratch, including the full-text
+        index (markdown bodies are read from markdowns_dir). Returns the number indexed.
+        """
+        rows = []
+        texts = []
+        for fname in os.listdir(transcriptions_dir):
+            path = os.path.join(transcriptions_dir, fname)
+            if not fname.endswith(".json") or fname.endswith(".segments.json") or not os.path.isfile(path):
+                continue
+            try:
+                with open(path, "r") as jf:
+                    meta = json.load(jf)
+            except Exception:
+                logging.exception(f"Skipping unreadable metadata {path}")
+                continue
+            rows.append(summary_row(fname, meta))
+            markdown = ""
+            md_name = meta.get("markdown_file")
+            if markdowns_dir and md_name and stored_path(os.path.join(markdowns_dir, md_name)):
+                markdown = read_text(os.path.join(markdowns_dir, md_name))
+            texts.append((meta.get("datetime", "") or "", fname, meta.get("markdown_title") or "", transcript_text(path, meta), markdown))
+        # Oldest first, so search rowids follow recording time
+        texts.sort()
+        texts = [t[1:] for t in texts]
+        with self._lock:
+            self._db.execute("DELETE FROM transcriptions")
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO transcriptions({', '.join(LIST_COLUMNS)}) VALUES ({', '.join('?' * len(LIST_COLUMNS))})",
+                rows)
+            self._db.execute("DELETE FROM search")
+            self._db.execute("DELETE FROM search_ids")
+            self._db.executemany("INSERT INTO search_ids(id, fname) VALUES (?, ?)", [(i + 1, t[0]) for i, t in enumerate(texts)])
+            self._db.executemany(
+                "INSERT INTO search(rowid, fname, title, transcript, markdown) VALUES (?, ?, ?, ?, ?)",
+                [(i + 1,) + t for i, t in enumerate(texts)])
+            self._db.commit()
+        self.needs_rebuild = False
+        logging.info(f"Rebuilt metadata index with {len(rows)} transcriptions")
+        return len(rows)
@@ -0,0 +1,160 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Seconds; spans a fast metadata write up to a multi-hour transcription
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _label_str(labelnames, values) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_label_str(self.labelnames, labels)} {value}"
+
+
+class Gauge:
+    """A value read at scrape time from a callback, e.g. the job queue depth."""
+
+    def __init__(self, name: str, help_text: str, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {self.read()}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def snapshot(self) -> dict:
+        """{labels: {"buckets": {le: cumulative count}, "sum", "count"}} for JSON stats endpoints."""
+        with self._lock:
+            series = {labels: dict(s, counts=list(s["counts"])) for labels, s in self._series.items()}
+        result = {}
+        for labels, s in series.items():
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, s["counts"]):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = s["count"]
+            result[labels] = {"buckets": buckets, "sum": s["sum"], "count": s["count"]}
+        return result
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, s in sorted(self.snapshot().items()):
+            for le, count in s["buckets"].items():
+                yield f"{self.name}_bucket{_label_str(self.labelnames + ('le',), labels + (le,))} {count}"
+            yield f"{self.name}_sum{_label_str(self.labelnames, labels)} {s['sum']}"
+            yield f"{self.name}_count{_label_str(self.labelnames, labels)} {s['count']}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics = [m for m in self._metrics if m.name != metric.name] + [metric]
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Process-wide registry and the metrics shared by the API server and the web UI
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "transcriber_stage_seconds",
+    "Time spent per pipeline stage (upload_receive, probe, ffmpeg, whisper, llm, metadata_write)",
+    ("stage",)))
+JOBS_TOTAL = REGISTRY.register(Counter("transcriber_jobs_total", "Finished transcription jobs by status", ("status",)))
+UPLOADS_TOTAL = REGISTRY.register(Counter(
+    "transcriber_uploads_total", "Uploads by outcome (accepted, cached, rejected, invalid)", ("outcome",)))
+OLLAMA_SECONDS = REGISTRY.register(Histogram(
+    "transcriber_ollama_request_seconds", "Ollama request latency", ("model", "outcome"),
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)))
+
+
+def record_stage(timings, stage: str, seconds: float):
+    """Observe a stage duration and, when timings is a job's dict, add it to that job's total for the stage."""
+    STAGE_SECONDS.observe(seconds, stage)
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0) + seconds, 3)
+
+
+@contextmanager
+def stage_timer(stage: str, timings=None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(timings, stage, time.perf_counter() - started)
@@ -1,19 +1,195 @@
-import requests
-import yaml
+import re
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from llm_cache import result_key
+from long_transcript import needs_chunking
+from metrics import OLLAMA_SECONDS
+from settings import get_settings
+
+# Fields the model is asked to return; also used to salvage a cut-off streamed response
+RESULT_FIELDS = ("markdown", "title", "file_name")
+# Instructions for the passes of chunked (map-reduce) polishing, see long_transcript.py
+CHUNK_PROMPT = (
+    "This is one part of a longer transcript. Polish only this part into clean, readable Markdown, "
+    "without a document title and without summarizing. The context before it is only for continuity; "
+    "do not repeat it.\n\nReturn a JSON object with one field: markdown."
+)
+TITLE_PROMPT = (
+    "Below is a Markdown document made from a transcript. Return a JSON object with the following fields: "
+    "title (a human-friendly title for the transcript), and file_name (a short, relevant file name for the "
+    "markdown, suitable for Obsidian)."
+)
+
+
+def parse_partial_result(raw: str) -> dict:
+    """
+    Best-effort parse of a (possibly truncated) JSON result streamed by the model.
+    A complete object is returned as-is; otherwise each string field that has started is
+    recovered up to where the stream stopped. Output that is not JSON at all becomes the markdown.
+    """
+    try:
+        result = json.loads(raw)
+        if isinstance(result, dict):
+            return result
+    except ValueError:
+        pass
+    result = {}
+    for field in RESULT_FIELDS:
+        match = re.search(r'"%s"\s*:\s*"' % field, raw)
+        if not match:
+            continue
+        rest = raw[match.end():]
+        # The value ends at the first quote not preceded by an odd number of backslashes
+        end = re.search(r'(?<!\\)(?:\\\\)*"', rest)
+        fragment = rest[:end.end() - 1] if end else rest
+        # Drop an escape sequence cut in half at the end of the stream
+        fragment = re.sub(r'(?<!\\)((?:\\\\)*)\\(u[0-9a-fA-F]{0,3})?$', r"\1", fragment)
+        try:
+            result[field] = json.loads('"' + fragment + '"')
+        except ValueError:
+            result[field] = fragment
+    if not result and raw.strip() and not raw.lstrip().startswith("{"):
+        result["markdown"] = raw
+    return result
+
+
+def observe_latency(model: str, seconds: float, ok: bool = True):
+    """Record one completed Ollama call; shared by the sync and async clients."""
+    OLLAMA_SECONDS.observe(seconds, model, "ok" if ok else "error")
+
+
+def latency_stats() -> dict:
+    """Per-model summary of the Ollama latency histogram for /api/ollama/stats."""
+    stats = {}
+    for (model, outcome), series in OLLAMA_SECONDS.snapshot().items():
+        entry = stats.setdefault(model, {"count": 0, "errors": 0, "total": 0.0, "buckets": {}})
+        entry["count"] += series["count"]
+        entry["total"] += series["sum"]
+        if outcome == "error":
+            entry["errors"] += series["count"]
+        previous = 0
+        for le, cumulative in series["buckets"].items():
+            label = "le_inf" if le == "+Inf" else f"le_{le}"
+            entry["buckets"][label] = entry["buckets"].get(label, 0) + cumulative - previous
+            previous = cumulative
+    for entry in stats.values():
+        total = entry.pop("total")
+        entry["mean_sec"] = round(total / entry["count"], 3) if entry["count"] else 0.0
+    return stats
+
+
+def _load_ollama_config(config_path: str) -> dict:
+    return get_settings(config_path).section("ollama")
+
+
+def _extract_content(result: dict) -> str:
+    # For /api/chat endpoint, structured output is in message.content
+    if 'message' in result and 'content' in result['message']:
+        return result['message']['content']
+    return result.get("response", "")
+
+
+class InFlightLimit:
+    """
+    Process-wide cap on concurrent Ollama generations, shared by the sync and async clients
+    so that threads and event-loop handlers together never exceed ollama.max_in_flight.
+    Threads wait on a condition; coroutines wait on an asyncio.Event set from release().
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._used = 0
+        self._cond = threading.Condition()
+        self._waiters = []
+
+    def resize(self, limit: int):
+        with self._cond:
+            self.limit = limit
+        self._wake()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # that waiter's event loop has since closed
+
+    def _try_acquire(self) -> bool:
+        if self._used < self.limit:
+            self._used += 1
+            return True
+        return False
+
+    def __enter__(self):
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._used -= 1
+        self._wake()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return self
+                event = asyncio.Event()
+                self._waiters.append((loop, event))
+            await event.wait()
+
+    async def __aexit__(self, *exc):
+        self.__exit__(*exc)
+
+
+# One limit per process, sized by the most recently built client (i.e. the current config)
+_in_flight = InFlightLimit(2)
+
 
 class OllamaClient:
+    """
+    Long-lived Ollama client: one keep-alive connection pool, at most max_in_flight
+    generations at a time, and exponential-backoff retries on connection errors and 5xx.
+    Use get_client() to share one instance per process.
+    """
+
     def __init__(self, config_path="config.yaml"):
-        with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
-        ollama_cfg = config.get("ollama", {})
+        ollama_cfg = _load_ollama_config(config_path)
         self.host = ollama_cfg.get("host", "http://localhost")
         self.port = ollama_cfg.get("port", 11434)
         self.model = ollama_cfg.get("model", "llama3")
         self.prompt = ollama_cfg.get("prompt", "Polish this transcript into a clean, readable Markdown document:")
         self.base_url = f"{self.host}:{self.port}"
+        self.timeout = float(ollama_cfg.get("timeout", 120))
+        self.max_in_flight = max(1, int(ollama_cfg.get("max_in_flight", 2)))
+        self.chunking = ollama_cfg.get("chunking", {}) or {}
+        self.retries = int(ollama_cfg.get("retries", 3))
+        self.backoff = float(ollama_cfg.get("backoff", 0.5))
+        _in_flight.resize(self.max_in_flight)
+        # Imported with the first client, so importing this module (e.g. for latency_stats) stays cheap
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retry = Retry(
+            total=self.retries, connect=self.retries, read=0, status=self.retries,
+            backoff_factor=self.backoff, status_forcelist=(500, 502, 503, 504),
+            allowed_methods=None, raise_on_status=False,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight, max_retries=retry))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight, max_retries=retry))
 
-    def generate_markdown(self, transcript_text):
-        url = f"{self.base_url}/api/chat"
+    def _chat_payload(self, transcript_text, stream: bool) -> dict:
         prompt = (
             self.prompt +
             "\n\nReturn a JSON object with the following fields: markdown (the polished markdown text), title (a human-friendly title for the transcript), and file_name (a short, relevant file name for the markdown, suitable for Obsidian)." 
@@ -23,7 +199,7 @@ class OllamaClient:
             "messages": [
                 {"role": "user", "content": f"{prompt}\n\n{transcript_text}"}
             ],
-            "stream": False,
+            "stream": stream,
             "format": {
                 "type": "object",
                 "properties": {
@@ -37,32 +213,211 @@ class OllamaClient:
                 "temperature": 0
             }
         }
-        # Log the full request payload
+        return data
+
+    def generate_markdown(self, transcript_text):
+        url = f"{self.base_url}/api/chat"
+        data = self._chat_payload(transcript_text, stream=False)
+        # Sizes only: the payload is the whole transcript
+        logging.info(f"Ollama request: model={self.model} transcript_chars={len(transcript_text)}")
+        started = time.monotonic()
         try:
-            with open("server.log", "a") as logf:
-                logf.write(f"[OLLAMA REQUEST] {url}: {data}\n")
-        except Exception:
-            pass
+            with _in_flight:
+                response = self.session.post(url, json=data, timeout=self.timeout)
+            response.raise_for_status()
+            content = _extract_content(response.json())
+            observe_latency(self.model, time.monotonic() - started)
+            logging.info(f"Ollama response: model={self.model} status={response.status_code} "
+                         f"bytes={len(response.content)} in {time.monotonic() - started:.2f}s")
+            return content
+        except Exception as e:
+            observe_latency(self.model, time.monotonic() - started, ok=False)
+            logging.error(f"Ollama request failed: {e}")
+            return f"Error: {e}"
+
+    def result_key(self, transcript_text: str) -> str:
+        """LLM cache key of polishing transcript_text with this client's model, prompt and schema."""
+        payload = self._chat_payload("", stream=False)
+        variant = ""
+        if needs_chunking(transcript_text, self.chunking):
+            # A chunked result depends on how the transcript was cut and on the chunk prompts
+            variant = json.dumps({k: self.chunking.get(k) for k in ("chunk_chars", "overlap_chars")}) + CHUNK_PROMPT + TITLE_PROMPT
+        return result_key(transcript_text, payload["messages"][0]["content"], self.model,
+                          {"format": payload["format"], "options": payload["options"]}, variant)
+
+    def chat_json(self, content: str, fields) -> dict:
+        """
+        One non-streaming chat turn constrained to a JSON object of string fields.
+        Unlike generate_markdown this raises on failure, so a chunked run can fail as a whole.
+        """
+        data = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": content}],
+            "stream": False,
+            "format": {
+                "type": "object",
+                "properties": {field: {"type": "string"} for field in fields},
+                "required": list(fields),
+            },
+            "options": {"temperature": 0},
+        }
+        started = time.monotonic()
+        ok = False
         try:
-            response = requests.post(url, json=data, timeout=120)
-            # Log the raw HTTP response text
+            with _in_flight:
+                response = self.session.post(f"{self.base_url}/api/chat", json=data, timeout=self.timeout)
+            response.raise_for_status()
+            result = parse_partial_result(_extract_content(response.json()))
+            ok = True
+            return result
+        finally:
+            observe_latency(self.model, time.monotonic() - started, ok)
+
+    def polish_chunk(self, chunk_text: str, context: str = "") -> str:
+        content = f"{self.prompt}\n\n{CHUNK_PROMPT}\n\n"
+        if context:
+            content += f"Context before this part:\n{context}\n\n"
+        content += f"Part to polish:\n{chunk_text}"
+        return self.chat_json(content, ("markdown",)).get("markdown", "")
+
+    def title_markdown(self, markdown: str) -> dict:
+        return self.chat_json(f"{TITLE_PROMPT}\n\n{markdown}", ("title", "file_name"))
+
+
+class AsyncOllamaClient(OllamaClient):
+    """
+    asyncio variant for FastAPI handlers: awaits Ollama on an httpx.AsyncClient keep-alive pool
+    instead of tying up a worker thread. Same limits, retries and histograms as OllamaClient.
+    Use get_async_client() to share one instance.
+    """
+
+    def __init__(self, config_path="config.yaml"):
+        super().__init__(config_path)
+        self.session.close()
+        self.session = None
+        self._client = None
+
+    def _ensure_client(self):
+        # Created lazily so the pool binds to the running event loop
+        if self._client is None:
+            # Only the web UI's async handlers use httpx; the API server's workers never import it
+            import httpx
+            limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=httpx.Timeout(self.timeout, connect=10))
+
+    async def _post_with_retry(self, data: dict):
+        import httpx
+        for attempt in range(self.retries + 1):
             try:
-                with open("server.log", "a") as logf:
-                    logf.write(f"[OLLAMA RAW RESPONSE] {response.text}\n")
-            except Exception:
-                pass
+                response = await self._client.post("/api/chat", json=data)
+                if response.status_code < 500 or attempt == self.retries:
+                    return response
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError):
+                if attempt == self.retries:
+                    raise
+            # Exponential backoff with jitter: backoff, 2*backoff, 4*backoff, ...
+            await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random() / 2))
+
+    async def generate_markdown(self, transcript_text):
+        self._ensure_client()
+        data = self._chat_payload(transcript_text, stream=False)
+        started = time.monotonic()
+        try:
+            async with _in_flight:
+                response = await self._post_with_retry(data)
             response.raise_for_status()
-            result = response.json()
-            # For /api/chat endpoint, structured output is in message.content
-            if 'message' in result and 'content' in result['message']:
-                return result['message']['content']
-            else:
-                return result.get("response", "")
+            content = _extract_content(response.json())
+            observe_latency(self.model, time.monotonic() - started)
+            return content
         except Exception as e:
-            # Log the exception
-            try:
-                with open("server.log", "a") as logf:
-                    logf.write(f"[OLLAMA ERROR] {e}\n")
-            except Exception:
-                pass
+            observe_latency(self.model, time.monotonic() - started, ok=False)
+            logging.error(f"Ollama request failed: {e}")
             return f"Error: {e}"
+
+    async def stream_markdown(self, transcript_text, timeout: float = None):
+        """
+        Stream the chat response, yielding content pieces as Ollama generates them (NDJSON).
+        Raises on HTTP/connection errors, and TimeoutError once timeout seconds have passed in
+        total; pieces already yielded are the caller's to keep.
+        """
+        self._ensure_client()
+        timeout = timeout or self.timeout
+        data = self._chat_payload(transcript_text, stream=True)
+        async with _in_flight:
+            started = time.monotonic()
+            deadline = started + timeout
+            ok = False
+            try:
+                async with self._client.stream("POST", "/api/chat", json=data) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise RuntimeError(chunk["error"])
+                        piece = chunk.get("message", {}).get("content") or chunk.get("response", "")
+                        if piece:
+                            yield piece
+                        if chunk.get("done"):
+                            ok = True
+                            return
+                        if time.monotonic() > deadline:
+                            raise TimeoutError(f"Ollama generation exceeded {timeout}s")
+            finally:
+                observe_latency(self.model, time.monotonic() - started, ok)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+# Async clients replaced after a config change; their connection pools are closed on shutdown
+_retired = []
+
+
+def _shared_client(kind: str, cls, config_path: str):
+    """
+    One client per kind and config file, rebuilt when the ollama section of the file changes.
+    A client already handed out keeps working with the old settings until its calls finish.
+    """
+    settings = get_settings(config_path)
+    # Reading the section first picks up a changed file and bumps settings.version
+    ollama_cfg = settings.section("ollama")
+    key = (kind, config_path)
+    with _clients_lock:
+        entry = _clients.get(key)
+        if entry is not None and entry[1] == settings.version:
+            return entry[0]
+        if entry is None or entry[2] != ollama_cfg:
+            if entry is not None:
+                if kind == "async":
+                    _retired.append(entry[0])
+                logging.info(f"Ollama settings changed; new {kind} client for {ollama_cfg.get('model', 'llama3')}")
+            entry = (cls(config_path), settings.version, ollama_cfg)
+        else:
+            entry = (entry[0], settings.version, ollama_cfg)
+        _clients[key] = entry
+        return entry[0]
+
+
+def get_client(config_path="config.yaml") -> OllamaClient:
+    """Shared OllamaClient for this process."""
+    return _shared_client("sync", OllamaClient, config_path)
+
+
+def get_async_client(config_path="config.yaml") -> AsyncOllamaClient:
+    """Shared AsyncOllamaClient for this process."""
+    return _shared_client("async", AsyncOllamaClient, config_path)
+
+
+async def close_async_clients():
+    """Close the connection pools of every async client; call on application shutdown."""
+    with _clients_lock:
+        clients = _retired + [entry[0] for key, entry in _clients.items() if key[0] == "async"]
+        _retired.clear()
+    for client in clients:
+        await client.aclose()
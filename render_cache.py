@@ -0,0 +1,113 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+
+def file_key(paths) -> tuple:
+    """(path, mtime_ns, size) of each path; a missing file is part of the key too."""
+    key = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            key.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            key.append((path, None, None))
+    return tuple(key)
+
+
+class RenderCache:
+    """
+    LRU cache of rendered HTML fragments. Each entry remembers the files it was rendered from
+    and their mtime/size; a lookup stats those files (no reads) and treats any change as a
+    miss. Entries carry an ETag and Last-Modified derived from the same key, so conditional
+    requests can be answered with 304 without rendering. Evicts least recently used entries
+    beyond max_entries or max_bytes of HTML.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str):
+        """The entry for name ({"html", "etag", "last_modified", ...}) if its files are unchanged, else None."""
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is not None and file_key(entry["paths"]) == entry["key"]:
+            with self._lock:
+                if name in self._entries:
+                    self._entries.move_to_end(name)
+                self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, name: str, paths, html: str) -> dict:
+        """Store html rendered from paths (stat-ed now) and return the new entry."""
+        key = file_key(paths)
+        mtimes = [mtime for _, mtime, _ in key if mtime is not None]
+        entry = {
+            "key": key,
+            "paths": list(paths),
+            "html": html,
+            "etag": '"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20] + '"',
+            "last_modified": max(mtimes) / 1e9 if mtimes else None,
+            "size": len(html.encode("utf-8")),
+        }
+        with self._lock:
+            old = self._entries.pop(name, None)
+            if old is not None:
+                self._bytes -= old["size"]
+            self._entries[name] = entry
+            self._bytes += entry["size"]
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes and len(self._entries) > 1):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted["size"]
+        return entry
+
+    def get_or_render(self, name: str, render) -> dict:
+        """Cached entry for name, or render() -> (html, paths it was made from) stored as a new one."""
+        entry = self.get(name)
+        if entry is None:
+            html, paths = render()
+            entry = self.put(name, paths, html)
+        return entry
+
+    def invalidate(self, name: str):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._bytes -= entry["size"]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+
+def validator_headers(entry: dict) -> dict:
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache"}
+    if entry["last_modified"] is not None:
+        headers["Last-Modified"] = formatdate(entry["last_modified"], usegmt=True)
+    return headers
+
+
+def not_modified(request_headers, entry: dict) -> bool:
+    """True if the request's If-None-Match / If-Modified-Since show the client already has entry."""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return entry["etag"] in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and entry["last_modified"] is not None:
+        try:
+            return int(entry["last_modified"]) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
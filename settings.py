@@ -0,0 +1,185 @@
+import os
+import time
+import logging
+import threading
+import yaml
+
+NUMBER = (int, float)
+# Expected type of known keys, by dotted path. Anything else is passed through unchecked and
+# an empty value (null) always means "use the default".
+SCHEMA = {
+    "upload_dir": str,
+    "transcriptions_dir": str,
+    "markdowns_dir": str,
+    "upload_chunk_size": int,
+    "max_upload_bytes": int,
+    "backend_server": dict,
+    "backend_server.host": str,
+    "backend_server.port": int,
+    "frontend_server": dict,
+    "frontend_server.host": str,
+    "frontend_server.port": int,
+    "whisper": dict,
+    "whisper.exe_path": str,
+    "whisper.model_path": str,
+    "whisper.extra_args": str,
+    "whisper.threads": int,
+    "whisper.backend": str,
+    "whisper.server_instances": int,
+    "whisper.server_base_port": int,
+    "ollama": dict,
+    "ollama.host": str,
+    "ollama.port": int,
+    "ollama.model": str,
+    "ollama.prompt": str,
+    "ollama.timeout": NUMBER,
+    "ollama.max_in_flight": int,
+    "ollama.retries": int,
+    "ollama.backoff": NUMBER,
+    "ollama.chunking": dict,
+    "queue": dict,
+    "queue.workers": int,
+    "cache": dict,
+    "llm_cache": dict,
+    "render_cache": dict,
+    "long_audio": dict,
+    "long_audio.min_duration_sec": NUMBER,
+    "long_audio.segment_sec": NUMBER,
+    "long_audio.overlap_sec": NUMBER,
+    "long_audio.workers": int,
+    "vad": dict,
+    "vad.threshold_db": NUMBER,
+    "vad.min_silence_sec": NUMBER,
+    "vad.pad_sec": NUMBER,
+    "vad.min_removed_sec": NUMBER,
+    "vad.max_floor_db": NUMBER,
+    "storage": dict,
+    "storage.compression": str,
+    "storage.compression_level": int,
+    "storage.markdown_compression": str,
+    "storage.originals": str,
+    "live": dict,
+    "jobs": dict,
+    "ingest": dict,
+    "ingest.parallel": int,
+    "logging": dict,
+}
+
+
+def validate(config) -> dict:
+    """
+    Check the types of the known keys of a parsed config. Returns the config ({} for an empty
+    file); raises ValueError naming every key of the wrong type.
+    """
+    if config is None:
+        return {}
+    if not isinstance(config, dict):
+        raise ValueError(f"config must be a mapping, not {type(config).__name__}")
+    errors = []
+    for key, expected in SCHEMA.items():
+        value = config
+        for part in key.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        # bool is an int subclass, but "port: yes" is still a mistake
+        if value is None or (isinstance(value, expected) and not (isinstance(value, bool) and expected is not bool)):
+            continue
+        names = " or ".join(t.__name__ for t in (expected if isinstance(expected, tuple) else (expected,)))
+        errors.append(f"{key} must be {names}, not {type(value).__name__}")
+    if errors:
+        raise ValueError("invalid config: " + "; ".join(errors))
+    return config
+
+
+class Settings:
+    """
+    Parsed and validated config file, shared by everything in the process. The file is parsed
+    once and again only when its mtime or size changes, which is checked at most every
+    check_interval seconds, so reading a setting costs a dict lookup. A change that fails to
+    parse or validate is logged and the previous settings stay in effect.
+    """
+
+    def __init__(self, path: str = "config.yaml", check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        # Bumped on every successful (re)load; lets callers cache what they build from a section
+        self.version = 0
+        self._data = None
+        self._stamp = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.reload()
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self) -> bool:
+        """Parse the file if it changed since the last load. Returns True if the settings changed."""
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                stamp = self._file_stamp()
+            except OSError:
+                if self._data is None:
+                    raise
+                logging.warning(f"{self.path} is not readable; keeping the loaded settings")
+                return False
+            if stamp == self._stamp:
+                return False
+            try:
+                with open(self.path, "r") as f:
+                    data = validate(yaml.safe_load(f))
+            except (yaml.YAMLError, ValueError) as e:
+                if self._data is None:
+                    raise ValueError(f"{self.path}: {e}") from e
+                # Remember the stamp so a broken file is reported once, not on every check
+                self._stamp = stamp
+                logging.error(f"Ignoring invalid {self.path}, keeping the loaded settings: {e}")
+                return False
+            first = self._data is None
+            self._data, self._stamp = data, stamp
+            self.version += 1
+            listeners = list(self._listeners)
+        if not first:
+            logging.info(f"Reloaded {self.path} (version {self.version})")
+            for listener in listeners:
+                try:
+                    listener(self)
+                except Exception as e:
+                    logging.error(f"Settings listener {listener!r} failed: {e}")
+        return True
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked >= self.check_interval:
+            self.reload()
+
+    @property
+    def data(self) -> dict:
+        self._maybe_reload()
+        return self._data
+
+    def get(self, key: str, default=None):
+        value = self.data.get(key)
+        return default if value is None else value
+
+    def section(self, name: str) -> dict:
+        """A top-level mapping such as "ollama"; {} when it is missing or empty."""
+        return self.data.get(name) or {}
+
+    def on_change(self, listener):
+        """Call listener(settings) after every reload that changed the settings."""
+        self._listeners.append(listener)
+        return listener
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def get_settings(path: str = "config.yaml") -> Settings:
+    """Shared Settings of a config file; the file is parsed on first use only."""
+    with _instances_lock:
+        if path not in _instances:
+            _instances[path] = Settings(path)
+        return _instances[path]
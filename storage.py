@@ -0,0 +1,167 @@
+import os
+import gzip
+import time
+import logging
+from meta_store import atomic_write_bytes
+
+try:
+    import zstandard
+except ImportError:
+    # Optional: without it "zstd" storage falls back to gzip
+    zstandard = None
+
+# Suffix added to a stored file per compression; readers accept any of them
+SUFFIXES = {"none": "", "zstd": ".zst", "gzip": ".gz"}
+
+_settings = {"compression": "none", "level": None, "markdown": "none"}
+
+
+def _resolve(compression: str) -> str:
+    compression = (compression or "none").lower()
+    if compression not in SUFFIXES:
+        raise ValueError(f"Unknown storage compression: {compression}")
+    if compression == "zstd" and zstandard is None:
+        logging.warning("zstandard is not installed; storing compressed files with gzip")
+        compression = "gzip"
+    return compression
+
+
+def configure(compression: str = "none", level: int = None, markdown_compression: str = "none") -> str:
+    """
+    Choose how write_text() stores new files: "zstd", "gzip" or "none". "zstd" needs the
+    zstandard package and falls back to gzip without it. Markdown files are opened directly
+    by editors such as Obsidian, so they have their own setting, uncompressed by default.
+    Returns the compression in effect.
+    """
+    _settings["compression"] = _resolve(compression)
+    _settings["level"] = level
+    _settings["markdown"] = _resolve(markdown_compression)
+    return _settings["compression"]
+
+
+def markdown_compression() -> str:
+    """How markdown files are stored; pass it to write_text()/recompress() for them."""
+    return _settings["markdown"]
+
+
+def shard_path(root: str, name: str) -> str:
+    """
+    root/ab/cd/<name> for a name starting with hex "abcd...", so no directory holds more than
+    a few hundred files; the directories are created as needed.
+    """
+    directory = os.path.join(root, name[:2], name[2:4])
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def variants(path: str) -> list:
+    """Every file name path may be stored under: plain, then each compressed form."""
+    return [path] + [path + suffix for suffix in SUFFIXES.values() if suffix]
+
+
+def stored_path(path: str):
+    """The file path is actually stored in, or None if it does not exist in any form."""
+    for candidate in variants(path):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def compress(data: bytes, compression: str, level: int = None) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=level or 3).compress(data)
+    if compression == "gzip":
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=level or 6, mtime=0)
+    return data
+
+
+def decompress(data: bytes, path: str) -> bytes:
+    if path.endswith(SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if path.endswith(SUFFIXES["gzip"]):
+        return gzip.decompress(data)
+    return data
+
+
+def write_text(path: str, text: str, compression: str = None) -> str:
+    """
+    Atomically store text as path (plus the suffix of the configured compression) and remove
+    any other stored form of path. Returns the file written.
+    """
+    compression = compression or _settings["compression"]
+    target = path + SUFFIXES[compression]
+    atomic_write_bytes(target, compress(text.encode("utf-8"), compression, _settings["level"]))
+    for candidate in variants(path):
+        if candidate != target and os.path.exists(candidate):
+            os.remove(candidate)
+    return target
+
+
+def read_text(path: str) -> str:
+    """Contents of path in whichever form it is stored; FileNotFoundError if in none."""
+    actual = stored_path(path)
+    if actual is None:
+        raise FileNotFoundError(path)
+    with open(actual, "rb") as f:
+        return decompress(f.read(), actual).decode("utf-8", errors="replace")
+
+
+def remove_text(path: str):
+    for candidate in variants(path):
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+
+def recompress(path: str, compression: str = None) -> bool:
+    """Rewrite path in the configured compression if it is stored differently. True if rewritten."""
+    compression = compression or _settings["compression"]
+    actual = stored_path(path)
+    if actual is None or actual == path + SUFFIXES[compression]:
+        return False
+    write_text(path, read_text(path), compression)
+    return True
+
+
+def transcript_text(json_path: str, meta: dict) -> str:
+    """
+    Transcript of a job: stored beside its metadata as <id>.txt. Metadata written before the
+    text moved out of the JSON still carries it inline as transcription_text.
+    """
+    if meta.get("transcription_text"):
+        return meta["transcription_text"]
+    try:
+        return read_text(os.path.splitext(json_path)[0] + ".txt")
+    except FileNotFoundError:
+        return ""
+
+
+def dir_size(root: str, skip=(".db", ".db-wal", ".db-shm")) -> int:
+    """Bytes of the files under root, except those ending in skip (SQLite databases by default)."""
+    total = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(skip):
+                continue
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+def remove_stale(directory: str, is_scratch, max_age_sec: float) -> int:
+    """Delete files directly in directory for which is_scratch(name) holds, if older than max_age_sec."""
+    removed = 0
+    cutoff = time.time() - max_age_sec
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if is_scratch(name) and os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,90 @@
+import json
+import bisect
+from storage import read_text, stored_path, write_text
+
+# Formats a transcript can be exported in, with their content types
+TRANSCRIPT_FORMATS = {
+    "txt": "text/plain; charset=utf-8",
+    "srt": "application/x-subrip; charset=utf-8",
+    "vtt": "text/vtt; charset=utf-8",
+    "json": "application/json",
+}
+
+
+def segments_path(transcript_path: str) -> str:
+    """<transcriptions_dir>/<id>.segments.json, next to the <id>.json metadata."""
+    return transcript_path + ".segments.json"
+
+
+def save_segments(path: str, segments):
+    """Store segments compactly as [[start_ms, end_ms, text], ...], compressed as configured in storage."""
+    write_text(path, json.dumps([list(seg) for seg in segments], ensure_ascii=False, separators=(",", ":")))
+
+
+def load_segments(path: str) -> list:
+    return [tuple(seg) for seg in json.loads(read_text(path))]
+
+
+def segments_from_whisper_json(result: dict) -> list:
+    """(start_ms, end_ms, text) lines from whisper.cpp's -oj output."""
+    return [(seg["offsets"]["from"], seg["offsets"]["to"], seg["text"]) for seg in result.get("transcription", [])]
+
+
+def segments_from_verbose_json(result: dict) -> list:
+    """(start_ms, end_ms, text) lines from whisper-server's verbose_json response (seconds)."""
+    return [(int(round(seg["start"] * 1000)), int(round(seg["end"] * 1000)), seg["text"]) for seg in result.get("segments", [])]
+
+
+def format_timestamp(ms: int, separator: str = ".") -> str:
+    hours, ms = divmod(int(ms), 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def to_srt(segments) -> str:
+    blocks = []
+    for i, (start, end, text) in enumerate(segments, 1):
+        blocks.append(f"{i}\n{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n{text.strip()}\n")
+    return "\n".join(blocks)
+
+
+def to_vtt(segments) -> str:
+    blocks = ["WEBVTT\n"]
+    for start, end, text in segments:
+        blocks.append(f"{format_timestamp(start)} --> {format_timestamp(end)}\n{text.strip()}\n")
+    return "\n".join(blocks)
+
+
+def render_transcript(segments, fmt: str) -> str:
+    """Render segments as txt, srt, vtt or json (a list of {start, end, text} in seconds)."""
+    if fmt == "srt":
+        return to_srt(segments)
+    if fmt == "vtt":
+        return to_vtt(segments)
+    if fmt == "json":
+        return json.dumps([{"start": start / 1000, "end": end / 1000, "text": text} for start, end, text in segments], ensure_ascii=False)
+    if fmt == "txt":
+        return "".join(text.strip() + "\n" for _, _, text in segments)
+    raise ValueError(f"Unsupported transcript format: {fmt}")
+
+
+def segment_at(segments, ms: int) -> int:
+    """Index of the segment playing at ms (or the next one after a gap), for seeking."""
+    index = bisect.bisect_right([start for start, _, _ in segments], ms) - 1
+    if index >= 0 and segments[index][1] <= ms:
+        index += 1
+    return min(max(index, 0), max(len(segments) - 1, 0))
+
+
+def read_transcript(transcript_path: str, fmt: str):
+    """
+    A stored transcript (transcript_path is <dir>/<id>) in fmt, rendered from its segments, or
+    None if there is nothing to render: no transcript at all, or no timestamps for srt/vtt/json.
+    txt is whisper's own text file when there is one.
+    """
+    if fmt == "txt" and stored_path(transcript_path + ".txt"):
+        return read_text(transcript_path + ".txt")
+    if not stored_path(segments_path(transcript_path)):
+        return None
+    return render_transcript(load_segments(segments_path(transcript_path)), fmt)
@@ -0,0 +1,41 @@
+import os
+import sys
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# main and webui resolve config.yaml and their data directories against the working directory
+# once, on import, so every test importing them shares one directory for the whole session
+CONFIG = """\
+upload_dir: "uploads"
+transcriptions_dir: "transcriptions"
+markdowns_dir: "markdowns"
+whisper:
+  exe_path: "/bin/true"
+  model_path: "model.bin"
+ollama:
+  host: "http://127.0.0.1"
+  port: 9
+  model: "test-model"
+logging:
+  file: "server.log"
+  level: "WARNING"
+"""
+
+
+@pytest.fixture(scope="session")
+def app_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("app")
+    (directory / "config.yaml").write_text(CONFIG)
+    (directory / "model.bin").write_bytes(b"")
+    # webui mounts static/ relative to the working directory
+    os.symlink(os.path.join(REPO_DIR, "static"), directory / "static")
+    return directory
+
+
+@pytest.fixture
+def in_app_dir(app_dir, monkeypatch):
+    """Run the test from the shared app directory; import main/webui inside the test."""
+    monkeypatch.chdir(app_dir)
+    return app_dir
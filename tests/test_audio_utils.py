@@ -0,0 +1,39 @@
+import os
+import sys
+import wave
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_utils import is_whisper_wav, parse_ffmpeg_duration, prepare_audio, prepare_audio_async
+
+
+def write_wav(path, rate, channels, seconds=1.0):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(b"\0\0" * channels * int(rate * seconds))
+
+
+def test_parse_ffmpeg_duration():
+    stderr = "Input #0, mov,mp4,m4a, from 'a.m4a':\n  Duration: 01:02:03.45, start: 0.000000, bitrate: 128 kb/s\n"
+    assert parse_ffmpeg_duration(stderr) == 3723.45
+    assert parse_ffmpeg_duration("  Duration: N/A, start: 0.000000, bitrate: N/A") is None
+
+
+def test_whisper_ready_wav_is_used_in_place(tmp_path):
+    ready = tmp_path / "ready.wav"
+    write_wav(ready, 16000, 1, seconds=2.5)
+    stereo = tmp_path / "stereo.wav"
+    write_wav(stereo, 44100, 2)
+    assert is_whisper_wav(str(ready)) and not is_whisper_wav(str(stereo))
+    assert not is_whisper_wav(str(tmp_path / "missing.wav"))
+    # No ffmpeg run needed: same path back, duration from the header
+    assert prepare_audio(str(ready), str(tmp_path / "out.wav")) == (str(ready), 2.5)
+    assert not (tmp_path / "out.wav").exists()
+
+
+def test_prepare_audio_async_matches_sync_for_ready_wav(tmp_path):
+    ready = tmp_path / "ready.wav"
+    write_wav(ready, 16000, 1, seconds=1.5)
+    assert asyncio.run(prepare_audio_async(str(ready), str(tmp_path / "out.wav"))) == (str(ready), 1.5)
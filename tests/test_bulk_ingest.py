@@ -0,0 +1,81 @@
+import io
+import os
+import sys
+import tarfile
+import zipfile
+import hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bulk_ingest import IngestStats, extract_archive, find_audio_files, is_audio_name
+
+
+def new_path_in(directory):
+    counter = iter(range(1000))
+    return lambda: str(directory / f"incoming-{next(counter)}")
+
+
+def test_audio_names():
+    assert is_audio_name("calls/2024/a.M4A")
+    assert not is_audio_name("notes.txt")
+    assert not is_audio_name("calls/.hidden.wav")
+    assert not is_audio_name("__MACOSX/calls/a.wav")
+
+
+def test_extract_zip_skips_other_members_and_flattens_paths(tmp_path):
+    archive = tmp_path / "batch.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("calls/one.wav", b"RIFF one")
+        zf.writestr("../escape.mp3", b"ID3 two")
+        zf.writestr("readme.txt", b"not audio")
+        zf.writestr("__MACOSX/calls/._one.wav", b"fork")
+    out = tmp_path / "out"
+    out.mkdir()
+    members = extract_archive(str(archive), new_path_in(out))
+    assert [(name, size) for name, _, size, _ in members] == [("one.wav", 8), ("escape.mp3", 7)]
+    name, path, size, digest = members[0]
+    assert os.path.dirname(path) == str(out)
+    assert digest == hashlib.sha256(b"RIFF one").hexdigest()
+    assert not (tmp_path / "escape.mp3").exists()
+
+
+def test_extract_keeps_members_with_the_same_basename(tmp_path):
+    # Recorder exports: day1/Recording.m4a, day2/Recording.m4a; each gets its own transcription id when submitted
+    archive = tmp_path / "export.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("day1/Recording.m4a", b"first")
+        zf.writestr("day2/Recording.m4a", b"second")
+    members = extract_archive(str(archive), new_path_in(tmp_path))
+    assert [name for name, _, _, _ in members] == ["Recording.m4a", "Recording.m4a"]
+    assert len({path for _, path, _, _ in members}) == 2 and members[0][3] != members[1][3]
+
+
+def test_extract_compressed_tar(tmp_path):
+    archive = tmp_path / "batch.tar.gz"
+    with tarfile.open(archive, "w:gz") as tf:
+        for name, data in (("a/b/two.flac", b"fLaC"), ("notes.md", b"# x")):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    members = extract_archive(str(archive), new_path_in(tmp_path))
+    assert [(name, size) for name, _, size, _ in members] == [("two.flac", 4)]
+    with open(members[0][1], "rb") as f:
+        assert f.read() == b"fLaC"
+
+
+def test_find_audio_files_is_recursive_and_sorted(tmp_path):
+    for rel in ("b/2.wav", "a/1.mp3", "a/skip.txt", ".cache/x.wav", "c.zip"):
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(b"x")
+    found = [os.path.relpath(p, tmp_path) for p in find_audio_files(str(tmp_path))]
+    assert found == ["c.zip", os.path.join("a", "1.mp3"), os.path.join("b", "2.wav")]
+
+
+def test_stats_summary_throughput():
+    stats = IngestStats()
+    stats.started -= 60
+    stats.transcribed = 30
+    stats.audio_sec = 7200
+    summary = stats.summary()
+    assert 29 <= summary["files_per_min"] <= 30
+    assert summary["audio_hours"] == 2.0
+    assert 110 <= summary["audio_hours_per_hour"] <= 120
@@ -0,0 +1,75 @@
+import os
+import json
+import time
+import pytest
+
+import storage
+from job_journal import JobJournal
+
+DAY = 86400
+
+
+@pytest.fixture
+def data_dirs(in_app_dir, tmp_path, monkeypatch):
+    """main with empty data directories of its own, so --compact sees only what a test creates."""
+    import main
+    for attr in ("TRANSCRIPTIONS_DIR", "MARKDOWNS_DIR", "UPLOAD_DIR"):
+        directory = tmp_path / attr.split("_")[0].lower()
+        directory.mkdir()
+        monkeypatch.setattr(main, attr, str(directory))
+    journal = JobJournal(str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(main, "_journal", journal)
+    monkeypatch.setattr(main, "upload_cache", None)
+    storage.configure("gzip", markdown_compression="none")
+    yield main
+    storage.configure("none")
+    journal.close()
+
+
+def add_job(main, name, **meta):
+    path = os.path.join(main.TRANSCRIPTIONS_DIR, name + ".json")
+    with open(path, "w") as f:
+        json.dump(dict({"source": "compact-test", "datetime": "2024-01-01T00:00:00Z"}, **meta), f)
+    return path
+
+
+def touch(path, age_sec=0):
+    with open(path, "wb") as f:
+        f.write(b"RIFF")
+    then = time.time() - age_sec
+    os.utime(path, (then, then))
+    return path
+
+
+def test_compact_recompresses_moves_text_and_keeps_active_wavs(data_dirs):
+    main = data_dirs
+    add_job(main, "done", status="success", markdown_file="done.md")
+    storage.write_text(os.path.join(main.TRANSCRIPTIONS_DIR, "done.txt"), "finished words", compression="none")
+    # Written while markdown was compressed too: moved back to a file editors can open
+    storage.write_text(os.path.join(main.MARKDOWNS_DIR, "done.md"), "# Done", compression="gzip")
+    legacy = add_job(main, "legacy", status="success", transcription_text="inline words")
+    add_job(main, "running", status="processing", content_hash="feed")
+    storage.write_text(os.path.join(main.TRANSCRIPTIONS_DIR, "running.txt"), "partial words", compression="none")
+    uploads = main.UPLOAD_DIR
+    kept = [touch(os.path.join(uploads, "running.16k.wav"), 2 * DAY),
+            # Named by content hash before converted WAVs were per job
+            touch(os.path.join(uploads, "feed.16k.wav"), 2 * DAY),
+            touch(os.path.join(uploads, "fresh.16k.wav")),
+            touch(os.path.join(uploads, ".incoming-fresh"))]
+    stale = [touch(os.path.join(uploads, "done.16k.wav"), 2 * DAY),
+             touch(os.path.join(uploads, ".incoming-old"), 2 * DAY)]
+
+    summary = main.compact_storage(scratch_max_age_sec=DAY)
+
+    assert {key: summary[key] for key in ("transcriptions", "texts_moved", "recompressed", "scratch_removed")} == \
+        {"transcriptions": 2, "texts_moved": 1, "recompressed": 2, "scratch_removed": 2}
+    base = os.path.join(main.TRANSCRIPTIONS_DIR, "")
+    assert storage.stored_path(base + "done.txt") == base + "done.txt.gz"
+    assert storage.stored_path(os.path.join(main.MARKDOWNS_DIR, "done.md")) == os.path.join(main.MARKDOWNS_DIR, "done.md")
+    assert storage.read_text(base + "legacy.txt") == "inline words"
+    with open(legacy) as f:
+        assert "transcription_text" not in json.load(f)
+    # A running job's files are left as they are
+    assert storage.stored_path(base + "running.txt") == base + "running.txt"
+    assert all(os.path.exists(path) for path in kept)
+    assert not any(os.path.exists(path) for path in stale)
@@ -0,0 +1,120 @@
+import os
+import io
+import wave
+import fcntl
+import asyncio
+import zipfile
+import pytest
+from fastapi.testclient import TestClient
+
+from job_queue import JobQueue
+from job_journal import JobJournal
+
+
+def noise_wav(seconds: float = 0.5) -> bytes:
+    """16 kHz mono 16-bit WAV of random samples: content no other test uploads."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(os.urandom(int(16000 * seconds) * 2))
+    return out.getvalue()
+
+
+@pytest.fixture
+def main(in_app_dir):
+    import main
+    return main
+
+
+@pytest.fixture
+def private_server(main, tmp_path, monkeypatch):
+    """
+    ingest_directory as the only server: its own queue and journal (main's are shared by the
+    whole session and never started), a stub whisper and no LLM pass. The server lock is
+    released afterwards.
+    """
+    monkeypatch.setattr(main, "job_queue", JobQueue(main.run_transcription_job, workers=2, spool_dir=str(tmp_path / "spool")))
+    journal = JobJournal(str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(main, "_journal", journal)
+    monkeypatch.setattr(main, "transcribe_with_whisper", lambda audio_path, name, threads=None: f"words of {name}")
+    monkeypatch.setattr(main, "polish_transcript", lambda *args: None)
+    yield main
+    journal.close()
+    if main._server_lock is not None:
+        main._server_lock.close()
+        main._server_lock = None
+
+
+def test_ingest_refuses_to_run_next_to_a_server(main, tmp_path):
+    # What a running server holds from its startup hook until it exits
+    with open(os.path.join(main.TRANSCRIPTIONS_DIR, ".server.lock"), "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        with pytest.raises(RuntimeError, match="upload-audio/batch"):
+            asyncio.run(main.ingest_directory(str(tmp_path)))
+    assert not main.job_queue._threads and not main.job_queue._restored
+
+
+def test_ingest_counts_archives_failures_and_skips_repeats(private_server, tmp_path):
+    main = private_server
+    source = tmp_path / "recordings"
+    (source / "day2").mkdir(parents=True)
+    (source / "a.wav").write_bytes(noise_wav())
+    (source / "day2" / "b.wav").write_bytes(noise_wav())
+    with zipfile.ZipFile(source / "pack.zip", "w") as z:
+        z.writestr("c.wav", noise_wav())
+        z.writestr("notes/d.wav", noise_wav())
+        z.writestr("readme.txt", "not audio")
+    (source / "broken.zip").write_bytes(b"not a zip")
+    # Unreadable: hashing it fails, which must not stop the other files
+    os.symlink(source / "missing.wav", source / "gone.wav")
+
+    summary = asyncio.run(main.ingest_directory(str(source), parallel=2))
+    assert {key: summary[key] for key in ("files", "submitted", "skipped", "failed", "transcribed")} == \
+        {"files": 6, "submitted": 4, "skipped": 0, "failed": 2, "transcribed": 4}
+    assert [name for name in os.listdir(main.UPLOAD_DIR) if name.startswith(".incoming-")] == []
+
+    # Everything readable is already transcribed: files are skipped before copying, archive members on upload
+    summary = asyncio.run(main.ingest_directory(str(source), parallel=2))
+    assert {key: summary[key] for key in ("files", "submitted", "skipped", "failed", "transcribed")} == \
+        {"files": 6, "submitted": 0, "skipped": 4, "failed": 2, "transcribed": 0}
+
+
+def zip_of(**members) -> bytes:
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+    return out.getvalue()
+
+
+def test_batch_upload_extracts_archives_and_reports_each_recording(private_server):
+    main = private_server
+    client = TestClient(main.app)
+    first = noise_wav()
+    files = [
+        ("files", ("a.wav", first)),
+        # Same audio under another name: attached to the job of whichever copy is claimed first
+        ("files", ("copy.wav", first)),
+        ("files", ("pack.zip", zip_of(**{"b.wav": noise_wav(), "notes/c.wav": noise_wav(), "readme.txt": "not audio"}))),
+        ("files", ("broken.zip", b"not a zip")),
+        ("files", ("notes.txt", b"not audio")),
+    ]
+    response = client.post("/upload-audio/batch", files=files)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert {key: body[key] for key in ("files", "accepted", "cached", "failed")} == {"files": 6, "accepted": 3, "cached": 1, "failed": 2}
+    results = {result["filename"]: result for result in body["results"]}
+    assert set(results) == {"a.wav", "copy.wav", "b.wav", "c.wav", "broken.zip", "notes.txt"}
+    # Either copy may claim the audio first
+    assert sorted(results[name].get("cached", False) for name in ("a.wav", "copy.wav")) == [False, True]
+    assert results["copy.wav"]["transcription_id"] == results["a.wav"]["transcription_id"]
+    assert (results["broken.zip"]["status_code"], results["notes.txt"]["status_code"]) == (400, 400)
+    assert sorted(main.job_queue.waiting_ids()) == sorted({result["transcription_id"] for result in body["results"] if "transcription_id" in result})
+    assert [name for name in os.listdir(main.UPLOAD_DIR) if name.startswith(".incoming-")] == []
+
+    # Uploading it again later is answered from the cache
+    body = client.post("/upload-audio/batch", files=[("files", ("again.wav", first))]).json()
+    assert {key: body[key] for key in ("files", "accepted", "cached", "failed")} == {"files": 1, "accepted": 0, "cached": 1, "failed": 0}
+    assert body["results"][0]["transcription_id"] == results["a.wav"]["transcription_id"]
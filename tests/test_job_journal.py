@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from job_journal import JobJournal
+from meta_store import atomic_write_json, update_meta
+
+
+def unfinished_ids(path):
+    journal = JobJournal(path)
+    try:
+        return {entry["id"] for entry in journal.unfinished()}
+    finally:
+        journal.close()
+
+
+def test_unfinished_jobs_survive_reopen_and_torn_lines(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = JobJournal(path)
+    journal.record("a", "queued", job={"id": "a"}, priority=2, attempts=1)
+    journal.record("a", "transcribed")
+    journal.record("b", "queued", job={"id": "b"}, attempts=1)
+    journal.record("b", "done")
+    journal.record("c", "converting", cache_key="k")
+    journal.close()
+    # A crash in the middle of an append leaves a partial last line
+    with open(path, "a") as f:
+        f.write('{"id": "c", "sta')
+    journal = JobJournal(path)
+    entries = {entry["id"]: entry for entry in journal.unfinished()}
+    assert set(entries) == {"a", "c"}
+    assert (entries["a"]["stage"], entries["a"]["job"], entries["a"]["priority"]) == ("transcribed", {"id": "a"}, 2)
+    assert journal.stage("c") == "converting" and journal.stage("b") is None
+    # Compaction rewrites the file with the unfinished jobs only
+    assert journal.compact()
+    with open(path) as f:
+        assert len(f.readlines()) == 2
+    journal.record("d", "converting")
+    assert unfinished_ids(path) == {"a", "c", "d"}
+
+
+def test_compaction_never_replaces_a_journal_open_elsewhere(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    server = JobJournal(path)
+    server.record("j1", "converting")
+    # e.g. `python main.py --compact` next to the running server
+    other = JobJournal(path)
+    assert not other.compact()
+    server.record("j2", "converting")
+    other.close()
+    assert unfinished_ids(path) == {"j1", "j2"}
+    server.record("j1", "done")
+    assert server.compact()
+    server.record("j3", "converting")
+    with open(path) as f:
+        assert [json.loads(line)["id"] for line in f] == ["j2", "j3"]
+
+
+def test_update_meta_merges_concurrent_changes(tmp_path):
+    path = str(tmp_path / "job.json")
+    atomic_write_json(path, {"count": 0})
+
+    def bump():
+        for _ in range(50):
+            update_meta(path, lambda meta: meta.update(count=meta["count"] + 1))
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with open(path) as f:
+        assert json.load(f) == {"count": 200}
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from job_queue import JobQueue, QueueFullError
+
+
+def test_queue_rejects_when_full_and_runs_in_priority_order(tmp_path):
+    gate = threading.Event()
+    ran = []
+    def handler(job):
+        gate.wait(5)
+        ran.append(job["id"])
+    q = JobQueue(handler, workers=1, max_size=2, spool_dir=str(tmp_path))
+    q.start()
+    q.submit({"id": "first"})
+    time.sleep(0.2)  # let the worker pick up the first job
+    q.submit({"id": "low"}, priority=5)
+    q.submit({"id": "high"}, priority=0)
+    try:
+        q.submit({"id": "overflow"})
+        assert False, "expected QueueFullError"
+    except QueueFullError as e:
+        assert e.retry_after >= 1
+    gate.set()
+    for _ in range(50):
+        if len(ran) == 3:
+            break
+        time.sleep(0.1)
+    assert ran == ["first", "high", "low"]
+    stats = q.stats()
+    assert stats["completed"] == 3 and stats["rejected"] == 1 and stats["depth"] == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_spooled_jobs_are_restored(tmp_path):
+    q = JobQueue(lambda job: None, workers=1, max_size=5, spool_dir=str(tmp_path))
+    q.submit({"id": "pending"})  # never started, so it stays spooled
+    assert len(os.listdir(tmp_path)) == 1
+    ran = []
+    restarted = JobQueue(lambda job: ran.append(job["id"]), workers=1, max_size=5, spool_dir=str(tmp_path))
+    restarted.start()
+    for _ in range(50):
+        if ran:
+            break
+        time.sleep(0.1)
+    assert ran == ["pending"]
+
+
+def test_restore_without_starting_and_discard(tmp_path):
+    q = JobQueue(lambda job: None, workers=1, max_size=5, spool_dir=str(tmp_path))
+    q.submit({"id": "keep"})
+    q.submit({"id": "drop"})
+    ran = []
+    restarted = JobQueue(lambda job: ran.append(job["id"]), workers=1, max_size=5, spool_dir=str(tmp_path))
+    restarted.restore()
+    time.sleep(0.2)
+    assert ran == [] and restarted.waiting_ids() == ["keep", "drop"]
+    assert restarted.discard("drop") == {"id": "drop"}
+    assert restarted.discard("missing") is None
+    assert len(os.listdir(tmp_path)) == 1
+    restarted.start()  # does not restore the spool a second time
+    for _ in range(50):
+        if ran:
+            break
+        time.sleep(0.1)
+    time.sleep(0.2)
+    assert ran == ["keep"] and os.listdir(tmp_path) == []
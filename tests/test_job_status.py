@@ -0,0 +1,64 @@
+import os
+import sys
+import asyncio
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from job_status import JobTracker
+
+
+def test_stages_progress_and_timings():
+    jobs = JobTracker()
+    jobs.update("a", stage="queued")
+    jobs.update("a", stage="transcribing")
+    jobs.update("a", progress=(1, 4))
+    snapshot = jobs.get("a")
+    assert (snapshot["stage"], snapshot["status"], snapshot["progress"]) == ("transcribing", "processing", {"done": 1, "total": 4})
+    assert set(snapshot["timings"]) == {"queued", "transcribing"}
+    jobs.finish("a", "success", markdown_file="a.md")
+    snapshot = jobs.get("a")
+    assert (snapshot["stage"], snapshot["status"], snapshot["markdown_file"]) == ("done", "success", "a.md")
+    assert "total" in snapshot["timings"]
+    # Already known jobs are left alone
+    jobs.track("a", "queued")
+    assert jobs.get("a")["stage"] == "done"
+
+
+def test_webhook_of_a_job_tracked_as_finished_is_sent_right_away():
+    jobs = JobTracker()
+    delivered = threading.Event()
+    sent = []
+    jobs._deliver = lambda urls, snapshot: (sent.append((urls, snapshot)), delivered.set())
+    assert not jobs.add_webhook("old", "http://example.invalid/hook")
+    jobs.track("old", "done", markdown_file="old.md")
+    assert jobs.add_webhook("old", "http://example.invalid/hook")
+    assert delivered.wait(5)
+    urls, snapshot = sent[0]
+    assert urls == ["http://example.invalid/hook"]
+    assert (snapshot["status"], snapshot["markdown_file"]) == ("success", "old.md")
+
+
+def test_long_poll_wakes_on_update_from_another_thread():
+    jobs = JobTracker()
+    jobs.update("a", stage="queued")
+    version = jobs.get("a")["version"]
+
+    async def wait():
+        timer = threading.Timer(0.05, jobs.update, args=("a",), kwargs={"stage": "transcribing"})
+        timer.start()
+        return await jobs.wait("a", version, timeout=5)
+
+    assert asyncio.run(wait())["stage"] == "transcribing"
+    # Nothing changes: returns the unchanged status after the timeout
+    latest = jobs.get("a")["version"]
+    assert asyncio.run(jobs.wait("a", latest, timeout=0.05))["version"] == latest
+    assert asyncio.run(jobs.wait("missing", -1, timeout=0.05)) is None
+
+
+def test_only_recent_finished_jobs_are_kept():
+    jobs = JobTracker(keep=2)
+    for name in "abc":
+        jobs.update(name, stage="queued")
+        jobs.finish(name, "success")
+    jobs.update("d", stage="queued")
+    assert [jobs.get(n) is not None for n in "abcd"] == [False, True, True, True]
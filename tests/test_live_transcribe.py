@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import array
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from live_transcribe import LIVE_RATE, LiveTranscriber, PassthroughDecoder
+from storage import read_text
+from subtitles import load_segments
+
+
+def tone(value: int, seconds: float = 1.0) -> bytes:
+    return array.array("h", [value] * int(LIVE_RATE * seconds)).tobytes()
+
+
+def fake_whisper(pcm: bytes):
+    """One line per run of equal samples, like words separated by pauses."""
+    samples = array.array("h")
+    samples.frombytes(pcm)
+    block = LIVE_RATE // 10
+    values = [samples[i] for i in range(0, len(samples), block)]
+    lines, start = [], 0
+    for i in range(1, len(values) + 1):
+        if i == len(values) or values[i] != values[start]:
+            if values[start]:
+                lines.append((start * 100, i * 100, f" word{values[start]}"))
+            start = i
+    return lines
+
+
+def test_sliding_window_commits_each_word_once():
+    live = LiveTranscriber(fake_whisper, step_sec=1.0, window_sec=4.0, guard_sec=0.5)
+    finals, partials = [], []
+    for value in range(1, 9):
+        live.feed(tone(value))
+        assert live.ready()
+        committed, partial = live.step()
+        finals += committed
+        partials.append(partial)
+    committed, partial = live.step(final=True)
+    finals += committed
+    assert partial is None
+    assert [text for _, _, text in finals] == [f" word{v}" for v in range(1, 9)]
+    # Timestamps are absolute, not relative to the window
+    assert finals[-1][:2] == (7000, 8000)
+    assert partials[-1][2] == " word8"
+    assert live.duration_sec() == 8.0
+
+
+def test_full_window_of_silence_is_dropped():
+    live = LiveTranscriber(fake_whisper, step_sec=1.0, window_sec=2.0)
+    for _ in range(3):
+        live.feed(tone(0))
+        live.step()
+    live.feed(tone(5))
+    assert live.step(final=True)[0] == [(3000, 4000, " word5")]
+
+
+def test_passthrough_decoder_keeps_whole_samples():
+    decoder = PassthroughDecoder()
+    assert decoder.feed(b"\x01\x02\x03") == b"\x01\x02"
+    assert decoder.feed(b"\x04") == b"\x03\x04"
+
+
+@pytest.fixture
+def live_server(in_app_dir, monkeypatch):
+    """main with a whisper server pool in name only: live windows go to fake_whisper."""
+    import main
+    monkeypatch.setattr(main, "whisper_pool", object())
+    monkeypatch.setattr(main, "transcribe_live_window", lambda session_name, pcm: fake_whisper(pcm))
+    monkeypatch.setattr(main, "polish_transcript", lambda *args: None)
+    monkeypatch.setitem(main.settings.data, "live", {"step_sec": 1.0, "window_sec": 4.0, "guard_sec": 0.5})
+    return main
+
+
+def test_websocket_session_streams_lines_and_is_saved(live_server):
+    main = live_server
+    messages = []
+    client = TestClient(main.app)
+    with client.websocket_connect("/ws/transcribe?format=pcm&filename=standup.wav", headers={"source": "ws-test"}) as ws:
+        for value in range(1, 5):
+            ws.send_bytes(tone(value))
+            # Each step ends on the word still being spoken, sent as a partial after any finals
+            while True:
+                messages.append(ws.receive_json())
+                if messages[-1]["type"] == "partial":
+                    break
+        ws.send_text(json.dumps({"type": "stop"}))
+        while messages[-1]["type"] != "done":
+            messages.append(ws.receive_json())
+
+    assert [m["text"] for m in messages if m["type"] == "partial"] == [f" word{v}" for v in range(1, 5)]
+    finals = [m for m in messages if m["type"] == "final"]
+    assert [m["text"] for m in finals] == [f" word{v}" for v in range(1, 5)]
+    assert (finals[-1]["start_ms"], finals[-1]["end_ms"]) == (3000, 4000)
+    transcription_id = messages[-1]["transcription_id"]
+    with open(os.path.join(main.TRANSCRIPTIONS_DIR, transcription_id + ".json")) as f:
+        meta = json.load(f)
+    assert (meta["status"], meta["source"], meta["original_filename"]) == ("success", "ws-test", "standup.wav")
+    assert meta["audio_length_sec"] == 4.0 and meta["file_size"] == os.path.getsize(meta["original_path"])
+    assert os.path.basename(meta["original_path"]) == meta["content_hash"] + ".wav"
+    base = os.path.join(main.TRANSCRIPTIONS_DIR, transcription_id)
+    assert read_text(base + ".txt") == "word1 word2 word3 word4\n"
+    assert load_segments(base + ".segments.json") == [(v * 1000 - 1000, v * 1000, f" word{v}") for v in range(1, 5)]
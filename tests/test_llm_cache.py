@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from llm_cache import LLMCache, result_key
+
+
+def test_key_covers_prompt_model_and_schema():
+    base = result_key("text", "prompt", "llama3", {"type": "object"})
+    assert base == result_key("text", "prompt", "llama3", {"type": "object"})
+    assert base != result_key("text", "other prompt", "llama3", {"type": "object"})
+    assert base != result_key("text", "prompt", "mistral", {"type": "object"})
+    assert base != result_key("text", "prompt", "llama3", {"type": "object", "required": ["title"]})
+
+
+def test_hits_misses_and_lru_eviction(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.db"), max_entries=2)
+    assert cache.get("a") is None
+    cache.put("a", {"markdown": "# A", "title": "A", "file_name": "a.md", "chunks": [1]})
+    cache.put("b", {"markdown": "# B", "title": "B", "file_name": "b.md"})
+    assert cache.get("a") == {"markdown": "# A", "title": "A", "file_name": "a.md"}
+    # "b" is now least recently used
+    cache.put("c", {"markdown": "# C", "title": "C", "file_name": "c.md"})
+    assert cache.get("b") is None
+    assert cache.get("c")["title"] == "C"
+    cache.bypass()
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["bypasses"], stats["evictions"]) == (2, 2, 2, 1, 1)
@@ -0,0 +1,57 @@
+import os
+import sys
+import wave
+import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from long_audio import plan_segments, stitch_segments, transcribe_long_audio
+
+
+def write_wav(path, seconds, rate=16000, quiet_at=()):
+    samples = array.array("h", [8000 if (i // 40) % 2 else -8000 for i in range(seconds * rate)])
+    for t in quiet_at:
+        for i in range(int(t * rate) - 800, int(t * rate) + 800):
+            samples[i] = 0
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+
+
+def test_plan_segments_cuts_at_silence_with_overlap(tmp_path):
+    path = str(tmp_path / "long.wav")
+    write_wav(path, 30, quiet_at=(10.5,))
+    bounds = plan_segments(path, segment_sec=10, overlap_sec=1, search_sec=1)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 30 * 16000
+    # First cut snaps to the quiet stretch around 10.5 s instead of the nominal 10 s
+    assert abs(bounds[1][0] - 10.5 * 16000) <= 800
+    for (_, prev_end), (start, _) in zip(bounds, bounds[1:]):
+        assert prev_end - start == 16000
+
+
+def test_stitch_drops_duplicated_overlap_lines():
+    rate = 1000
+    bounds = [(0, 11000), (10000, 20000)]
+    results = [
+        [(0, 5000, "a"), (5000, 9000, "b"), (9000, 11000, "c")],
+        # "c" again, seen from the second segment, then new text
+        [(0, 1000, "c"), (1000, 6000, "d")],
+    ]
+    assert stitch_segments(results, bounds, rate) == [
+        (0, 5000, "a"), (5000, 9000, "b"), (9000, 11000, "c"), (11000, 16000, "d"),
+    ]
+
+
+def test_transcribe_long_audio_reports_progress(tmp_path):
+    path = str(tmp_path / "long.wav")
+    write_wav(path, 25)
+    progress = []
+    lines = transcribe_long_audio(
+        path, "job", lambda seg_path, name: [(2000, 2500, name[-7:])],
+        segment_sec=10, overlap_sec=1, workers=3, on_progress=lambda d, t: progress.append((d, t)),
+    )
+    assert progress[0] == (0, 3) and progress[-1] == (3, 3)
+    assert [text for _, _, text in lines] == ["seg0000", "seg0001", "seg0002"]
+    assert [start for start, _, _ in lines] == sorted(start for start, _, _ in lines)
+    assert sorted(os.listdir(tmp_path)) == ["long.wav"]
@@ -0,0 +1,57 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from long_transcript import needs_chunking, polish_long_transcript, record_chunk_timings, split_transcript
+
+
+def test_split_on_sentence_boundaries_with_context():
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+    chunks = split_transcript(text, chunk_chars=200, overlap_chars=60)
+    assert len(chunks) > 1
+    assert all(len(c["text"]) <= 200 for c in chunks)
+    assert all(c["text"].endswith(".") for c in chunks)
+    # Every sentence is polished exactly once; context only repeats the end of the previous chunk
+    assert " ".join(c["text"] for c in chunks) == text
+    assert chunks[0]["context"] == ""
+    assert chunks[1]["context"] and chunks[0]["text"].endswith(chunks[1]["context"])
+
+
+def test_unpunctuated_text_is_cut_at_whitespace():
+    text = "word " * 100
+    chunks = split_transcript(text, chunk_chars=50, overlap_chars=0)
+    assert all(len(c["text"]) <= 50 for c in chunks)
+    assert " ".join(c["text"] for c in chunks).split() == text.split()
+
+
+class FakeClient:
+    chunking = {"chunk_chars": 100, "overlap_chars": 20, "workers": 3, "min_chars": 150}
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def polish_chunk(self, text, context=""):
+        with self.lock:
+            self.calls += 1
+        return f"## {text.split()[0]}\n{text}"
+
+    def title_markdown(self, markdown):
+        return {"title": "Merged", "file_name": "merged.md"}
+
+
+def test_polish_long_transcript_merges_in_order_and_times_chunks():
+    text = "\n\n".join(f"Part{i} says something useful about topic {i}." for i in range(10))
+    client = FakeClient()
+    assert needs_chunking(text, client.chunking)
+    assert not needs_chunking(text, dict(client.chunking, enabled=False))
+    result = polish_long_transcript(text, client)
+    assert client.calls == len(result["chunks"]) > 1
+    positions = [result["markdown"].index(f"Part{i} ") for i in range(10)]
+    assert positions == sorted(positions)
+    assert (result["title"], result["file_name"]) == ("Merged", "merged.md")
+    meta = {}
+    record_chunk_timings(meta, result)
+    assert [c["index"] for c in meta["markdown_chunks"]] == list(range(client.calls))
+    assert "chunks" not in result
@@ -0,0 +1,39 @@
+import os
+import sys
+import json
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from meta_store import atomic_write_json, merge_meta, update_meta, reserve_name, release_name
+
+
+def test_merge_keeps_fields_changed_by_another_writer(tmp_path):
+    path = str(tmp_path / "job.json")
+    seen = {"status": "processing", "markdown_file": None, "transcription_text": "hi", "stage_timings": {"ffmpeg": 1}}
+    atomic_write_json(path, seen)
+    # The web UI links a markdown while the worker is transcribing
+    update_meta(path, lambda meta: meta.update(markdown_file="notes.md", markdown_title="Notes"))
+    worker = json.loads(json.dumps(seen))
+    worker["status"] = "success"
+    worker["stage_timings"]["whisper"] = 2
+    del worker["transcription_text"]
+    merged = merge_meta(path, worker, seen)
+    with open(path) as f:
+        assert json.load(f) == merged
+    assert merged == {"status": "success", "markdown_file": "notes.md", "markdown_title": "Notes",
+                      "stage_timings": {"ffmpeg": 1, "whisper": 2}}
+
+
+def test_reserve_name_is_unique_under_concurrency(tmp_path):
+    directory = str(tmp_path)
+    (tmp_path / "Recording.json").write_text("{}")
+    candidates = lambda: ["Recording"] + [f"Recording-{n}" for n in range(2, 50)]
+    names = []
+    threads = [threading.Thread(target=lambda: names.append(reserve_name(directory, candidates()))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(names)) == 8 and "Recording" not in names
+    release_name(directory, names[0])
+    assert reserve_name(directory, candidates()) == names[0]
@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metadata_index import MetadataIndex
+
+
+def test_keyset_pages_and_filters(tmp_path):
+    for i in range(7):
+        meta = {"datetime": f"2025-01-0{i + 1}T10:00:00Z", "status": "success" if i % 2 else "error",
+                "source": "phone" if i < 4 else "web", "markdown_title": f"t{i}", "transcription_text": "x" * 1000}
+        (tmp_path / f"job{i}.json").write_text(json.dumps(meta))
+    (tmp_path / "job0.segments.json").write_text("[]")
+    index = MetadataIndex(str(tmp_path / "index.db"))
+    assert index.rebuild(str(tmp_path)) == 7
+
+    seen, after = [], None
+    while True:
+        rows = index.list_after(after, limit=3)
+        if not rows:
+            break
+        seen += [r["fname"] for r in rows]
+        after = (rows[-1]["datetime"], rows[-1]["fname"])
+    assert seen == [f"job{i}.json" for i in range(6, -1, -1)]
+
+    assert [r["fname"] for r in index.list_after(status="success", source="phone")] == ["job3.json", "job1.json"]
+    assert [r["fname"] for r in index.list_after(since="2025-01-06")] == ["job6.json", "job5.json"]
+    index.delete("job6.json")
+    assert index.list_after(limit=1)[0]["title"] == "t5"
+
+
+def test_full_text_search_updates_and_deletes(tmp_path):
+    index = MetadataIndex(str(tmp_path / "index.db"))
+    index.upsert("a.json", {"datetime": "2025-01-01T00:00:00Z"})
+    index.upsert("b.json", {"datetime": "2025-01-02T00:00:00Z"})
+    index.index_text("a.json", "", "we reviewed the <budget> draft")
+    index.index_text("b.json", "Roadmap", "nothing relevant", "# Budget plans")
+    assert sorted(r["fname"] for r in index.search("budg")) == ["a.json", "b.json"]
+    # FTS5 syntax in user input is matched literally instead of raising
+    assert index.search('"budget AND') == []
+    index.index_text("a.json", "Title", "replaced text")
+    assert [r["fname"] for r in index.search("budget")] == ["b.json"]
+    assert "\x02replaced\x03" in index.search("replaced")[0]["snippet"]
+    index.delete("b.json")
+    assert index.search("budget") == []
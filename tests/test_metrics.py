@@ -0,0 +1,68 @@
+import os
+import sys
+import re
+import time
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import Counter, Gauge, Histogram, Registry, record_stage, STAGE_SECONDS
+from log_sink import BufferedLogWriter, DroppingQueueHandler
+
+
+def test_prometheus_text_exposition():
+    registry = Registry()
+    hist = registry.register(Histogram("stage_seconds", "Stage time", ("stage",), buckets=(1, 5)))
+    count = registry.register(Counter("jobs_total", "Jobs", ("status",)))
+    registry.register(Gauge("queue_depth", "Waiting jobs", lambda: 3))
+    hist.observe(0.5, "ffmpeg")
+    hist.observe(2, "ffmpeg")
+    hist.observe(60, "ffmpeg")
+    count.inc("success")
+    count.inc("success")
+    lines = registry.render().splitlines()
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="ffmpeg",le="1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="ffmpeg",le="5"} 2' in lines
+    assert 'stage_seconds_bucket{stage="ffmpeg",le="+Inf"} 3' in lines
+    assert 'stage_seconds_count{stage="ffmpeg"} 3' in lines
+    assert 'jobs_total{status="success"} 2' in lines
+    assert "queue_depth 3" in lines
+
+
+def test_record_stage_accumulates_per_job():
+    before = STAGE_SECONDS.snapshot().get(("metadata_write",), {"count": 0})["count"]
+    timings = {}
+    record_stage(timings, "metadata_write", 0.25)
+    record_stage(timings, "metadata_write", 0.5)
+    record_stage(None, "metadata_write", 1.0)
+    assert timings == {"metadata_write": 0.75}
+    assert STAGE_SECONDS.snapshot()[("metadata_write",)]["count"] == before + 3
+
+
+def test_buffered_log_writer_flushes_in_background(tmp_path):
+    path = str(tmp_path / "server.log")
+    writer = BufferedLogWriter(path, flush_interval=0.05)
+    logger = logging.getLogger("test_log_sink")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(DroppingQueueHandler(writer.queue))
+    logger.info("hello %s", "world")
+    deadline = time.time() + 2
+    while time.time() < deadline and "hello world" not in open(path).read():
+        time.sleep(0.02)
+    assert "INFO hello world" in open(path).read()
+    writer.stop()
+
+
+def test_log_writers_sharing_a_file_only_append_whole_lines(tmp_path):
+    # As the API server and the web UI do, with buffers too small for a batch of lines
+    path = str(tmp_path / "server.log")
+    writers = [BufferedLogWriter(path, flush_interval=0.01, buffer_size=100) for _ in range(2)]
+    for n, writer in enumerate(writers):
+        for i in range(200):
+            writer.queue.put(logging.LogRecord("test", logging.INFO, __file__, 0, f"writer{n} line{i:03d} " + "x" * 40, None, None))
+    for writer in writers:
+        writer.stop()
+    lines = open(path).read().splitlines()
+    assert len(lines) == 400
+    assert all(re.fullmatch(r"\S+ \S+ INFO writer[01] line\d{3} x{40}", line) for line in lines)
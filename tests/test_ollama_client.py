@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ollama_client import OllamaClient, AsyncOllamaClient, observe_latency, latency_stats, parse_partial_result
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """/api/chat that fails the first `failures` requests with 503 and answers the rest after `delay`."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.failures > 0
+            server.failures -= fail
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        time.sleep(0 if fail else server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        body = b"" if fail else json.dumps({"message": {"content": '{"markdown": "# ok"}'}}).encode()
+        self.send_response(503 if fail else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fake_ollama(tmp_path, failures=0, delay=0.0, **ollama):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    server.lock = threading.Lock()
+    server.requests = server.in_flight = server.peak = 0
+    server.failures, server.delay = failures, delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config = dict({"host": "http://127.0.0.1", "port": server.server_address[1], "model": "test-model", "backoff": 0}, **ollama)
+    path = tmp_path / "config.yaml"
+    path.write_text(json.dumps({"ollama": config}))
+    return server, OllamaClient(str(path))
+
+
+def test_latency_histogram_buckets_and_errors():
+    observe_latency("test-model", 0.2)
+    observe_latency("test-model", 3)
+    observe_latency("test-model", 1000, ok=False)
+    stats = latency_stats()["test-model"]
+    assert (stats["count"], stats["errors"]) == (3, 1)
+    assert stats["buckets"]["le_0.5"] == 1
+    assert stats["buckets"]["le_5"] == 1
+    assert stats["buckets"]["le_inf"] == 1
+
+
+def test_parse_partial_result_recovers_truncated_json():
+    result = parse_partial_result('{"title": "Notes", "markdown": "# Hello\\nwor')
+    assert result["title"] == "Notes"
+    assert result["markdown"].startswith("# Hello\nwor")
+
+
+def test_5xx_responses_are_retried(tmp_path):
+    server, client = fake_ollama(tmp_path, failures=2, retries=3)
+    assert client.generate_markdown("hello") == '{"markdown": "# ok"}'
+    assert server.requests == 3
+    server.shutdown()
+
+
+def test_gives_up_after_the_configured_retries(tmp_path):
+    server, client = fake_ollama(tmp_path, failures=10, retries=1)
+    assert client.generate_markdown("hello").startswith("Error:")
+    assert server.requests == 2
+    server.shutdown()
+
+
+def test_concurrent_generations_are_capped_at_max_in_flight(tmp_path):
+    server, client = fake_ollama(tmp_path, delay=0.2, max_in_flight=2)
+    threads = [threading.Thread(target=client.generate_markdown, args=("hello",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert server.requests == 6 and server.peak == 2
+    server.shutdown()
+
+
+def test_sync_and_async_generations_share_one_cap(tmp_path):
+    server, client = fake_ollama(tmp_path, delay=0.2, max_in_flight=2)
+    async_client = AsyncOllamaClient(str(tmp_path / "config.yaml"))
+
+    async def polish_concurrently():
+        try:
+            await asyncio.gather(*(async_client.generate_markdown("hello") for _ in range(3)))
+        finally:
+            await async_client.aclose()
+
+    threads = [threading.Thread(target=client.generate_markdown, args=("hello",)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    asyncio.run(polish_concurrently())
+    for t in threads:
+        t.join()
+    assert server.requests == 6 and server.peak == 2
+    server.shutdown()
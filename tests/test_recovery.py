@@ -0,0 +1,98 @@
+import os
+import json
+import pytest
+
+from job_queue import JobQueue
+from job_journal import JobJournal
+
+
+class RecordingCache:
+    """Stands in for the upload dedup cache; records which claims recovery released or closed."""
+
+    def __init__(self):
+        self.forgotten, self.done = [], []
+
+    def forget(self, key):
+        self.forgotten.append(key)
+
+    def mark_done(self, key, status):
+        self.done.append((key, status))
+
+
+@pytest.fixture
+def restarted(in_app_dir, tmp_path, monkeypatch):
+    """main as at startup: an unstarted queue restored from a spool, and a journal left by the last run."""
+    import main
+    monkeypatch.setattr(main, "job_queue", JobQueue(main.run_transcription_job, spool_dir=str(tmp_path / "spool")))
+    journal = JobJournal(str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(main, "_journal", journal)
+    monkeypatch.setattr(main, "upload_cache", RecordingCache())
+    monkeypatch.setitem(main.settings.data, "jobs", {"max_attempts": 3})
+    yield main
+    journal.close()
+
+
+def make_job(main, job_id):
+    json_path = os.path.join(main.TRANSCRIPTIONS_DIR, job_id + ".json")
+    with open(json_path, "w") as f:
+        json.dump({"status": "processing", "source": "recovery-test"}, f)
+    return {"id": job_id, "json_path": json_path, "cache_key": "key-" + job_id}
+
+
+def read_meta(job):
+    with open(job["json_path"]) as f:
+        return json.load(f)
+
+
+def test_recovery_requeues_drops_and_gives_up(restarted, tmp_path):
+    main = restarted
+    journal = main.get_journal()
+    wav = tmp_path / "rec-converting.16k.wav"
+    wav.write_bytes(b"RIFF")
+    journal.record("rec-converting", "converting", cache_key="key-converting", wav_path=str(wav))
+    queued = make_job(main, "rec-queued")
+    journal.record("rec-queued", "queued", job=queued, priority=2, attempts=1)
+    running = make_job(main, "rec-running")
+    journal.record("rec-running", "queued", job=running, priority=0, attempts=1)
+    journal.record("rec-running", "transcribed")
+    exhausted = make_job(main, "rec-exhausted")
+    journal.record("rec-exhausted", "queued", job=exhausted, priority=0, attempts=3)
+    journal.record("rec-orphan", "queued", job={"id": "rec-orphan", "json_path": "missing.json"}, attempts=1)
+    journal.record("rec-finished", "queued", job=make_job(main, "rec-finished"), attempts=1)
+    journal.record("rec-finished", "done")
+
+    main.recover_unfinished_jobs()
+
+    # Queued and part-way jobs run again, each restart counted as an attempt
+    assert sorted(main.job_queue.waiting_ids()) == ["rec-queued", "rec-running"]
+    entries = {entry["id"]: entry for entry in journal.unfinished()}
+    assert set(entries) == {"rec-queued", "rec-running"}
+    assert (entries["rec-queued"]["stage"], entries["rec-queued"]["attempts"]) == ("queued", 2)
+    assert (entries["rec-running"]["stage"], entries["rec-running"]["attempts"]) == ("transcribed", 2)
+    # An interrupted conversion is dropped with its WAV, and its dedup claim released
+    assert not wav.exists()
+    assert main.upload_cache.forgotten == ["key-converting"]
+    # A job out of attempts ends as an error instead of running again
+    meta = read_meta(exhausted)
+    assert meta["status"] == "error" and meta["error"] == "(Gave up after 3 attempts)"
+    assert main.upload_cache.done == [("key-rec-exhausted", "error")]
+    assert read_meta(queued)["status"] == "processing"
+
+
+def test_recovery_of_spooled_jobs_counts_attempts_without_resubmitting(restarted):
+    main = restarted
+    journal = main.get_journal()
+    spooled = make_job(main, "rec-spooled")
+    stuck = make_job(main, "rec-stuck")
+    for job, attempts in ((spooled, 1), (stuck, 3)):
+        # What restore() brings back from the spool of the last run
+        main.job_queue.submit(job)
+        journal.record(job["id"], "queued", job=job, attempts=attempts)
+
+    main.recover_unfinished_jobs()
+
+    assert main.job_queue.waiting_ids() == ["rec-spooled"]
+    assert [(entry["id"], entry["attempts"]) for entry in journal.unfinished()] == [("rec-spooled", 2)]
+    # A job that crashed the worker on every run is taken out of the spool for good
+    assert read_meta(stuck)["status"] == "error"
+    assert [name.split("-", 1)[1] for name in os.listdir(main.job_queue.spool_dir)] == ["rec-spooled.json"]
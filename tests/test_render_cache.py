@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from render_cache import RenderCache, not_modified, validator_headers
+
+
+def test_entries_follow_their_files(tmp_path):
+    meta = tmp_path / "a.json"
+    md = tmp_path / "a.md"
+    meta.write_text("{}")
+    cache = RenderCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f"<p>{len(renders)}</p>", [str(meta), str(md)]
+
+    first = cache.get_or_render("a", render)
+    assert cache.get_or_render("a", render) is first
+    # A file appearing (the markdown being generated) or changing invalidates the entry
+    md.write_text("# Title")
+    second = cache.get_or_render("a", render)
+    assert (second["html"], len(renders)) == ("<p>2</p>", 2)
+    assert second["etag"] != first["etag"]
+    os.utime(meta, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert cache.get_or_render("a", render)["html"] == "<p>3</p>"
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction_by_count_and_size():
+    cache = RenderCache(max_entries=2, max_bytes=10)
+    cache.put("a", [], "12345")
+    cache.put("b", [], "12345")
+    cache.get("a")
+    cache.put("c", [], "1")
+    assert cache.get("b") is None and cache.get("a") is not None
+    cache.put("d", [], "123456789")
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_conditional_request_validators(tmp_path):
+    path = tmp_path / "a.json"
+    path.write_text("{}")
+    entry = RenderCache().put("a", [str(path)], "<p></p>")
+    headers = validator_headers(entry)
+    assert not_modified({"if-none-match": headers["ETag"]}, entry)
+    assert not not_modified({"if-none-match": '"other"'}, entry)
+    assert not_modified({"if-modified-since": headers["Last-Modified"]}, entry)
+    assert not not_modified({"if-modified-since": "Thu, 01 Jan 1970 00:00:00 GMT"}, entry)
+    assert not not_modified({}, entry)
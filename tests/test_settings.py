@@ -0,0 +1,67 @@
+import os
+import sys
+import itertools
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from settings import Settings, validate
+
+
+BUMPS = itertools.count(1)
+
+
+def write(path, text):
+    path.write_text(text)
+    # Move the mtime forward so every write is a change whatever the filesystem's mtime resolution
+    stamp = os.stat(path).st_mtime_ns + next(BUMPS) * 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_parsed_once_until_the_file_changes(tmp_path):
+    path = tmp_path / "config.yaml"
+    write(path, "ollama:\n  model: a\n")
+    settings = Settings(str(path), check_interval=0)
+    data = settings.data
+    assert settings.section("ollama") == {"model": "a"}
+    assert settings.data is data and settings.version == 1
+    seen = []
+    settings.on_change(lambda s: seen.append(s.section("ollama")["model"]))
+    write(path, "ollama:\n  model: b\n")
+    assert settings.section("ollama") == {"model": "b"}
+    assert settings.version == 2 and seen == ["b"]
+
+
+def test_changes_are_checked_at_most_every_interval(tmp_path):
+    path = tmp_path / "config.yaml"
+    write(path, "upload_dir: a\n")
+    settings = Settings(str(path), check_interval=3600)
+    write(path, "upload_dir: b\n")
+    assert settings.get("upload_dir") == "a"
+    assert settings.reload()
+    assert settings.get("upload_dir") == "b"
+
+
+def test_invalid_reload_keeps_the_loaded_settings(tmp_path):
+    path = tmp_path / "config.yaml"
+    write(path, "queue:\n  workers: 2\n")
+    settings = Settings(str(path), check_interval=0)
+    write(path, "queue:\n  workers: many\n")
+    assert settings.section("queue") == {"workers": 2}
+    write(path, "queue: [unclosed\n")
+    assert settings.section("queue") == {"workers": 2} and settings.version == 1
+
+
+def test_first_load_of_an_invalid_file_raises(tmp_path):
+    path = tmp_path / "config.yaml"
+    write(path, "backend_server:\n  port: '8000'\n")
+    with pytest.raises(ValueError, match="backend_server.port must be int"):
+        Settings(str(path))
+
+
+def test_validate_types():
+    assert validate(None) == {}
+    assert validate({"ollama": {"timeout": 2.5, "port": None}, "unknown": [1]})
+    with pytest.raises(ValueError, match="vad must be dict"):
+        validate({"vad": "on"})
+    with pytest.raises(ValueError, match="ingest.parallel must be int, not bool"):
+        validate({"ingest": {"parallel": True}})
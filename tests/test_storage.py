@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
+from storage import read_text, recompress, remove_stale, shard_path, stored_path, transcript_text, write_text
+
+
+def test_compressed_round_trip_replaces_other_forms(tmp_path):
+    path = str(tmp_path / "a.txt")
+    write_text(path, "plain", compression="none")
+    assert stored_path(path) == path
+    written = write_text(path, "héllo " * 100, compression="gzip")
+    assert written == path + ".gz" and not os.path.exists(path)
+    assert os.path.getsize(written) < 100
+    assert read_text(path) == "héllo " * 100
+    assert recompress(path, "none") and stored_path(path) == path
+    assert not recompress(path, "none")
+    storage.remove_text(path)
+    assert stored_path(path) is None
+
+
+def test_zstd_falls_back_to_gzip_without_the_package(monkeypatch):
+    monkeypatch.setattr(storage, "zstandard", None)
+    try:
+        assert storage.configure("zstd") == "gzip"
+    finally:
+        storage.configure("none")
+
+
+def test_shard_path(tmp_path):
+    path = shard_path(str(tmp_path), "abcdef.m4a")
+    assert path == str(tmp_path / "ab" / "cd" / "abcdef.m4a")
+    assert os.path.isdir(os.path.dirname(path))
+
+
+def test_transcript_text_prefers_inline_legacy_text(tmp_path):
+    json_path = str(tmp_path / "job.json")
+    assert transcript_text(json_path, {}) == ""
+    write_text(str(tmp_path / "job.txt"), "from file", compression="gzip")
+    assert transcript_text(json_path, {}) == "from file"
+    assert transcript_text(json_path, {"transcription_text": "inline"}) == "inline"
+
+
+def test_remove_stale_only_removes_old_matching_files(tmp_path):
+    old = time.time() - 3600
+    for name in ("a.tmp", "b.tmp", "keep.json"):
+        (tmp_path / name).write_text(json.dumps({}))
+    os.utime(tmp_path / "a.tmp", (old, old))
+    os.utime(tmp_path / "keep.json", (old, old))
+    assert remove_stale(str(tmp_path), lambda name: name.endswith(".tmp"), 60) == 1
+    assert sorted(os.listdir(tmp_path)) == ["b.tmp", "keep.json"]
@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from subtitles import (load_segments, read_transcript, render_transcript, save_segments, segment_at,
+                       segments_from_verbose_json, segments_from_whisper_json)
+
+SEGMENTS = [(0, 1500, " Hello there."), (1500, 3723, " General Kenobi."), (5000, 3661001, " Much later.")]
+
+
+def test_srt_and_vtt_rendering():
+    srt = render_transcript(SEGMENTS, "srt")
+    assert srt.startswith("1\n00:00:00,000 --> 00:00:01,500\nHello there.\n\n2\n")
+    assert "3\n00:00:05,000 --> 01:01:01,001\nMuch later.\n" in srt
+    vtt = render_transcript(SEGMENTS, "vtt")
+    assert vtt.startswith("WEBVTT\n\n00:00:00.000 --> 00:00:01.500\nHello there.\n")
+    assert json.loads(render_transcript(SEGMENTS, "json"))[1] == {"start": 1.5, "end": 3.723, "text": " General Kenobi."}
+
+
+def test_whisper_outputs_map_to_the_same_segments():
+    cli = {"transcription": [{"offsets": {"from": 0, "to": 1500}, "text": " Hello there."}]}
+    server = {"segments": [{"start": 0.0, "end": 1.5, "text": " Hello there."}]}
+    assert segments_from_whisper_json(cli) == segments_from_verbose_json(server) == [SEGMENTS[0]]
+
+
+def test_segment_at_for_seeking():
+    assert [segment_at(SEGMENTS, ms) for ms in (0, 1499, 1500, 4000, 9999999)] == [0, 0, 1, 2, 2]
+    assert segment_at([], 100) == 0
+
+
+def test_segments_round_trip_and_read_transcript(tmp_path):
+    base = str(tmp_path / "talk")
+    assert read_transcript(base, "srt") is None
+    save_segments(base + ".segments.json", SEGMENTS)
+    assert load_segments(base + ".segments.json") == SEGMENTS
+    assert read_transcript(base, "txt") == "Hello there.\nGeneral Kenobi.\nMuch later.\n"
+    with open(base + ".txt", "w") as f:
+        f.write(" whisper text\n")
+    assert read_transcript(base, "txt") == " whisper text\n"
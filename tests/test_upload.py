@@ -0,0 +1,128 @@
+import os
+import io
+import json
+import wave
+import asyncio
+import hashlib
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+
+def whisper_wav(seconds: float, value: int = 1) -> bytes:
+    """16 kHz mono 16-bit WAV: already in whisper.cpp's format, so no ffmpeg run is needed."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(value.to_bytes(2, "little", signed=True) * int(16000 * seconds))
+    return out.getvalue()
+
+
+def incoming_files():
+    return [name for name in os.listdir("uploads") if name.startswith(".incoming-")]
+
+
+async def aiter_of(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.fixture
+def main(in_app_dir):
+    import main
+    return main
+
+
+def test_stream_upload_is_hashed_and_archived(main):
+    audio = whisper_wav(1.0, value=7)
+    response = TestClient(main.app).post("/upload-audio/stream?filename=meeting.wav", content=audio)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["status"] == "processing"
+    with open(os.path.join("transcriptions", body["transcription_id"] + ".json")) as f:
+        meta = json.load(f)
+    content_hash = hashlib.sha256(audio).hexdigest()
+    assert meta["content_hash"] == content_hash
+    assert meta["file_size"] == len(audio) and meta["audio_length_sec"] == 1.0
+    assert meta["process_peak_rss_mb"] == body["process_peak_rss_mb"] > 0
+    assert meta["original_path"] == main.original_upload_path(content_hash + ".wav")
+    with open(meta["original_path"], "rb") as f:
+        assert f.read() == audio
+    assert incoming_files() == []
+
+
+def test_stream_upload_over_the_limit_is_rejected_and_removed(main, monkeypatch):
+    monkeypatch.setitem(main.settings.data, "max_upload_bytes", 10_000)
+    monkeypatch.setattr(main, "UPLOAD_CHUNK_SIZE", 4096)
+    client = TestClient(main.app)
+    response = client.post("/upload-audio/stream?filename=big.wav", content=whisper_wav(1.0, value=8))
+    assert response.status_code == 413
+    assert incoming_files() == []
+    response = client.post("/upload-audio/stream?filename=small.wav", content=whisper_wav(0.2, value=8))
+    assert response.status_code == 200, response.text
+
+
+def test_interrupted_upload_leaves_no_partial_file(main, tmp_path):
+    async def disconnecting():
+        yield b"x" * 1000
+        raise ConnectionResetError("client went away")
+
+    dest = tmp_path / ".incoming-test"
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(main.save_upload_streaming(disconnecting(), str(dest), max_bytes=0))
+    assert not dest.exists()
+    size, digest = asyncio.run(main.save_upload_streaming(aiter_of([b"ab", b"cd"]), str(dest), max_bytes=0))
+    assert (size, digest) == (4, hashlib.sha256(b"abcd").hexdigest())
+    assert dest.read_bytes() == b"abcd"
+
+
+def test_cached_upload_still_calls_its_webhook(main, monkeypatch):
+    audio = whisper_wav(0.5, value=9)
+    client = TestClient(main.app)
+    job_id = client.post("/upload-audio/stream?filename=hook.wav", content=audio).json()["transcription_id"]
+    # As after a restart: the job finished and this process's tracker no longer knows it
+    json_path = os.path.join("transcriptions", job_id + ".json")
+    main.update_meta(json_path, lambda meta: meta.update(status="success", markdown_file="hook.md"))
+    main.jobs.forget(job_id)
+    sent = []
+    monkeypatch.setattr(main.jobs, "_deliver", lambda urls, snapshot: sent.append((urls, snapshot)))
+    response = client.post("/upload-audio/stream?filename=hook.wav&callback_url=http://example.invalid/hook", content=audio)
+    assert response.json()["cached"] is True and response.json()["transcription_id"] == job_id
+    for _ in range(50):
+        if sent:
+            break
+        time.sleep(0.05)
+    urls, snapshot = sent[0]
+    assert urls == ["http://example.invalid/hook"]
+    assert (snapshot["id"], snapshot["status"], snapshot["markdown_file"]) == (job_id, "success", "hook.md")
+
+
+def test_jobs_of_the_same_content_do_not_delete_each_others_audio(main, monkeypatch):
+    # Without the dedup cache (or with other whisper arguments) the same audio is transcribed twice
+    monkeypatch.setattr(main, "upload_cache", None)
+    audio = whisper_wav(0.5, value=11)
+    client = TestClient(main.app)
+    first, second = (client.post(f"/upload-audio/stream?filename={name}", content=audio).json()["transcription_id"] for name in ("twice.wav", "again.wav"))
+    assert first != second
+    entries = {entry["id"]: entry for entry in main.get_journal().unfinished()}
+    assert entries[first]["wav_path"] != entries[second]["wav_path"]
+    metas = []
+    for job_id in (first, second):
+        with open(os.path.join("transcriptions", job_id + ".json")) as f:
+            metas.append(json.load(f))
+    original = metas[0]["original_path"]
+    assert metas[1]["original_path"] == original and os.path.exists(original)
+    # The first job finishes under delete_after_transcription: the second still needs the file
+    main.get_journal().record(first, "done")
+    main.release_original(metas[0], job_id=first)
+    assert metas[0]["original_path"] is None and os.path.exists(original)
+    main.get_journal().record(second, "done")
+    main.release_original(metas[1], job_id=second)
+    assert not os.path.exists(original)
+
+
+def test_convert_audio_returns_a_ready_wav_unchanged(main):
+    audio = whisper_wav(0.25, value=12)
+    assert main.convert_audio(audio, "wav") == audio
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from upload_cache import UploadCache, cache_key
+
+
+def test_claim_hit_miss_and_failed_jobs_are_forgotten(tmp_path):
+    cache = UploadCache(str(tmp_path / "cache.db"))
+    key = cache_key("abc", "model.bin", "-l auto")
+    assert key != cache_key("abc", "other.bin", "-l auto")
+    assert cache.claim(key, "abc", "job", "orig.wav", 10) is None
+    assert cache.claim(key, "abc", "job2", "orig.wav", 10)["transcription_id"] == "job"
+    cache.mark_done(key, "error")
+    assert cache.claim(key, "abc", "job3", "orig.wav", 10) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+def test_evict_originals_by_size_least_recently_used_first(tmp_path):
+    cache = UploadCache(str(tmp_path / "cache.db"))
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.wav"
+        path.write_bytes(b"x" * 100)
+        paths.append(path)
+        key = cache_key(str(i), "m", "")
+        cache.claim(key, str(i), f"job{i}", str(path), 100)
+        cache.mark_done(key, "success")
+        time.sleep(0.01)
+    # Touch the oldest entry so the middle one becomes least recently used
+    cache.claim(cache_key("0", "m", ""), "0", "job0", str(paths[0]), 100)
+    assert cache.evict_originals(max_bytes=200) == 1
+    assert [p.exists() for p in paths] == [True, False, True]
+    assert cache.stats()["archived_bytes"] == 200
+    # The transcription stays cached after its original is evicted
+    assert cache.claim(cache_key("1", "m", ""), "1", "again", str(paths[1]), 100)["transcription_id"] == "job1"
+
+
+def test_evict_keeps_an_original_shared_with_an_unfinished_key(tmp_path):
+    cache = UploadCache(str(tmp_path / "cache.db"))
+    path = tmp_path / "shared.wav"
+    path.write_bytes(b"x" * 100)
+    done, running = cache_key("h", "m", ""), cache_key("h", "m", "-l de")
+    cache.claim(done, "h", "job", str(path), 100)
+    cache.mark_done(done, "success")
+    cache.claim(running, "h", "job-de", str(path), 100)
+    assert cache.stats()["archived_bytes"] == 100
+    assert cache.evict_originals(max_bytes=1) == 0 and path.exists()
+    cache.mark_done(running, "success")
+    assert cache.evict_originals(max_bytes=1) == 1 and not path.exists()
+    assert cache.lookup(done)["original_path"] is None and cache.lookup(running)["original_path"] is None
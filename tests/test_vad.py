@@ -0,0 +1,81 @@
+import os
+import sys
+import math
+import wave
+import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import vad
+from vad import detect_speech, remap_segments, to_original_ms, trim_silence
+
+RATE = 16000
+
+
+def write_wav(path, pattern):
+    """pattern: list of (seconds, amplitude); a 440 Hz tone, or near-silence for amplitude 0."""
+    samples = array.array("h")
+    for seconds, amplitude in pattern:
+        for i in range(int(seconds * RATE)):
+            samples.append(int(amplitude * math.sin(2 * math.pi * 440 * i / RATE)) if amplitude else (i % 3) - 1)
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(samples.tobytes())
+
+
+def test_detects_speech_regions_with_padding(tmp_path):
+    wav = tmp_path / "call.wav"
+    write_wav(wav, [(2, 0), (1, 8000), (0.5, 0), (1, 8000), (6, 0), (1, 8000), (2, 0)])
+    regions, total, rate = detect_speech(str(wav), pad_sec=0.25)
+    assert total == 13.5 * RATE and rate == RATE
+    # The half-second pause is kept inside the first region; the six-second gap splits them
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert abs(s1 - 1.75 * RATE) < 0.05 * RATE and abs(e1 - 4.75 * RATE) < 0.05 * RATE
+    assert abs(s2 - 10.25 * RATE) < 0.05 * RATE and abs(e2 - 11.75 * RATE) < 0.05 * RATE
+
+
+def test_continuous_speech_of_varying_loudness_is_kept(tmp_path):
+    # No pause anywhere: the quietest 10% of frames is soft speech (about -36 dBFS), not noise
+    wav = tmp_path / "lecture.wav"
+    write_wav(wav, [(2, 8000), (2, 1200), (2, 5000), (2, 700), (2, 3000), (2, 900)])
+    regions, total, rate = detect_speech(str(wav))
+    assert regions == [(0, total)]
+    assert trim_silence(str(wav), str(tmp_path / "lecture.speech.wav")) is None
+    # Without the cap the percentile floor cuts the soft passages out as silence
+    regions, _, _ = detect_speech(str(wav), max_floor_db=0.0)
+    assert sum(end - start for start, end in regions) < total * 0.8
+
+
+def test_pure_python_energies_match(tmp_path, monkeypatch):
+    wav = tmp_path / "call.wav"
+    write_wav(wav, [(1, 0), (1, 3000), (3, 0), (1, 3000)])
+    expected = detect_speech(str(wav))
+    monkeypatch.setattr(vad, "np", None)
+    assert detect_speech(str(wav)) == expected
+
+
+def test_trim_silence_writes_speech_only(tmp_path):
+    wav = tmp_path / "call.wav"
+    write_wav(wav, [(4, 0), (1, 8000), (8, 0), (1, 8000), (4, 0)])
+    out = tmp_path / "call.speech.wav"
+    summary = trim_silence(str(wav), str(out), pad_sec=0.25)
+    assert summary["audio_sec"] == 18.0
+    assert abs(summary["speech_sec"] - 3.0) < 0.1
+    assert abs(summary["removed_sec"] - 15.0) < 0.1 and summary["expected_speedup"] > 5
+    with wave.open(str(out), "rb") as wf:
+        assert abs(wf.getnframes() / RATE - summary["speech_sec"]) < 0.01
+    # Mostly speech: not worth trimming
+    write_wav(wav, [(1, 0), (10, 8000), (1, 0)])
+    assert trim_silence(str(wav), str(out)) is None
+
+
+def test_timestamps_map_back_to_the_original():
+    regions = [(RATE * 2, RATE * 4), (RATE * 10, RATE * 11)]
+    assert to_original_ms(0, regions, RATE) == 2000
+    assert to_original_ms(1500, regions, RATE) == 3500
+    # The join between the regions: a start belongs to the second, an end to the first
+    assert to_original_ms(2000, regions, RATE) == 10000
+    assert to_original_ms(2000, regions, RATE, end=True) == 4000
+    assert remap_segments([(0, 2000, " a"), (2100, 3000, " b")], regions, RATE) == [(2000, 4000, " a"), (10100, 11000, " b")]
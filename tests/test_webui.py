@@ -0,0 +1,115 @@
+import os
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+import storage
+from ollama_client import AsyncOllamaClient
+
+RESULT = '{"title": "Notes", "markdown": "# Hello\\n\\nworld"}'
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def add_transcription(name, text):
+    with open(os.path.join("transcriptions", name + ".json"), "w") as f:
+        json.dump({"status": "success", "source": "test", "datetime": "2024-01-01T00:00:00Z"}, f)
+    storage.write_text(os.path.join("transcriptions", name + ".txt"), text)
+    return name + ".json"
+
+
+def stub_stream(monkeypatch, pieces, error=None):
+    async def stream_markdown(self, transcript_text, timeout=None):
+        for piece in pieces:
+            yield piece
+        if error is not None:
+            raise error
+    monkeypatch.setattr(AsyncOllamaClient, "stream_markdown", stream_markdown)
+
+
+@pytest.fixture
+def webui(in_app_dir):
+    import webui
+    return webui
+
+
+def test_generate_md_stream_sends_tokens_then_done_and_saves(webui, monkeypatch):
+    fname = add_transcription("stream-done", "hello world, streamed")
+    pieces = [RESULT[:10], RESULT[10:30], RESULT[30:]]
+    stub_stream(monkeypatch, pieces)
+    client = TestClient(webui.app)
+    events = parse_events(client.get(f"/generate_md_stream/{fname}?refresh=true").text)
+    assert [e for e, _ in events] == ["first_token", "token", "token", "token", "done"]
+    assert [data for e, data in events if e == "token"] == pieces
+    assert events[-1][1]["markdown_file"] == "stream-done.md"
+    assert storage.read_text(os.path.join("markdowns", "stream-done.md")) == "# Hello\n\nworld"
+    with open(os.path.join("transcriptions", fname)) as f:
+        meta = json.load(f)
+    assert meta["markdown_file"] == "stream-done.md" and meta["markdown_title"] == "Notes"
+    assert not os.path.exists(os.path.join("markdowns", "stream-done.partial.md"))
+
+    # The result was cached: the same transcript is answered without generating again
+    stub_stream(monkeypatch, [], error=AssertionError("not cached"))
+    events = parse_events(client.get(f"/generate_md_stream/{fname}").text)
+    assert events == [("done", {"markdown_file": "stream-done.md", "first_token_ms": None, "cached": True})]
+
+
+def test_generate_md_stream_saves_what_it_got_when_interrupted(webui, monkeypatch):
+    fname = add_transcription("stream-cut", "hello world, cut short")
+    stub_stream(monkeypatch, ['{"title": "Cut", "markdown": "# Half', " of it"], error=ConnectionError("peer closed"))
+    events = parse_events(TestClient(webui.app).get(f"/generate_md_stream/{fname}?refresh=true").text)
+    assert [e for e, _ in events] == ["first_token", "token", "token", "partial"]
+    assert events[-1][1] == {"markdown_file": "stream-cut.md", "error": "peer closed"}
+    assert storage.read_text(os.path.join("markdowns", "stream-cut.md")) == "# Half of it"
+    with open(os.path.join("transcriptions", fname)) as f:
+        assert json.load(f)["markdown_partial"] is True
+
+
+def test_generate_md_stream_reports_an_error_without_output(webui, monkeypatch):
+    fname = add_transcription("stream-error", "hello world, no answer")
+    stub_stream(monkeypatch, [], error=TimeoutError("timed out"))
+    events = parse_events(TestClient(webui.app).get(f"/generate_md_stream/{fname}?refresh=true").text)
+    assert events == [("error", {"error": "timed out"})]
+    assert not storage.stored_path(os.path.join("markdowns", "stream-error.md"))
+
+
+def list_pages(client, limit, **params):
+    pages, cursor = [], ""
+    while True:
+        response = client.get("/api/transcriptions", params=dict(params, limit=limit, cursor=cursor))
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append([item["fname"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_api_transcriptions_pages_newest_first_with_cursor_and_limit(webui):
+    # Two rows per datetime, so the page boundaries fall between rows with equal datetimes
+    names = []
+    for i in range(7):
+        name = f"page-{i}.json"
+        webui.meta_index.upsert(name, {"datetime": f"2023-05-0{1 + i // 2}T10:00:00Z", "source": "pagination", "status": "success"})
+        names.append(name)
+    newest_first = sorted(names, key=lambda n: (f"2023-05-0{1 + int(n[5]) // 2}", n), reverse=True)
+    client = TestClient(webui.app)
+    assert list_pages(client, 3, source="pagination") == [newest_first[:3], newest_first[3:6], newest_first[6:]]
+    # An exactly full last page ends with next_cursor null, not with an empty page after it
+    assert list_pages(client, 7, source="pagination") == [newest_first]
+    assert list_pages(client, 500, source="pagination", since="2023-05-03") == [newest_first[:3]]
+    assert list_pages(client, 2, source="pagination", since="2023-05-02") == [newest_first[:2], newest_first[2:4], newest_first[4:5]]
+
+
+def test_api_transcriptions_rejects_bad_parameters(webui):
+    client = TestClient(webui.app)
+    assert client.get("/api/transcriptions", params={"limit": 0}).status_code == 422
+    assert client.get("/api/transcriptions", params={"limit": 501}).status_code == 422
+    assert client.get("/api/transcriptions", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/api/transcriptions", params={"since": "yesterday"}).status_code == 400
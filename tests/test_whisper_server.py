@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import socket
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from whisper_server import WhisperServer, WhisperServerPool
+
+# Stands in for whisper-server: same command line, /health, and an /inference that answers
+# with its port and how many requests it was serving at once
+STUB = """\
+#!{python}
+import sys, time, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+port = int(sys.argv[sys.argv.index("--port") + 1])
+lock, busy = threading.Lock(), [0]
+
+class Handler(BaseHTTPRequestHandler):
+    def reply(self, body):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.reply(b"ok")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with lock:
+            busy[0] += 1
+            concurrent = busy[0]
+        time.sleep(0.2)
+        with lock:
+            busy[0] -= 1
+        self.reply(f"{{port}} {{concurrent}}".encode())
+
+    def log_message(self, *args):
+        pass
+
+ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_pool(tmp_path, count, health_interval=30.0):
+    exe = tmp_path / "whisper-server"
+    exe.write_text(STUB.format(python=sys.executable))
+    exe.chmod(0o755)
+    audio = tmp_path / "clip.wav"
+    audio.write_bytes(b"RIFF")
+    servers = [WhisperServer(str(exe), "model.bin", free_port(), startup_timeout=10) for _ in range(count)]
+    pool = WhisperServerPool(servers, health_interval=health_interval)
+    pool.start()
+    return pool, str(audio)
+
+
+def test_each_server_handles_one_job_at_a_time(tmp_path):
+    pool, audio = make_pool(tmp_path, 2)
+    try:
+        assert pool.stats() == {"servers": 2, "idle": 2, "alive": 2, "restarts": 0}
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(pool.transcribe(audio))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        assert pool.stats()["idle"] == 0
+        for t in threads:
+            t.join()
+        ports = {str(s.port) for s in pool.servers}
+        assert len(results) == 4
+        assert all(r.split()[0] in ports and r.split()[1] == "1" for r in results)
+        assert pool.stats()["idle"] == 2
+    finally:
+        pool.stop()
+
+
+def test_a_crashed_server_is_restarted_before_the_next_job(tmp_path):
+    pool, audio = make_pool(tmp_path, 1)
+    try:
+        server = pool.servers[0]
+        server.proc.kill()
+        server.proc.wait()
+        assert not server.health_check()
+        assert pool.transcribe(audio) == f"{server.port} 1"
+        assert server.restarts == 1 and server.health_check()
+    finally:
+        pool.stop()
+
+
+def test_monitor_restarts_an_idle_server_that_died(tmp_path):
+    pool, _ = make_pool(tmp_path, 1, health_interval=0.1)
+    try:
+        server = pool.servers[0]
+        server.proc.kill()
+        for _ in range(100):
+            if server.restarts and server.health_check():
+                break
+            time.sleep(0.1)
+        stats = pool.stats()
+        # The monitor may have the server checked out for its next check, so idle is not asserted
+        assert stats["alive"] == 1 and stats["restarts"] == 1
+    finally:
+        pool.stop()
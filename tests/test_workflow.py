@@ -1,7 +1,10 @@
 import os
+import sys
 import time
 import requests
-import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage
 
 def test_end_to_end_workflow():
     # Path to a small test audio file (should exist in tests/fixtures/)
@@ -16,24 +19,23 @@ def test_end_to_end_workflow():
     data = resp.json()
     transcription_id = data['transcription_id']
 
-    # Wait for background processing (poll for up to 60s for JSON status)
-    trans_json = os.path.join('transcriptions', transcription_id + '.json')
-    md_file = None
-    for _ in range(120):
-        if os.path.exists(trans_json):
-            with open(trans_json) as jf:
-                meta = json.load(jf)
-            if meta.get('status') == 'success' and meta.get('markdown_file'):
-                md_file = os.path.join('markdowns', meta['markdown_file'])
-                break
-        time.sleep(1)
-    assert md_file, "Transcription JSON did not reference a markdown file in time."
-    # Now poll for the markdown file to appear (up to 30s)
-    for _ in range(60):
-        if os.path.exists(md_file):
+    # Long-poll the job status endpoint until the job finishes (up to ~90s)
+    status_url = 'http://localhost:8000' + data.get('status_url', f'/jobs/{transcription_id}')
+    version = -1
+    status = None
+    deadline = time.time() + 90
+    while time.time() < deadline:
+        status = requests.get(status_url, params={'wait': 30, 'version': version}, timeout=40).json()
+        version = status['version']
+        if status['stage'] in ('done', 'error'):
             break
-        time.sleep(0.5)
-    assert os.path.exists(md_file), f"Markdown file not generated: {md_file}"
+    assert status and status['stage'] == 'done', f"Job did not finish successfully: {status}"
+    assert status.get('markdown_file'), f"Job finished without a markdown file: {status}"
+    # Stored compressed (e.g. <name>.md.zst) when storage.compression is set
+    md_path = os.path.join('markdowns', status['markdown_file'])
+    md_file = storage.stored_path(md_path)
+    assert md_file, f"Markdown file not generated: {md_path}"
+    assert storage.read_text(md_path).strip(), f"Markdown file is empty: {md_file}"
     print(f"Test passed: Markdown generated at {md_file}")
 
 if __name__ == "__main__":
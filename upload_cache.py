@@ -0,0 +1,151 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+
+def cache_key(content_hash: str, model_path: str, whisper_args: str) -> str:
+    """Same bytes transcribed with a different model or arguments get a different key."""
+    return hashlib.sha256(f"{content_hash}\0{model_path}\0{whisper_args}".encode("utf-8")).hexdigest()
+
+
+class UploadCache:
+    """
+    Content-addressed index of uploads, keyed by cache_key(), in a small SQLite database.
+    Maps each key to the transcription it produced (or is producing) and the archived
+    original, and keeps hit/miss counters. Archived originals can be evicted by total size
+    and age; the transcription stays cached after its original is gone.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                transcription_id TEXT NOT NULL,
+                original_path TEXT,
+                size INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self._db.commit()
+
+    def _bump(self, name: str):
+        self._db.execute(
+            "INSERT INTO counters(name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,))
+
+    def claim(self, key: str, content_hash: str, transcription_id: str, original_path: str, size: int):
+        """
+        Look up key and, on a miss, atomically record a new "processing" entry for it.
+        Returns the existing entry as a dict on a hit, or None if the caller now owns the key.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT transcription_id, status, original_path FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+                self._bump("hits")
+                self._db.commit()
+                return {"transcription_id": row[0], "status": row[1], "original_path": row[2]}
+            self._db.execute(
+                "INSERT INTO entries(key, content_hash, transcription_id, original_path, size, status, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, 'processing', ?, ?)",
+                (key, content_hash, transcription_id, original_path, size, now, now))
+            self._bump("misses")
+            self._db.commit()
+            return None
+
+    def lookup(self, key: str):
+        """The entry for key as a dict, or None; unlike claim() it records nothing."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT transcription_id, status, original_path FROM entries WHERE key = ?", (key,)).fetchone()
+        return {"transcription_id": row[0], "status": row[1], "original_path": row[2]} if row else None
+
+    def mark_done(self, key: str, status: str):
+        """Record a finished job; failed jobs are forgotten so the next upload retries them."""
+        with self._lock:
+            if status == "success":
+                self._db.execute("UPDATE entries SET status = ? WHERE key = ?", (status, key))
+            else:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+
+    def drop_original(self, key: str):
+        """The archived original of key was deleted; the transcription stays cached."""
+        with self._lock:
+            self._db.execute("UPDATE entries SET original_path = NULL WHERE key = ?", (key,))
+            self._db.commit()
+
+    def move_original(self, old_path: str, new_path: str) -> int:
+        """An archived original was moved by storage compaction (new_path None: deleted). Returns the entries updated."""
+        with self._lock:
+            count = self._db.execute("UPDATE entries SET original_path = ? WHERE original_path = ?", (new_path, old_path)).rowcount
+            self._db.commit()
+        return count
+
+    def forget(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+
+    def evict_originals(self, max_bytes: int = 0, max_age_days: float = 0) -> int:
+        """
+        Delete archived originals of finished jobs, least recently used first, until the archive
+        is under max_bytes, and any older than max_age_days. Zero disables a limit. One file can
+        back several keys (the same content with different whisper args): it is only deleted when
+        none of them is still processing, and then unlinked from all of them.
+        Returns the number of files removed.
+        """
+        removed = 0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT original_path, MAX(size), MAX(last_access), SUM(status != 'success') FROM entries"
+                " WHERE original_path IS NOT NULL GROUP BY original_path ORDER BY MAX(last_access)").fetchall()
+            total = sum(size for _, size, _, _ in rows)
+            cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+            for path, size, last_access, unfinished in rows:
+                too_big = max_bytes and total > max_bytes
+                too_old = cutoff is not None and last_access < cutoff
+                if unfinished or not (too_big or too_old):
+                    continue
+                if os.path.exists(path):
+                    os.remove(path)
+                self._db.execute("UPDATE entries SET original_path = NULL WHERE original_path = ?", (path,))
+                total -= size
+                removed += 1
+            if removed:
+                self._db.execute(
+                    "INSERT INTO counters(name, value) VALUES ('evictions', ?)"
+                    " ON CONFLICT(name) DO UPDATE SET value = value + ?", (removed, removed))
+            self._db.commit()
+        if removed:
+            logging.info(f"Evicted {removed} archived uploads")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+            entries, archived_bytes = self._db.execute(
+                "SELECT COUNT(*), (SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM entries"
+                " WHERE original_path IS NOT NULL GROUP BY original_path)) FROM entries").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "archived_bytes": archived_bytes,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "evictions": counters.get("evictions", 0),
+        }
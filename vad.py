@@ -0,0 +1,158 @@
+import math
+import wave
+import array
+import bisect
+import operator
+
+try:
+    import numpy as np
+except ImportError:
+    # Optional: frame energies are computed in pure Python instead (same result, slower)
+    np = None
+
+# Energy is measured over 30 ms frames; a WAV is read this many seconds at a time
+FRAME_MS = 30
+READ_SEC = 60
+# dBFS of a frame of digital silence, so log10 never sees 0
+SILENCE_DB = -100.0
+# Highest noise floor believed by default: room noise and hiss sit well below this, speech above it
+MAX_FLOOR_DB = -50.0
+
+
+def _frame_energies_db(data: bytes, step: int) -> list:
+    """Mean-square energy in dBFS of each whole frame of step 16-bit samples in data."""
+    full = len(data) // 2 // step * step
+    if np is not None:
+        samples = np.frombuffer(data, dtype="<i2", count=full).astype(np.float64).reshape(-1, step)
+        power = (samples * samples).mean(axis=1) / (32768.0 * 32768.0)
+        return np.maximum(10 * np.log10(np.maximum(power, 1e-10)), SILENCE_DB).tolist()
+    samples = array.array("h")
+    samples.frombytes(data[:full * 2])
+    energies = []
+    for offset in range(0, full, step):
+        frame = samples[offset:offset + step]
+        power = sum(map(operator.mul, frame, frame)) / step / (32768.0 * 32768.0)
+        energies.append(max(10 * math.log10(power), SILENCE_DB) if power > 0 else SILENCE_DB)
+    return energies
+
+
+def detect_speech(wav_path: str, threshold_db: float = 12.0, min_silence_sec: float = 1.0, pad_sec: float = 0.25, min_speech_sec: float = 0.2, max_floor_db: float = MAX_FLOOR_DB):
+    """
+    Energy-based voice activity detection on a 16-bit mono WAV, read in chunks.
+
+    A frame is speech when it is threshold_db louder than the noise floor: the 10th
+    percentile of frame energies, but at most max_floor_db dBFS, since in a recording that is
+    (almost) all speech that percentile is quiet speech rather than noise. Pauses shorter than min_silence_sec stay inside a
+    region, each region is padded by pad_sec on both sides and bursts shorter than
+    min_speech_sec (clicks) are dropped. Returns ([(start_frame, end_frame)], total frames, rate).
+    """
+    with wave.open(wav_path, "rb") as wf:
+        rate = wf.getframerate()
+        total = wf.getnframes()
+        step = max(1, rate * FRAME_MS // 1000)
+        energies = []
+        chunk = step * max(1, READ_SEC * 1000 // FRAME_MS)
+        while True:
+            data = wf.readframes(chunk)
+            if not data:
+                break
+            energies.extend(_frame_energies_db(data, step))
+    if not energies:
+        return [], total, rate
+    floor = min(sorted(energies)[len(energies) // 10], max_floor_db)
+    threshold = floor + threshold_db
+    regions = []
+    start = None
+    for index, db in enumerate(energies + [SILENCE_DB - 1]):
+        if db > threshold and start is None:
+            start = index
+        elif db <= threshold and start is not None:
+            regions.append((start * step, index * step))
+            start = None
+    gap, pad, shortest = int(min_silence_sec * rate), int(pad_sec * rate), int(min_speech_sec * rate)
+    merged = []
+    for start, end in regions:
+        if merged and start - merged[-1][1] < gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    padded = []
+    for start, end in merged:
+        if end - start < shortest:
+            continue
+        start, end = max(0, start - pad), min(total, end + pad)
+        if padded and start <= padded[-1][1]:
+            padded[-1] = (padded[-1][0], end)
+        else:
+            padded.append((start, end))
+    return padded, total, rate
+
+
+def write_regions(wav_path: str, regions, out_path: str):
+    """Write the given (start_frame, end_frame) regions of wav_path back to back into out_path."""
+    with wave.open(wav_path, "rb") as src:
+        params = src.getparams()
+        chunk = src.getframerate() * READ_SEC
+        with wave.open(out_path, "wb") as dst:
+            dst.setparams(params)
+            for start, end in regions:
+                src.setpos(start)
+                remaining = end - start
+                while remaining > 0:
+                    data = src.readframes(min(chunk, remaining))
+                    if not data:
+                        break
+                    dst.writeframes(data)
+                    remaining -= len(data) // params.sampwidth // params.nchannels
+
+
+def trim_silence(wav_path: str, out_path: str, threshold_db: float = 12.0, min_silence_sec: float = 1.0, pad_sec: float = 0.25, min_removed_sec: float = 5.0, max_floor_db: float = MAX_FLOOR_DB):
+    """
+    Write only the speech of wav_path to out_path. Returns a summary dict (path, rate, regions,
+    audio_sec, speech_sec, removed_sec, expected_speedup), where expected_speedup is the ratio
+    of the input lengths, an estimate rather than a measured whisper speedup. Returns None,
+    writing nothing, when less than min_removed_sec of silence would be removed or there is no
+    speech at all.
+    """
+    regions, total, rate = detect_speech(wav_path, threshold_db, min_silence_sec, pad_sec, max_floor_db=max_floor_db)
+    speech = sum(end - start for start, end in regions)
+    if not regions or total - speech < min_removed_sec * rate:
+        return None
+    write_regions(wav_path, regions, out_path)
+    return {
+        "path": out_path,
+        "rate": rate,
+        "regions": regions,
+        "audio_sec": round(total / rate, 2),
+        "speech_sec": round(speech / rate, 2),
+        "removed_sec": round((total - speech) / rate, 2),
+        "expected_speedup": round(total / speech, 2),
+    }
+
+
+def trimmed_offsets(regions) -> list:
+    """Start frame of each region within the trimmed audio."""
+    offsets = [0]
+    for start, end in regions[:-1]:
+        offsets.append(offsets[-1] + end - start)
+    return offsets
+
+
+def to_original_ms(ms: int, regions, rate: int, end: bool = False, offsets=None) -> int:
+    """
+    Map a time in the trimmed audio to the original recording. An end time that falls exactly on
+    the join of two regions maps to the end of the first one rather than the start of the next.
+    """
+    offsets = trimmed_offsets(regions) if offsets is None else offsets
+    frame = ms * rate // 1000
+    index = (bisect.bisect_left(offsets, frame) if end else bisect.bisect_right(offsets, frame)) - 1
+    index = min(max(index, 0), len(regions) - 1)
+    start, stop = regions[index]
+    return min(start + max(frame - offsets[index], 0), stop) * 1000 // rate
+
+
+def remap_segments(segments, regions, rate: int) -> list:
+    """(start_ms, end_ms, text) lines of a trimmed transcription, in original-recording time."""
+    offsets = trimmed_offsets(regions)
+    return [(to_original_ms(start, regions, rate, offsets=offsets), to_original_ms(end, regions, rate, end=True, offsets=offsets), text)
+            for start, end, text in segments]
@@ -1,13 +1,27 @@
 from fastapi import FastAPI, Request, HTTPException, Query
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse, JSONResponse, StreamingResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 import os
 import json
 from datetime import datetime
-import urllib.parse
-import requests
-import markdown2
-from ollama_client import OllamaClient
+import base64
+import time
+import queue
+import threading
+import logging
+import mimetypes
+from html import escape as html_escape
+from metadata_index import MetadataIndex, SNIPPET_START, SNIPPET_END
+from llm_cache import LLMCache
+from long_transcript import needs_chunking, polish_long_transcript, record_chunk_timings
+from starlette.concurrency import run_in_threadpool
+from metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE
+from log_sink import setup_logging_from_config
+from meta_store import job_lock, update_meta
+import storage
+from settings import get_settings
+from render_cache import RenderCache, validator_headers, not_modified
+from subtitles import TRANSCRIPT_FORMATS, segments_path, load_segments, segment_at, read_transcript
 
 TRANSCRIPTIONS_DIR = "transcriptions"
 ARCHIVE_DIR = os.path.join(TRANSCRIPTIONS_DIR, "archive")
@@ -18,13 +32,51 @@ app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 os.makedirs(MARKDOWNS_DIR, exist_ok=True)
+os.makedirs(TRANSCRIPTIONS_DIR, exist_ok=True)
+
+meta_index = MetadataIndex(os.path.join(TRANSCRIPTIONS_DIR, "index.db"))
+
+# Shared with the API server's modules in this process; re-parsed only when config.yaml changes.
+# markdown2 and the Ollama client are imported on first use, not at startup.
+settings = get_settings("config.yaml")
+# Same file as the API server; records go through a queue to one buffered writer thread
+setup_logging_from_config(settings.section("logging"))
+
+def load_llm_cache():
+    cache_cfg = settings.section("llm_cache")
+    if not cache_cfg.get("enabled", True):
+        return None
+    return LLMCache(
+        cache_cfg.get("db_path", os.path.join(TRANSCRIPTIONS_DIR, "llm_cache.db")),
+        max_entries=cache_cfg.get("max_entries", 1000),
+        max_bytes=cache_cfg.get("max_bytes", 0),
+    )
+
+llm_cache = load_llm_cache()
+
+@settings.on_change
+def configure_storage(changed=settings):
+    storage_cfg = changed.section("storage")
+    storage.configure(storage_cfg.get("compression", "none"), storage_cfg.get("compression_level"),
+                      storage_cfg.get("markdown_compression", "none"))
+
+configure_storage()
+
+@app.on_event("startup")
+def ensure_meta_index():
+    # First start against existing data: build the index once from the JSON and markdown files
+    if meta_index.count() == 0 or meta_index.needs_rebuild:
+        meta_index.rebuild(TRANSCRIPTIONS_DIR, MARKDOWNS_DIR)
+
+@app.on_event("shutdown")
+async def close_ollama_clients():
+    # Closes the httpx pools the async Ollama client opened on this event loop
+    from ollama_client import close_async_clients
+    await close_async_clients()
 
 # LLM config loader (kept for legacy, but not used for Ollama)
 def get_llm_config():
-    import yaml
-    with open("config.yaml", "r") as f:
-        config = yaml.safe_load(f)
-    llm_cfg = config.get("llm", {})
+    llm_cfg = settings.section("llm")
     return {
         "host": llm_cfg.get("host", "https://api.openai.com"),
         "port": llm_cfg.get("port", 443),
@@ -33,16 +85,9 @@ def get_llm_config():
         "prompt": llm_cfg.get("prompt", "Polish this transcript into a clean, readable Markdown document:")
     }
 
-def call_llm(transcript_text: str) -> dict:
-    # Use Ollama for local LLM inference
-    client = OllamaClient()
-    response = client.generate_markdown(transcript_text)
-    # Debug: log the raw response from OllamaClient
-    try:
-        with open("server.log", "a") as logf:
-            logf.write(f"[CALL_LLM RAW RESPONSE]: {repr(response)}\n")
-    except Exception:
-        pass
+def parse_llm_response(response) -> dict:
+    # Size only: the raw response holds the whole polished document
+    logging.debug(f"LLM response of type {type(response).__name__}")
     import json as _json
     # If response is a dict, return as is
     if isinstance(response, dict):
@@ -58,77 +103,181 @@ def call_llm(transcript_text: str) -> dict:
     except Exception:
         return {"markdown": response, "title": "", "file_name": ""}
 
-@app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    files = [f for f in os.listdir(TRANSCRIPTIONS_DIR) if f.endswith(".json") and os.path.isfile(os.path.join(TRANSCRIPTIONS_DIR, f))]
-    # Sort by datetime descending
-    def get_dt(fname):
-        try:
-            with open(os.path.join(TRANSCRIPTIONS_DIR, fname), "r") as jf:
-                meta = json.load(jf)
-            dt = meta.get("datetime", "")
-            return datetime.fromisoformat(dt.replace("Z", "")) if dt else datetime.min
-        except Exception:
-            return datetime.min
-    files.sort(key=get_dt, reverse=True)
-    # Build left panel: list of files
-    file_links = []
-    for fname in files:
-        with open(os.path.join(TRANSCRIPTIONS_DIR, fname), "r") as jf:
-            meta = json.load(jf)
-        dt = meta.get("datetime", "")
-        orig = meta.get("original_filename", "")
-        md_title = meta.get("markdown_title", "")
-        md_file = meta.get("markdown_file", "")
-        # Format datetime to human-friendly string
+def cached_llm_result(key: str, refresh: bool = False):
+    """Stored polishing result for key (flagged "cached"), or None on a miss or refresh."""
+    if llm_cache is None:
+        return None
+    if refresh:
+        llm_cache.bypass()
+        return None
+    result = llm_cache.get(key)
+    if result is not None:
+        result["cached"] = True
+    return result
+
+def store_llm_result(key: str, raw, result: dict):
+    # Failed generations come back as "Error: ..." strings and must not be cached
+    if llm_cache is None or (isinstance(raw, str) and raw.startswith("Error:")):
+        return
+    if isinstance(result, dict) and (result.get("markdown") or "").strip():
+        llm_cache.put(key, result)
+
+def call_llm(transcript_text: str, refresh: bool = False) -> dict:
+    # Use Ollama for local LLM inference
+    from ollama_client import get_client
+    client = get_client()
+    key = client.result_key(transcript_text)
+    cached = cached_llm_result(key, refresh)
+    if cached is not None:
+        return cached
+    if needs_chunking(transcript_text, client.chunking):
+        raw = result = polish_long_transcript(transcript_text, client)
+    else:
+        raw = client.generate_markdown(transcript_text)
+        result = parse_llm_response(raw)
+    store_llm_result(key, raw, result)
+    return result
+
+async def call_llm_async(transcript_text: str, refresh: bool = False) -> dict:
+    from ollama_client import get_client, get_async_client
+    client = get_async_client()
+    key = client.result_key(transcript_text)
+    cached = await run_in_threadpool(cached_llm_result, key, refresh)
+    if cached is not None:
+        return cached
+    if needs_chunking(transcript_text, client.chunking):
+        # Chunked polishing fans out over the sync client's pool from a worker thread
+        raw = result = await run_in_threadpool(polish_long_transcript, transcript_text, get_client())
+    else:
+        # Awaits Ollama on the shared async connection pool instead of blocking a threadpool worker
+        raw = await client.generate_markdown(transcript_text)
+        result = parse_llm_response(raw)
+    await run_in_threadpool(store_llm_result, key, raw, result)
+    return result
+
+def encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row["datetime"], row["fname"]]).encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        dt, fname = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(dt), str(fname)
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+@app.get("/api/transcriptions")
+def api_transcriptions(cursor: str = "", limit: int = Query(50, ge=1, le=500), status: str = "", source: str = "", since: str = ""):
+    """
+    Summary fields of transcriptions, newest first. Pass the returned next_cursor to get the
+    following page; next_cursor is null on the last page.
+    """
+    if since:
         try:
-            dt_obj = datetime.fromisoformat(dt.replace("Z", ""))
-            dt_str = dt_obj.strftime("%b %d, %Y %H:%M")
-        except Exception:
-            dt_str = dt
-        # Show: title, file_name, date
-        file_links.append(f"<li><a href='/?file={fname}'>"
-                         f"<span style='color:var(--accent);font-weight:bold;font-size:1.1em;'>{md_title or '(No Title)'}</span>"
-                         f"<br><span style='color:#aaa;font-size:0.95em;'>{md_file or fname}</span>"
-                         f"<br><small style='color:#aaa;'>{dt_str}</small>"
-                         f"</a></li>")
-    # Parse query param
-    url = str(request.url)
-    parsed = urllib.parse.urlparse(url)
-    params = urllib.parse.parse_qs(parsed.query)
-    fname = params.get('file', [None])[0]
-    def render_right_panel(fname):
-        if not fname:
-            return "<div><em>Select a transcription to view details.</em></div>"
-        path = os.path.join(TRANSCRIPTIONS_DIR, fname)
-        if not os.path.exists(path):
-            return "<div><em>File not found.</em></div>"
-        with open(path, "r") as jf:
-            meta = json.load(jf)
-        text = meta.get("transcription_text", "")
-        md_name = meta.get("markdown_file")
-        md_title = meta.get("markdown_title", "")
-        md_html = ""
-        if md_name:
-            md_path = os.path.join(MARKDOWNS_DIR, md_name)
-            if os.path.exists(md_path):
-                with open(md_path, "r") as mf:
-                    md_content = mf.read()
-                md_html = f"<div style='margin-bottom:2em;'><h2>Markdown</h2><div class='md-rendered' style='background:#23272b;color:#f5f5f5;padding:1em;border-radius:8px;overflow-x:auto;max-width:60ch;margin-left:0;margin-right:auto;text-align:left;'>{markdown2.markdown(md_content)}</div><a href='/download_md/{md_name}'>Download MD</a></div>"
-        btns = f"""
-        <a href='/download/{fname}'>Download JSON</a> |
-        <a href='/generate_md/{fname}'>Generate MD</a> |
-        <a href='/delete/{fname}'>Delete</a>
-        """
-        html = f"""
-        <div>
-        {md_html}
-        <h3>Raw transcription from original audio file ({meta.get('original_filename','')})</h3>
-        <div style='background:#23272b;color:#f5f5f5;padding:1em;border-radius:8px;overflow-x:auto;max-width:60ch;margin-left:0;margin-right:auto;text-align:left;'><pre style='white-space: pre-wrap;margin:0;background:none;color:inherit;font-family:inherit;font-family:inherit;'>{text}</pre></div>
-        {btns}
-        </div>
+            datetime.fromisoformat(since.replace("Z", ""))
+        except ValueError:
+            raise HTTPException(400, "since must be an ISO 8601 datetime")
+    after = decode_cursor(cursor) if cursor else None
+    rows = meta_index.list_after(after, limit + 1, status=status or None, source=source or None, since=since or None)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return JSONResponse(content={"items": rows[:limit], "next_cursor": next_cursor})
+
+def highlight_snippet(snippet: str) -> str:
+    # Escape the transcript text first, then turn the FTS markers into <mark> tags
+    return html_escape(snippet).replace(SNIPPET_START, "<mark>").replace(SNIPPET_END, "</mark>")
+
+@app.get("/api/search")
+def api_search(q: str = "", limit: int = Query(20, ge=1, le=100)):
+    """
+    Full-text search over transcript text, markdown titles and markdown bodies.
+    Returns the list fields of the best matches plus an HTML snippet with <mark> highlights.
+    """
+    started = time.perf_counter()
+    results = meta_index.search(q, limit)
+    for item in results:
+        item["snippet"] = highlight_snippet(item["snippet"] or "")
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    return JSONResponse(content={"items": results, "took_ms": took_ms})
+
+def load_render_cache():
+    cache_cfg = settings.section("render_cache")
+    return RenderCache(max_entries=cache_cfg.get("max_entries", 256), max_bytes=cache_cfg.get("max_bytes", 32 * 1024 * 1024))
+
+render_cache = load_render_cache()
+
+def render_detail(fname: str):
+    """
+    Detail panel of one transcription: rendered markdown, raw transcript, segments and actions.
+    Returns (html, paths of the files it was rendered from) for the render cache.
+    """
+    path = os.path.join(TRANSCRIPTIONS_DIR, fname)
+    with open(path, "r") as jf:
+        meta = json.load(jf)
+    text = storage.transcript_text(path, meta) or meta.get("error") or ""
+    md_name = meta.get("markdown_file")
+    md_title = meta.get("markdown_title", "")
+    md_html = ""
+    # Every stored form of each file, so recompressing one also invalidates the cached panel
+    base = os.path.splitext(path)[0]
+    sources = [path, *storage.variants(base + ".txt"), *storage.variants(segments_path(base)), meta.get("original_path") or ""]
+    if md_name:
+        md_path = os.path.join(MARKDOWNS_DIR, md_name)
+        sources.extend(storage.variants(md_path))
+        if storage.stored_path(md_path):
+            import markdown2
+            md_content = storage.read_text(md_path)
+            md_html = f"<div style='margin-bottom:2em;'><h2>Markdown</h2><div class='md-rendered' style='background:#23272b;color:#f5f5f5;padding:1em;border-radius:8px;overflow-x:auto;max-width:60ch;margin-left:0;margin-right:auto;text-align:left;'>{markdown2.markdown(md_content)}</div><a href='/download_md/{md_name}'>Download MD</a></div>"
+    segments_html = ""
+    if storage.stored_path(segments_path(base)):
+        # Segments are fetched a page at a time by the index page script; clicking one seeks the audio
+        player = f"<audio id='player' controls preload='none' src='/audio/{fname}' style='width:60ch;max-width:100%;display:block;'></audio>" if os.path.exists(meta.get("original_path") or "") else ""
+        segments_html = f"""
+        <h3>Segments</h3>
+        {player}
+        <div id='segments' data-fname='{fname}' style='max-width:60ch;max-height:40vh;overflow-y:auto;background:#23272b;padding:0.5em 1em;border-radius:8px;'></div>
+        <a href='#' id='more-segments' style='display:none;'>More segments</a>
+        <div>Download <a href='/download_transcript/{fname}?format=srt'>SRT</a> | <a href='/download_transcript/{fname}?format=vtt'>VTT</a> | <a href='/download_transcript/{fname}?format=json'>JSON segments</a></div>
         """
-        return html
+    btns = f"""
+    <a href='/download/{fname}'>Download JSON</a> |
+    <a href='/generate_md/{fname}' class='generate-md' data-fname='{fname}'>Generate MD</a> |
+    {f"<a href='/generate_md/{fname}?refresh=1' class='generate-md' data-fname='{fname}' data-refresh='1'>Regenerate MD</a> |" if md_html else ""}
+    <a href='/delete/{fname}'>Delete</a>
+    """
+    html = f"""
+    <div>
+    {md_html}
+    <h3>Raw transcription from original audio file ({html_escape(meta.get('original_filename') or '')})</h3>
+    <div style='background:#23272b;color:#f5f5f5;padding:1em;border-radius:8px;overflow-x:auto;max-width:60ch;margin-left:0;margin-right:auto;text-align:left;'><pre style='white-space: pre-wrap;margin:0;background:none;color:inherit;font-family:inherit;font-family:inherit;'>{html_escape(text or '')}</pre></div>
+    {segments_html}
+    {btns}
+    <pre id='md-live' style='display:none;white-space:pre-wrap;background:#23272b;color:#f5f5f5;padding:1em;border-radius:8px;max-width:60ch;'></pre>
+    </div>
+    """
+    return html, sources
+
+@app.get("/detail/{fname}", response_class=HTMLResponse)
+def detail(fname: str, request: Request):
+    """
+    Detail panel fragment fetched by the index page. Served from the render cache while the
+    files behind it are unchanged, and answered with 304 when the browser's copy is current.
+    """
+    fname = os.path.basename(fname)
+    if not os.path.exists(os.path.join(TRANSCRIPTIONS_DIR, fname)):
+        return HTMLResponse("<div><em>File not found.</em></div>", status_code=404)
+    entry = render_cache.get_or_render(fname, lambda: render_detail(fname))
+    headers = validator_headers(entry)
+    if not_modified(request.headers, entry):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(entry["html"], headers=headers)
+
+@app.get("/api/render_cache/stats")
+def render_cache_stats():
+    return render_cache.stats()
+
+@app.get("/", response_class=HTMLResponse)
+def index(request: Request):
+    # The page is the same for every transcription: the list and the detail panel (?file=)
+    # are both fetched by the script, so switching transcripts never rebuilds this page
     html = f"""
     <html><head><title>Transcriptions</title>
     <link rel="stylesheet" href="/static/instagrapi.css">
@@ -164,24 +313,189 @@ def index(request: Request):
     a {{ color: var(--accent); text-decoration: none; }}
     a:hover {{ text-decoration: underline; }}
     li {{ margin-bottom: 1.1em; }}
+    mark {{ background: var(--accent); color: #181c20; border-radius: 2px; }}
     </style>
     </head><body>
     <div id='left'>
       <h2>Transcriptions</h2>
-      <ul>
-        {''.join(file_links)}
-      </ul>
+      <input type='search' id='search' placeholder='Search transcripts...' style='width:100%;box-sizing:border-box;margin-bottom:1em;padding:0.4em;'>
+      <ul id='file-list'></ul>
+      <a href='#' id='load-more' style='display:none;'>Load more</a>
     </div>
     <div id='right'>
-      {render_right_panel(fname)}
+      <div><em>Select a transcription to view details.</em></div>
     </div>
     <script>
-      document.querySelectorAll('#left a').forEach(function(a) {{
-        a.onclick = function(e) {{
-          e.preventDefault();
-          window.location = this.href;
+      // The list is loaded page by page from /api/transcriptions instead of being rendered here
+      var nextCursor = '';
+      var loadMore = document.getElementById('load-more');
+      function formatDate(dt) {{
+        var d = new Date(dt);
+        if (isNaN(d)) return dt;
+        return d.toLocaleString('en-US', {{month: 'short', day: '2-digit', year: 'numeric', hour: '2-digit', minute: '2-digit', hour12: false}});
+      }}
+      function span(text, style) {{
+        var el = document.createElement('span');
+        el.textContent = text;
+        el.setAttribute('style', style);
+        return el;
+      }}
+      function loadPage() {{
+        fetch('/api/transcriptions?limit=50' + (nextCursor ? '&cursor=' + encodeURIComponent(nextCursor) : ''))
+          .then(function(r) {{ return r.json(); }})
+          .then(function(data) {{
+            var list = document.getElementById('file-list');
+            data.items.forEach(function(item) {{
+              var li = document.createElement('li');
+              var a = document.createElement('a');
+              a.href = '/?file=' + encodeURIComponent(item.fname);
+              a.appendChild(span(item.title || '(No Title)', 'color:var(--accent);font-weight:bold;font-size:1.1em;'));
+              a.appendChild(document.createElement('br'));
+              a.appendChild(span(item.markdown_file || item.fname, 'color:#aaa;font-size:0.95em;'));
+              a.appendChild(document.createElement('br'));
+              var small = document.createElement('small');
+              small.style.color = '#aaa';
+              small.textContent = formatDate(item.datetime);
+              a.appendChild(small);
+              li.appendChild(a);
+              list.appendChild(li);
+            }});
+            nextCursor = data.next_cursor;
+            loadMore.style.display = nextCursor ? 'inline' : 'none';
+          }});
+      }}
+      loadMore.onclick = function(e) {{
+        e.preventDefault();
+        loadPage();
+      }};
+      loadPage();
+      // The detail panel is an HTML fragment from /detail/<fname>, cached server-side and
+      // revalidated by the browser (ETag), so switching transcripts only swaps this panel
+      var right = document.getElementById('right');
+      function showDetail(fname, push) {{
+        if (!fname) return;
+        fetch('/detail/' + encodeURIComponent(fname))
+          .then(function(r) {{ return r.text(); }})
+          .then(function(html) {{
+            right.innerHTML = html;
+            bindDetail();
+          }});
+        if (push) history.pushState(null, '', '/?file=' + encodeURIComponent(fname));
+      }}
+      document.getElementById('file-list').onclick = function(e) {{
+        var a = e.target.closest('a');
+        if (!a || e.ctrlKey || e.metaKey || e.shiftKey) return;
+        e.preventDefault();
+        showDetail(new URL(a.href).searchParams.get('file'), true);
+      }};
+      window.onpopstate = function() {{
+        showDetail(new URLSearchParams(window.location.search).get('file'), false);
+      }};
+      function bindDetail() {{
+        // Generate MD streams the model output live instead of waiting for the full response
+        document.querySelectorAll('a.generate-md').forEach(function(a) {{
+          a.onclick = function(e) {{
+            if (!window.EventSource) return;
+            e.preventDefault();
+            var live = document.getElementById('md-live');
+            live.style.display = 'block';
+            live.textContent = '';
+            var fname = this.dataset.fname;
+            var source = new EventSource('/generate_md_stream/' + encodeURIComponent(fname) + (this.dataset.refresh ? '?refresh=1' : ''));
+            source.addEventListener('token', function(ev) {{ live.textContent += JSON.parse(ev.data); }});
+            source.addEventListener('chunk', function(ev) {{
+              var c = JSON.parse(ev.data);
+              live.textContent += 'Polished part ' + (c.index + 1) + ' of ' + c.total + ' (' + c.sec + 's)\\n';
+            }});
+            source.addEventListener('done', function() {{ source.close(); showDetail(fname, false); }});
+            source.addEventListener('partial', function(ev) {{
+              source.close();
+              live.textContent += '\\n\\n[Generation stopped early, partial markdown saved: ' + JSON.parse(ev.data).error + ']';
+            }});
+            source.addEventListener('error', function(ev) {{
+              source.close();
+              live.textContent += '\\n\\n[Error: ' + (ev.data ? JSON.parse(ev.data).error : 'connection lost') + ']';
+            }});
+          }};
+        }});
+        // Timed segments: loaded page by page (or starting at ?t=seconds), clicking one seeks the audio
+        var segmentsBox = document.getElementById('segments');
+        if (segmentsBox) {{
+          var player = document.getElementById('player');
+          var moreSegments = document.getElementById('more-segments');
+          var nextSegment = 0;
+          function clock(ms) {{
+            var s = Math.floor(ms / 1000);
+            return Math.floor(s / 60) + ':' + ('0' + (s % 60)).slice(-2);
+          }}
+          function loadSegments(query) {{
+            fetch('/api/segments/' + encodeURIComponent(segmentsBox.dataset.fname) + '?limit=100&' + query)
+              .then(function(r) {{ return r.json(); }})
+              .then(function(data) {{
+                data.items.forEach(function(seg) {{
+                  var row = document.createElement('div');
+                  var a = document.createElement('a');
+                  a.href = '#';
+                  a.textContent = clock(seg[0]);
+                  a.onclick = function(e) {{
+                    e.preventDefault();
+                    if (!player) return;
+                    player.currentTime = seg[0] / 1000;
+                    player.play();
+                  }};
+                  row.appendChild(a);
+                  row.appendChild(document.createTextNode(' ' + seg[2].trim()));
+                  segmentsBox.appendChild(row);
+                }});
+                nextSegment = data.next_offset;
+                moreSegments.style.display = nextSegment !== null ? 'inline' : 'none';
+              }});
+          }}
+          moreSegments.onclick = function(e) {{
+            e.preventDefault();
+            loadSegments('offset=' + nextSegment);
+          }};
+          var startAt = parseFloat(new URLSearchParams(window.location.search).get('t'));
+          if (isNaN(startAt)) {{
+            loadSegments('offset=0');
+          }} else {{
+            loadSegments('at_ms=' + Math.round(startAt * 1000));
+            if (player) player.currentTime = startAt;
+          }}
         }}
-      }});
+      }}
+      showDetail(new URLSearchParams(window.location.search).get('file'), false);
+      // Search replaces the list with ranked matches; clearing the box restores the list
+      var searchTimer = null;
+      document.getElementById('search').oninput = function() {{
+        var q = this.value.trim();
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(function() {{
+          var list = document.getElementById('file-list');
+          list.innerHTML = '';
+          nextCursor = '';
+          if (!q) {{ loadPage(); return; }}
+          loadMore.style.display = 'none';
+          fetch('/api/search?q=' + encodeURIComponent(q))
+            .then(function(r) {{ return r.json(); }})
+            .then(function(data) {{
+              data.items.forEach(function(item) {{
+                var li = document.createElement('li');
+                var a = document.createElement('a');
+                a.href = '/?file=' + encodeURIComponent(item.fname);
+                a.appendChild(span(item.title || item.fname, 'color:var(--accent);font-weight:bold;font-size:1.1em;'));
+                a.appendChild(document.createElement('br'));
+                var snippet = document.createElement('small');
+                snippet.style.color = '#aaa';
+                // Snippet HTML is escaped server-side; only <mark> tags remain
+                snippet.innerHTML = item.snippet;
+                a.appendChild(snippet);
+                li.appendChild(a);
+                list.appendChild(li);
+              }});
+            }});
+        }}, 200);
+      }};
     </script>
     </body></html>
     """
@@ -194,7 +508,7 @@ def view_transcription(fname: str):
         raise HTTPException(404, "Not found")
     with open(path, "r") as jf:
         meta = json.load(jf)
-    text = meta.get("transcription_text", "")
+    text = storage.transcript_text(path, meta)
     html = f"""
     <html><head><title>View Transcription</title></head><body>
     <h2>Transcription: {fname}</h2>
@@ -204,6 +518,42 @@ def view_transcription(fname: str):
     """
     return HTMLResponse(content=html)
 
+@app.get("/api/segments/{fname}")
+def api_segments(fname: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000), at_ms: int = None):
+    """One page of a transcription's timed segments; at_ms starts the page at the segment playing then."""
+    path = segments_path(os.path.join(TRANSCRIPTIONS_DIR, os.path.splitext(os.path.basename(fname))[0]))
+    if not storage.stored_path(path):
+        raise HTTPException(404, "No segments")
+    segments = load_segments(path)
+    if at_ms is not None:
+        offset = segment_at(segments, at_ms)
+    end = offset + limit
+    return {"items": [list(seg) for seg in segments[offset:end]], "offset": offset, "total": len(segments),
+            "next_offset": end if end < len(segments) else None}
+
+@app.get("/download_transcript/{fname}")
+def download_transcript(fname: str, format: str = "srt"):
+    if format not in TRANSCRIPT_FORMATS:
+        raise HTTPException(400, f"format must be one of {', '.join(TRANSCRIPT_FORMATS)}")
+    name = os.path.splitext(os.path.basename(fname))[0]
+    content = read_transcript(os.path.join(TRANSCRIPTIONS_DIR, name), format)
+    if content is None:
+        raise HTTPException(404, "Not found")
+    return Response(content=content, media_type=TRANSCRIPT_FORMATS[format],
+                    headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'})
+
+@app.get("/audio/{fname}")
+def audio(fname: str):
+    """The archived original recording, with Range support so the player can seek."""
+    path = os.path.join(TRANSCRIPTIONS_DIR, os.path.basename(fname))
+    if not os.path.exists(path):
+        raise HTTPException(404, "Not found")
+    with open(path, "r") as jf:
+        original_path = json.load(jf).get("original_path") or ""
+    if not os.path.exists(original_path):
+        raise HTTPException(404, "Original audio is no longer archived")
+    return FileResponse(original_path, media_type=mimetypes.guess_type(original_path)[0] or "application/octet-stream")
+
 @app.get("/download/{fname}")
 def download_json(fname: str):
     path = os.path.join(TRANSCRIPTIONS_DIR, fname)
@@ -216,38 +566,20 @@ def delete_transcription(fname: str):
     path = os.path.join(TRANSCRIPTIONS_DIR, fname)
     if not os.path.exists(path):
         raise HTTPException(404, "Not found")
-    os.remove(path)
-    # Optionally remove .txt with same base name
-    txt_path = os.path.splitext(path)[0] + ".txt"
-    if os.path.exists(txt_path):
-        os.remove(txt_path)
+    with job_lock(path):
+        os.remove(path)
+    meta_index.delete(fname)
+    # Remove the transcript text and segments with the same base name, in any stored form
+    for side_path in (os.path.splitext(path)[0] + ".txt", segments_path(os.path.splitext(path)[0])):
+        storage.remove_text(side_path)
     return RedirectResponse(url="/", status_code=303)
 
-@app.get("/generate_md/{fname}")
-def generate_markdown(fname: str):
-    path = os.path.join(TRANSCRIPTIONS_DIR, fname)
-    if not os.path.exists(path):
-        raise HTTPException(404, "Not found")
-    with open(path, "r") as jf:
-        meta = json.load(jf)
-    transcript_text = meta.get("transcription_text", "")
-    if not transcript_text:
-        return HTMLResponse("<b>No transcript text found.</b>")
-    llm_result = call_llm(transcript_text)
-    # Log the raw LLM result for debugging
-    try:
-        with open("server.log", "a") as logf:
-            logf.write(f"[LLM RESPONSE] {fname}: {repr(llm_result)}\n")
-    except Exception:
-        pass
-    # If LLM returns an empty dict, show error and log warning
-    if isinstance(llm_result, dict) and not llm_result:
-        try:
-            with open("server.log", "a") as logf:
-                logf.write(f"[LLM WARNING] {fname}: LLM returned empty dict.\n")
-        except Exception:
-            pass
-        return HTMLResponse(f"<b>Error: LLM returned an empty response. Check your Ollama model and prompt configuration.</b> <a href='/?file={fname}'>Back</a>")
+def save_markdown_result(fname: str, path: str, meta: dict, llm_result: dict, transcript_text: str, partial: bool = False):
+    """
+    Write the LLM result as the transcription's markdown file and link it from the metadata.
+    partial=True marks output salvaged from an interrupted generation.
+    Returns (markdown file name, markdown content).
+    """
     md_content = llm_result.get("markdown", "")
     md_title = llm_result.get("title", "")
     md_file_name = llm_result.get("file_name") or (os.path.splitext(fname)[0] + ".md")
@@ -261,22 +593,176 @@ def generate_markdown(fname: str):
         if not md_content or not md_content.strip():
             md_content = str(llm_result)
     md_path = os.path.join(MARKDOWNS_DIR, md_file_name)
-    with open(md_path, "w") as mf:
-        mf.write(md_content)
+    storage.write_text(md_path, md_content, storage.markdown_compression())
+    cached = llm_result.pop("cached", False)
+
     # Update JSON to link to markdown file and title
-    meta["markdown_file"] = md_file_name
-    if md_title:
-        meta["markdown_title"] = md_title
-    with open(path, "w") as jf:
-        json.dump(meta, jf, ensure_ascii=False, indent=2)
+    def link_markdown(meta):
+        meta["markdown_file"] = md_file_name
+        if md_title:
+            meta["markdown_title"] = md_title
+        record_chunk_timings(meta, llm_result)
+        if cached:
+            meta["markdown_cached"] = True
+        else:
+            meta.pop("markdown_cached", None)
+        if partial:
+            meta["markdown_partial"] = True
+        else:
+            meta.pop("markdown_partial", None)
+
+    # Applied to the file as it is now, not to the copy read when the request started,
+    # so a worker's concurrent updates are kept
+    meta = update_meta(path, link_markdown)
+    meta_index.upsert(fname, meta)
+    meta_index.index_text(fname, meta.get("markdown_title", ""), transcript_text, md_content)
+    return md_file_name, md_content
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/generate_md_stream/{fname}")
+def generate_markdown_stream(fname: str, refresh: bool = False):
+    """
+    Server-sent events version of /generate_md: "token" events carry the model output as it
+    is generated, then one "done", "partial" or "error" event. Transcripts long enough for chunked
+    polishing send a "chunk" event per finished chunk instead of tokens. Output so far is persisted to
+    <name>.partial.md about once a second, and if generation fails or times out whatever was
+    produced is saved as the markdown (flagged markdown_partial) instead of being lost.
+    """
+    from ollama_client import get_client, get_async_client, parse_partial_result
+    path = os.path.join(TRANSCRIPTIONS_DIR, fname)
+    if not os.path.exists(path):
+        raise HTTPException(404, "Not found")
+    with open(path, "r") as jf:
+        meta = json.load(jf)
+    transcript_text = storage.transcript_text(path, meta)
+    if not transcript_text:
+        raise HTTPException(400, "No transcript text found.")
+    partial_path = os.path.join(MARKDOWNS_DIR, os.path.splitext(fname)[0] + ".partial.md")
+
+    def write_partial(raw: str):
+        with open(partial_path, "w") as pf:
+            pf.write(parse_partial_result(raw).get("markdown", ""))
+
+    def chunked_events():
+        # Too long for one generation: report chunks of the map-reduce pass as they finish
+        progress = queue.Queue()
+        outcome = {}
+
+        def run():
+            try:
+                outcome["result"] = polish_long_transcript(
+                    transcript_text, get_client(),
+                    on_chunk=lambda index, total, sec: progress.put({"index": index, "total": total, "sec": round(sec, 3)}))
+            except Exception as e:
+                outcome["error"] = e
+            progress.put(None)
+
+        threading.Thread(target=run, daemon=True).start()
+        while True:
+            item = progress.get()
+            if item is None:
+                break
+            yield sse_event("chunk", item)
+        if "error" in outcome:
+            yield sse_event("error", {"error": str(outcome["error"])})
+            return
+        store_llm_result(key, outcome["result"], outcome["result"])
+        md_file_name, _ = save_markdown_result(fname, path, meta, outcome["result"], transcript_text)
+        yield sse_event("done", {"markdown_file": md_file_name, "first_token_ms": None})
+
+    def finish(llm_result: dict, partial: bool = False):
+        if not partial:
+            store_llm_result(key, llm_result, llm_result)
+        md_file_name, _ = save_markdown_result(fname, path, meta, llm_result, transcript_text, partial=partial)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return md_file_name
+
+    async def events():
+        # Streamed on the event loop from the shared async client; file and cache work runs in the threadpool
+        pieces = []
+        last_flush = time.monotonic()
+        started = time.monotonic()
+        first_token_ms = None
+        try:
+            async for piece in get_async_client().stream_markdown(transcript_text):
+                if first_token_ms is None:
+                    first_token_ms = round((time.monotonic() - started) * 1000)
+                    yield sse_event("first_token", {"ms": first_token_ms})
+                pieces.append(piece)
+                yield sse_event("token", piece)
+                if time.monotonic() - last_flush > 1.0:
+                    await run_in_threadpool(write_partial, "".join(pieces))
+                    last_flush = time.monotonic()
+        except Exception as e:
+            llm_result = parse_partial_result("".join(pieces))
+            if llm_result.get("markdown", "").strip():
+                md_file_name = await run_in_threadpool(finish, llm_result, True)
+                yield sse_event("partial", {"markdown_file": md_file_name, "error": str(e)})
+            else:
+                yield sse_event("error", {"error": str(e)})
+            return
+        md_file_name = await run_in_threadpool(finish, parse_partial_result("".join(pieces)))
+        yield sse_event("done", {"markdown_file": md_file_name, "first_token_ms": first_token_ms})
+
+    def cached_events(result):
+        md_file_name, _ = save_markdown_result(fname, path, meta, result, transcript_text)
+        yield sse_event("done", {"markdown_file": md_file_name, "first_token_ms": None, "cached": True})
+
+    key = get_client().result_key(transcript_text)
+    cached = cached_llm_result(key, refresh)
+    if cached is not None:
+        stream = cached_events(cached)
+    elif needs_chunking(transcript_text, get_client().chunking):
+        stream = chunked_events()
+    else:
+        stream = events()
+    return StreamingResponse(stream, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/ollama/stats")
+def ollama_stats():
+    """Per-model latency histogram of Ollama calls made by this process."""
+    from ollama_client import latency_stats
+    return latency_stats()
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics of this process (Ollama latency histograms)."""
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.get("/api/llm_cache/stats")
+def llm_cache_stats():
+    return llm_cache.stats() if llm_cache is not None else {"enabled": False}
+
+@app.get("/generate_md/{fname}")
+async def generate_markdown(fname: str, refresh: bool = False):
+    path = os.path.join(TRANSCRIPTIONS_DIR, fname)
+    if not os.path.exists(path):
+        raise HTTPException(404, "Not found")
+    with open(path, "r") as jf:
+        meta = json.load(jf)
+    transcript_text = storage.transcript_text(path, meta)
+    if not transcript_text:
+        return HTMLResponse("<b>No transcript text found.</b>")
+    llm_result = await call_llm_async(transcript_text, refresh=refresh)
+    if isinstance(llm_result, dict):
+        logging.info(f"LLM result for {fname}: fields={sorted(llm_result)} markdown_chars={len(llm_result.get('markdown') or '')}")
+    # If LLM returns an empty dict, show error and log warning
+    if isinstance(llm_result, dict) and not llm_result:
+        logging.warning(f"LLM returned an empty result for {fname}")
+        return HTMLResponse(f"<b>Error: LLM returned an empty response. Check your Ollama model and prompt configuration.</b> <a href='/?file={fname}'>Back</a>")
+    md_file_name, md_content = save_markdown_result(fname, path, meta, llm_result, transcript_text)
     # Show warning if markdown is still empty
     if not md_content.strip():
-        return HTMLResponse(f"<b>Warning: Markdown is empty. Check server.log for LLM response.</b> <a href='/download_md/{md_file_name}'>Download MD</a> | <a href='/?file={fname}'>Back</a>")
+        return HTMLResponse(f"<b>Warning: Markdown is empty. Check server.log and the Ollama model.</b> <a href='/download_md/{md_file_name}'>Download MD</a> | <a href='/?file={fname}'>Back</a>")
     return HTMLResponse(f"<b>Markdown generated and saved as {md_file_name}.</b> <a href='/download_md/{md_file_name}'>Download MD</a> | <a href='/?file={fname}'>Back</a>")
 
 @app.get("/download_md/{md_name}")
 def download_md(md_name: str):
-    md_path = os.path.join(MARKDOWNS_DIR, md_name)
-    if not os.path.exists(md_path):
+    md_path = os.path.join(MARKDOWNS_DIR, os.path.basename(md_name))
+    if not storage.stored_path(md_path):
         raise HTTPException(404, "Not found")
-    return FileResponse(md_path, media_type="text/markdown", filename=md_name)
+    return Response(content=storage.read_text(md_path), media_type="text/markdown; charset=utf-8",
+                    headers={"Content-Disposition": f'attachment; filename="{os.path.basename(md_name)}"'})
@@ -0,0 +1,162 @@
+import os
+import time
+import queue
+import socket
+import logging
+import threading
+import subprocess
+
+
+class WhisperServer:
+    """
+    One model-resident whisper.cpp `whisper-server` process listening on a local port.
+    The ggml model is loaded once at start-up instead of once per job.
+    """
+
+    def __init__(self, exe_path: str, model_path: str, port: int, host: str = "127.0.0.1", threads: int = None, extra_args: str = "", startup_timeout: float = 120.0):
+        self.exe_path = os.path.expanduser(exe_path)
+        self.model_path = os.path.expanduser(model_path)
+        self.host = host
+        self.port = port
+        self.threads = threads
+        self.extra_args = extra_args
+        self.startup_timeout = startup_timeout
+        self.base_url = f"http://{host}:{port}"
+        self.proc = None
+        self.restarts = 0
+
+    def start(self):
+        cmd = [self.exe_path, "-m", self.model_path, "--host", self.host, "--port", str(self.port)]
+        if self.threads:
+            cmd += ["-t", str(self.threads)]
+        if self.extra_args:
+            cmd += self.extra_args.split()
+        logging.info(f"Starting whisper server: {' '.join(cmd)}")
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"whisper server on port {self.port} exited with code {self.proc.returncode}")
+            if self.health_check():
+                return
+            time.sleep(0.25)
+        self.stop()
+        raise RuntimeError(f"whisper server on port {self.port} did not become healthy in {self.startup_timeout}s")
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.proc = None
+
+    def is_alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def health_check(self) -> bool:
+        if not self.is_alive():
+            return False
+        # Only the "server" backend needs an HTTP client; keep it out of the cli backend's startup
+        import requests
+        try:
+            # Newer whisper.cpp servers expose /health; older ones only accept connections
+            response = requests.get(f"{self.base_url}/health", timeout=2)
+            if response.status_code == 404:
+                with socket.create_connection((self.host, self.port), timeout=2):
+                    return True
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def restart(self):
+        logging.warning(f"Restarting whisper server on port {self.port}")
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def ensure_running(self):
+        if not self.health_check():
+            self.restart()
+
+    def transcribe(self, audio_path: str, timeout: float = None, response_format: str = "text") -> str:
+        import requests
+        with open(audio_path, "rb") as f:
+            response = requests.post(
+                f"{self.base_url}/inference",
+                files={"file": (os.path.basename(audio_path), f, "audio/wav")},
+                data={"response_format": response_format, "temperature": "0.0"},
+                timeout=timeout,
+            )
+        response.raise_for_status()
+        return response.text
+
+
+class WhisperServerPool:
+    """
+    Fixed set of WhisperServer processes. Each transcription checks out one idle server,
+    so a server handles one job at a time. A monitor thread health-checks idle servers and
+    restarts any that crashed; a server that fails mid-job is restarted before it is reused.
+    """
+
+    def __init__(self, servers, health_interval: float = 30.0):
+        self.servers = servers
+        self.health_interval = health_interval
+        self._idle = queue.Queue()
+        self._stopped = threading.Event()
+        self._monitor = None
+
+    def start(self):
+        for server in self.servers:
+            server.start()
+            self._idle.put(server)
+        self._monitor = threading.Thread(target=self._monitor_loop, name="whisper-server-monitor", daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        self._stopped.set()
+        # Let a restart in progress finish so it does not start a server after it was stopped
+        if self._monitor is not None:
+            self._monitor.join()
+        for server in self.servers:
+            server.stop()
+
+    def transcribe(self, audio_path: str, timeout: float = None, response_format: str = "text") -> str:
+        server = self._idle.get()
+        try:
+            server.ensure_running()
+            return server.transcribe(audio_path, timeout=timeout, response_format=response_format)
+        except Exception:
+            # A crash mid-request shows up as a connection error; bring the process back for the next job
+            if not server.is_alive():
+                try:
+                    server.restart()
+                except Exception:
+                    logging.exception(f"Could not restart whisper server on port {server.port}")
+            raise
+        finally:
+            self._idle.put(server)
+
+    def stats(self) -> dict:
+        return {
+            "servers": len(self.servers),
+            "idle": self._idle.qsize(),
+            "alive": sum(1 for s in self.servers if s.is_alive()),
+            "restarts": sum(s.restarts for s in self.servers),
+        }
+
+    def _monitor_loop(self):
+        while not self._stopped.wait(self.health_interval):
+            # Only check servers that are idle right now, so a long job is not mistaken for a hang
+            for _ in range(self._idle.qsize()):
+                try:
+                    server = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    server.ensure_running()
+                except Exception:
+                    logging.exception(f"Health check/restart failed for whisper server on port {server.port}")
+                finally:
+                    self._idle.put(server)